@@ -0,0 +1,27 @@
+"""Database backends with connection pooling and SQLite tuning"""
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def immediate_atomic(using=None):
+    """
+    transaction.atomic() that takes the write lock when the transaction starts.
+
+    On SQLite (config.db_backends.sqlite3) the outermost block begins with
+    BEGIN IMMEDIATE: a writer then waits out busy_timeout up front, instead of
+    failing with "database is locked" when its first write has to upgrade a
+    read lock that another writer is blocking. Elsewhere, and when nested,
+    this is plain atomic().
+    """
+    connection = transaction.get_connection(using)
+    immediate = hasattr(connection, 'begin_immediate') and not connection.in_atomic_block
+    if immediate:
+        connection.begin_immediate = True
+    try:
+        with transaction.atomic(using=using):
+            yield
+    finally:
+        if immediate:
+            connection.begin_immediate = False
@@ -0,0 +1,76 @@
+"""
+PostgreSQL backend that borrows server connections from a process-wide pool
+(config.db_pool) instead of opening one per thread.
+
+Enabled by DATABASE_POOL=True. Django still "closes" the connection at the
+end of every request (CONN_MAX_AGE=0), which hands it back to the pool. Pool
+options come from the POOL key of the database settings.
+"""
+from django.db.backends.postgresql import base, creation
+
+from config.db_pool import PoolTimeout, close_pools, get_pool
+
+# libpq transaction states, identical for psycopg2 and psycopg 3
+TRANSACTION_STATUS_IDLE = 0
+TRANSACTION_STATUS_INTRANS = 2
+TRANSACTION_STATUS_INERROR = 3
+
+
+def check_connection(conn):
+    if conn.closed:
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    # The check may have opened a transaction when autocommit is off
+    if conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+        conn.rollback()
+    return True
+
+
+def reset_connection(conn):
+    """Roll back anything left open; returns False if the connection is unusable"""
+    if conn.closed:
+        return False
+    status = conn.info.transaction_status
+    if status in (TRANSACTION_STATUS_INTRANS, TRANSACTION_STATUS_INERROR):
+        conn.rollback()
+        status = conn.info.transaction_status
+    return status == TRANSACTION_STATUS_IDLE
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would block DROP DATABASE
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict.get('POOL', {})
+        key = tuple(conn_params.get(name) for name in ('host', 'port', 'dbname', 'user', 'service'))
+        self.pool = get_pool(
+            key,
+            check=check_connection,
+            reset=reset_connection,
+            name=f"pool {conn_params.get('dbname')}@{conn_params.get('host') or 'localhost'}",
+            **options,
+        )
+        connect = lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+        try:
+            conn = self.pool.getconn(connect)
+        except PoolTimeout as e:
+            raise self.Database.OperationalError(str(e)) from e
+        # A reused connection was configured when it was opened, but this
+        # wrapper still needs the attribute the parent sets while connecting
+        self.isolation_level = base.IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', base.IsolationLevel.READ_COMMITTED)
+        )
+        return conn
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
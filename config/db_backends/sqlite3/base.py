@@ -0,0 +1,23 @@
+"""
+SQLite backend tuned for concurrent use.
+
+Every new connection runs the PRAGMAs from the PRAGMAS key of the database
+settings (WAL journal, busy timeout, cache and mmap sizes; see SQLITE_PRAGMAS
+in settings). Transactions opened by `config.db_backends.immediate_atomic()`
+start with BEGIN IMMEDIATE.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # Set by immediate_atomic() while it opens its transaction
+    begin_immediate = False
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict.get('PRAGMAS', {}).items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE' if self.begin_immediate else 'BEGIN')
@@ -0,0 +1,179 @@
+"""
+A small thread-safe database connection pool.
+
+Used by the `config.db_backends.postgresql_pool` backend (DATABASE_POOL=True)
+so request threads, job workers and the scheduler reuse a fixed set of
+server connections instead of opening one per thread and per CONN_MAX_AGE
+window. The pool is driver-agnostic: the backend supplies how to open,
+health-check and reset a connection.
+
+Connections are handed out most-recently-used first. A connection that sat
+idle for longer than `check_interval` is health-checked before it is handed
+out, connections older than `max_lifetime` are replaced, and idle
+connections beyond `min_size` are closed after `max_idle` seconds. When
+`max_size` connections are in use, callers wait up to `timeout` seconds.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, check, reset, min_size=0, max_size=10, timeout=10.0,
+                 max_idle=300.0, max_lifetime=3600.0, check_interval=5.0, name='pool'):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError('Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1')
+        self.check = check
+        self.reset = reset
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_interval = check_interval
+        self.name = name
+        self._idle = deque()  # (connection, created_at, returned_at), most recent on the right
+        self._in_use = {}  # id(connection) -> created_at
+        self._size = 0
+        self._cond = threading.Condition()
+
+    def getconn(self, connect):
+        """Return a healthy connection, opening one with `connect()` if none is idle"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                entry = None
+                while entry is None:
+                    now = time.monotonic()
+                    if self._idle:
+                        entry = self._idle.pop()
+                    elif self._size < self.max_size:
+                        self._size += 1
+                        break
+                    elif now >= deadline:
+                        raise PoolTimeout(
+                            f'{self.name}: no connection available within {self.timeout}s '
+                            f'({self.max_size} in use)'
+                        )
+                    else:
+                        self._cond.wait(deadline - now)
+
+            if entry is None:
+                return self._open(connect)
+
+            conn, created_at, returned_at = entry
+            now = time.monotonic()
+            if now - created_at < self.max_lifetime and (
+                now - returned_at < self.check_interval or self._healthy(conn)
+            ):
+                with self._cond:
+                    self._in_use[id(conn)] = created_at
+                return conn
+            self._discard(conn)
+
+    def putconn(self, conn):
+        """Give a connection back; it is closed instead if it cannot be reused"""
+        with self._cond:
+            created_at = self._in_use.pop(id(conn), None)
+        if created_at is None:
+            # Not handed out by this pool
+            self._close(conn)
+            return
+        now = time.monotonic()
+        if now - created_at >= self.max_lifetime or not self._reset(conn):
+            self._discard(conn)
+            return
+
+        expired = []
+        with self._cond:
+            self._idle.append((conn, created_at, now))
+            while (
+                self._size - len(expired) > self.min_size
+                and now - self._idle[0][2] > self.max_idle
+            ):
+                expired.append(self._idle.popleft()[0])
+            self._size -= len(expired)
+            self._cond.notify()
+        for stale in expired:
+            self._close(stale)
+
+    def close(self):
+        """Close every idle connection; connections in use are closed when given back"""
+        with self._cond:
+            idle = [conn for conn, _, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self.max_lifetime = 0
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._cond:
+            return {'size': self._size, 'idle': len(self._idle), 'in_use': len(self._in_use)}
+
+    def _open(self, connect):
+        try:
+            conn = connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._in_use[id(conn)] = time.monotonic()
+        return conn
+
+    def _healthy(self, conn):
+        try:
+            return self.check(conn)
+        except Exception as e:
+            logger.warning(f'{self.name}: dropping broken connection: {str(e)}')
+            return False
+
+    def _reset(self, conn):
+        try:
+            return self.reset(conn)
+        except Exception as e:
+            logger.warning(f'{self.name}: could not reset connection: {str(e)}')
+            return False
+
+    def _discard(self, conn):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        self._close(conn)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_pool(key, **options):
+    """The process-wide pool for `key`, created with `options` on first use"""
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(**options)
+        return pool
+
+
+def close_pools():
+    """Close and forget every pool, e.g. before dropping a test database"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
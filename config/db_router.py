@@ -0,0 +1,109 @@
+"""
+Read replica routing.
+
+With REPLICA_DATABASE_URL set, settings add a `replica` database and install
+ReplicaRouter. Reads go to the primary unless the current request or command
+has opted in with `use_replica()` (ReplicaReadMixin on DRF views, admin
+changelists via ReplicaRoutingMiddleware, `run_benchmarks --replica`).
+
+Writes always go to the primary. The first write in an opted-in scope
+switches its remaining reads back to the primary, and a user who wrote is
+pinned to the primary for REPLICA_STICKY_SECONDS so they read their own
+writes even while the replica lags. Reads inside a transaction on the
+primary also stay there.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+
+_scope = ContextVar('replica_scope', default=None)
+
+
+class ReplicaScope:
+    """Routing state for one request or command"""
+
+    def __init__(self):
+        self.replica = False
+        self.wrote = False
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def _pin_key(user_id):
+    return f'replica:pinned:{user_id}'
+
+
+def pin_to_primary(user):
+    """Send `user`'s reads to the primary for the next REPLICA_STICKY_SECONDS"""
+    seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+    if seconds > 0 and user is not None and user.is_authenticated:
+        cache.set(_pin_key(user.pk), True, seconds)
+
+
+def pinned_to_primary(user):
+    return user is not None and user.is_authenticated and bool(cache.get(_pin_key(user.pk)))
+
+
+def begin_scope():
+    """Start fresh routing state; returns a token for `end_scope`"""
+    return _scope.set(ReplicaScope())
+
+
+def end_scope(token):
+    """Restore the previous routing state; returns the finished ReplicaScope"""
+    scope = _scope.get()
+    _scope.reset(token)
+    return scope
+
+
+def use_replica(user=None):
+    """
+    Route the rest of the current scope's reads to the replica, unless no
+    replica is configured, the scope already wrote or `user` is pinned.
+    Returns whether reads now go to the replica.
+    """
+    scope = _scope.get()
+    if scope is None or scope.wrote or not replica_configured() or pinned_to_primary(user):
+        return False
+    scope.replica = True
+    return True
+
+
+@contextmanager
+def replica_reads(user=None):
+    """Run a block with its reads on the replica where possible"""
+    token = begin_scope()
+    try:
+        use_replica(user)
+        yield
+    finally:
+        end_scope(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None and scope.replica and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None:
+            scope.replica = False
+            scope.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
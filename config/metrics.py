@@ -0,0 +1,314 @@
+"""
+Minimal Prometheus text-format metrics, without the prometheus_client dependency.
+
+Metrics live in process memory. When METRICS_MULTIPROC_DIR is set every
+process also snapshots its values to `<dir>/metrics_<pid>.json` within
+METRICS_FLUSH_INTERVAL seconds of a change and again at exit, and the
+/metrics view merges all snapshots: counters and histograms are summed
+across workers, gauges report the most recently written value. Clear the
+directory whenever the gunicorn master is restarted.
+
+/metrics is served to staff sessions and to scrapers sending
+`Authorization: Bearer <METRICS_AUTH_TOKEN>`; everyone else gets a 403.
+"""
+import atexit
+import copy
+import json
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+JOB_DURATION_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        REGISTRY.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, '')) for label in self.labelnames)
+
+    def snapshot(self):
+        return [[list(key), value] for key, value in self.values.items()]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with REGISTRY.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        REGISTRY.changed()
+
+    @staticmethod
+    def merge(current, other):
+        return current + other
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with REGISTRY.lock:
+            self.values[key] = [value, time.time()]
+        REGISTRY.changed()
+
+    @staticmethod
+    def merge(current, other):
+        return other if other[1] >= current[1] else current
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with REGISTRY.lock:
+            # [count per bucket..., +Inf count, sum]
+            state = self.values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+            state[-2] += 1
+            state[-1] += value
+        REGISTRY.changed()
+
+    @staticmethod
+    def merge(current, other):
+        return [a + b for a, b in zip(current, other)]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.RLock()
+        self._last_flush = 0.0
+        self._timer = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    @property
+    def multiproc_dir(self):
+        return getattr(settings, 'METRICS_MULTIPROC_DIR', '') or ''
+
+    def changed(self):
+        if not self.multiproc_dir:
+            return
+        wait = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5) - (time.monotonic() - self._last_flush)
+        if wait <= 0:
+            self.flush()
+            return
+        # Flush once the interval has passed even if nothing else changes,
+        # so a process's last updates before it goes idle are not lost
+        with self.lock:
+            if self._timer is None:
+                self._timer = threading.Timer(wait, self._flush_pending)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_pending(self):
+        with self.lock:
+            self._timer = None
+        try:
+            self.flush()
+        except OSError:
+            pass
+
+    def flush(self):
+        """Write this process's values to the shared directory"""
+        directory = self.multiproc_dir
+        if not directory:
+            return
+        with self.lock:
+            self._last_flush = time.monotonic()
+            data = {name: metric.snapshot() for name, metric in self.metrics.items()}
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'metrics_{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(data, fh)
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        """Return {metric name: {label tuple: value}} merged across processes"""
+        if not self.multiproc_dir:
+            with self.lock:
+                return {name: copy.deepcopy(metric.values) for name, metric in self.metrics.items()}
+
+        self.flush()
+        merged = {name: {} for name in self.metrics}
+        for filename in os.listdir(self.multiproc_dir):
+            if not (filename.startswith('metrics_') and filename.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(self.multiproc_dir, filename)) as fh:
+                    data = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            for name, samples in data.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                values = merged[name]
+                for key, value in samples:
+                    key = tuple(key)
+                    values[key] = metric.merge(values[key], value) if key in values else value
+        return merged
+
+    def render(self):
+        collected = self.collect()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(collected.get(name, {}).items()):
+                labels = dict(zip(metric.labelnames, key))
+                if metric.kind == 'counter':
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                elif metric.kind == 'gauge':
+                    lines.append(f'{name}{_labels(labels)} {_number(value[0])}')
+                else:
+                    for bound, count in zip(metric.buckets, value):
+                        lines.append(f'{name}_bucket{_labels({**labels, "le": _number(bound)})} {count}')
+                    lines.append(f'{name}_bucket{_labels({**labels, "le": "+Inf"})} {value[-2]}')
+                    lines.append(f'{name}_sum{_labels(labels)} {_number(value[-1])}')
+                    lines.append(f'{name}_count{_labels(labels)} {value[-2]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _number(value):
+    value = float(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+REGISTRY = Registry()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        REGISTRY.flush()
+    except OSError:
+        pass
+
+
+REQUEST_LATENCY = Histogram(
+    'api_request_duration_seconds',
+    'Request wall time by view action.',
+    ('view', 'method', 'status'),
+)
+REQUEST_QUERIES = Histogram(
+    'api_request_db_queries',
+    'Database statements executed per request by view action.',
+    ('view', 'method'),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    'api_request_db_duration_seconds',
+    'Time spent in the database per request by view action.',
+    ('view', 'method'),
+)
+STORAGE_UPLOAD_LATENCY = Histogram(
+    'storage_upload_duration_seconds',
+    'Latency of image uploads to Supabase storage.',
+    ('folder', 'outcome'),
+)
+EARNINGS_RUNS = Counter(
+    'earnings_runs_total',
+    'Earnings engine runs by phase and outcome.',
+    ('phase', 'outcome'),
+)
+EARNINGS_RUN_DURATION = Gauge(
+    'earnings_run_duration_seconds',
+    'Duration of the most recent earnings run by phase.',
+    ('phase',),
+)
+EARNINGS_DEPOSITS_PROCESSED = Gauge(
+    'earnings_run_deposits_processed',
+    'Deposits (or referrals for the referral phase) processed by the most recent run.',
+    ('phase',),
+)
+EARNINGS_ROWS_WRITTEN = Gauge(
+    'earnings_run_rows_written',
+    'DailyEarning and Transaction rows written by the most recent run.',
+    ('phase',),
+)
+EARNINGS_LAST_SUCCESS = Gauge(
+    'earnings_run_last_success_timestamp_seconds',
+    'Unix time of the last successful earnings run by phase.',
+    ('phase',),
+)
+JOB_RUNS = Counter(
+    'jobs_total',
+    'Background job executions by task and outcome.',
+    ('task', 'outcome'),
+)
+JOB_DURATION = Histogram(
+    'job_duration_seconds',
+    'Run time of background jobs by task.',
+    ('task',),
+    buckets=JOB_DURATION_BUCKETS,
+)
+JOBS_OVERDUE = Gauge(
+    'jobs_overdue',
+    'Queued jobs due for longer than JOB_STALE_AFTER without a worker claiming them.',
+)
+
+
+def record_earnings_run(phase, duration, stats=None, error=None):
+    """Publish the outcome of one earnings engine phase"""
+    EARNINGS_RUNS.inc(phase=phase, outcome='error' if error else 'success')
+    EARNINGS_RUN_DURATION.set(duration, phase=phase)
+    if stats:
+        EARNINGS_DEPOSITS_PROCESSED.set(stats.get('processed', 0), phase=phase)
+        EARNINGS_ROWS_WRITTEN.set(stats.get('rows_written', 0), phase=phase)
+    if not error:
+        EARNINGS_LAST_SUCCESS.set(time.time(), phase=phase)
+
+
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_AUTH_TOKEN', '')
+    user = getattr(request, 'user', None)
+    allowed = (
+        (token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'))
+        or (user is not None and user.is_staff)
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,136 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import db_router, metrics
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    """Database execute wrapper that counts statements and their total time"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+def get_view_name(view_func, method):
+    """Name a resolved view as `ViewSet.action` for DRF views, or by its dotted path"""
+    cls = getattr(view_func, 'cls', None)
+    if cls is not None:
+        action = (getattr(view_func, 'actions', None) or {}).get(method.lower())
+        return f'{cls.__name__}.{action}' if action else cls.__name__
+    name = getattr(view_func, '__qualname__', type(view_func).__name__)
+    return f'{view_func.__module__}.{name}'
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Record wall time, query count and query time for every request.
+
+    The numbers also feed the per-view histograms served from /metrics.
+
+    Queries are counted with connection.execute_wrapper, so this works with
+    DEBUG off. Each request emits one JSON log line; requests slower than
+    SLOW_REQUEST_MS or running more than SLOW_REQUEST_QUERIES statements are
+    logged as warnings. With SERVER_TIMING_HEADER on, the numbers are also
+    returned in a Server-Timing header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_INSTRUMENTATION', True)
+        self.slow_ms = getattr(settings, 'SLOW_REQUEST_MS', 1000)
+        self.slow_queries = getattr(settings, 'SLOW_REQUEST_QUERIES', 50)
+        self.server_timing = getattr(settings, 'SERVER_TIMING_HEADER', False)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+        db_ms = counter.duration * 1000
+
+        view = getattr(request, '_instrumented_view', None)
+        slow = duration_ms >= self.slow_ms or counter.count >= self.slow_queries
+        record = {
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 2),
+            'db_queries': counter.count,
+            'db_ms': round(db_ms, 2),
+            'slow': slow,
+        }
+        logger.log(logging.WARNING if slow else logging.INFO, json.dumps(record))
+
+        metric_view = view or 'unresolved'
+        metrics.REQUEST_LATENCY.observe(
+            duration_ms / 1000, view=metric_view, method=request.method, status=response.status_code
+        )
+        metrics.REQUEST_QUERIES.observe(counter.count, view=metric_view, method=request.method)
+        metrics.REQUEST_DB_TIME.observe(counter.duration, view=metric_view, method=request.method)
+
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'app;dur={duration_ms:.1f}, '
+                f'db;dur={db_ms:.1f};desc="{counter.count} queries"'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._instrumented_view = get_view_name(view_func, request.method)
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Give each request its own read replica routing scope (config.db_router).
+
+    Admin changelist pages read from the replica. Whatever view opted in,
+    a request that wrote pins its user to the primary for
+    REPLICA_STICKY_SECONDS so their next reads see the write.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = db_router.begin_scope()
+        try:
+            response = self.get_response(request)
+        finally:
+            scope = db_router.end_scope(token)
+        if scope.wrote:
+            db_router.pin_to_primary(getattr(request, 'user', None))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in ('GET', 'HEAD')
+            and getattr(view_func, 'model_admin', None) is not None
+            and view_func.__name__ == 'changelist_view'
+        ):
+            db_router.use_replica(request.user)
+        return None
@@ -0,0 +1,215 @@
+"""
+In-process SQL statistics grouped by normalized statement fingerprint.
+
+Every statement run on any connection is reduced to a fingerprint (literals,
+placeholders, IN lists and multi-row VALUES collapsed) and counted with its
+total time and a rolling p95. Every QUERY_STATS_FLUSH_INTERVAL seconds, at
+the end of a request or job, and when the process exits, the top offenders
+are logged and all counters are added to the QueryFingerprintStat table
+shown in the admin. This gives a pg_stat_statements-style view on databases
+where that extension is not available.
+
+Only long-running processes collect statistics: config.wsgi and `run_worker`
+call `install()`. Other management commands and the test runner never do, so
+they write nothing to the database.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+MAX_FINGERPRINTS = 2000
+OTHER_FINGERPRINT = '<other>'
+
+_SAVEPOINT = re.compile(r'"s\d+_x\d+"')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\$\d+|\?')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_ROWS = re.compile(r'(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """Normalize a statement so that calls differing only in literals group together"""
+    sql = _SAVEPOINT.sub('"?"', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _VALUES_ROWS.sub(r'\1, ...', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint_hash(text):
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+class FingerprintStat:
+    __slots__ = ('calls', 'total', 'max', 'samples')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=256)
+
+    def p95(self):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class QueryObserver:
+    """Execute wrapper accumulating per-fingerprint statistics for this process"""
+
+    def __init__(self):
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.last_flush = time.monotonic()
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(self.local, 'flushing', False):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, time.perf_counter() - start)
+
+    def record(self, sql, duration):
+        key = fingerprint(sql)
+        with self.lock:
+            stat = self.stats.get(key)
+            if stat is None:
+                if len(self.stats) >= MAX_FINGERPRINTS:
+                    key = OTHER_FINGERPRINT
+                stat = self.stats.setdefault(key, FingerprintStat())
+            stat.calls += 1
+            stat.total += duration
+            stat.max = max(stat.max, duration)
+            stat.samples.append(duration)
+
+    def top(self, n=20):
+        with self.lock:
+            ranked = sorted(self.stats.items(), key=lambda item: -item[1].total)
+        return ranked[:n]
+
+    def flush_due(self):
+        interval = getattr(settings, 'QUERY_STATS_FLUSH_INTERVAL', 300)
+        return time.monotonic() - self.last_flush >= interval
+
+    def flush(self, log=True):
+        """Log the top offenders and add all counters to QueryFingerprintStat"""
+        with self.lock:
+            stats, self.stats = self.stats, {}
+            self.last_flush = time.monotonic()
+        if not stats:
+            return
+
+        top_n = getattr(settings, 'QUERY_STATS_TOP_N', 10) if log else 0
+        ranked = sorted(stats.items(), key=lambda item: -item[1].total)
+        for sql, stat in ranked[:top_n]:
+            logger.info(json.dumps({
+                'event': 'query_fingerprint',
+                'calls': stat.calls,
+                'total_ms': round(stat.total * 1000, 2),
+                'p95_ms': round(stat.p95() * 1000, 2),
+                'fingerprint': sql[:1000],
+            }))
+
+        self.local.flushing = True
+        try:
+            self.persist(stats)
+        except DatabaseError as exc:
+            (logger.warning if log else logger.debug)(f'Could not persist query fingerprint stats: {exc}')
+        finally:
+            self.local.flushing = False
+
+    @staticmethod
+    def persist(stats):
+        from django.utils import timezone
+        from config.db_backends import immediate_atomic
+        from core.models import QueryFingerprintStat
+
+        now = timezone.now()
+        rows = {fingerprint_hash(sql): (sql, stat) for sql, stat in stats.items()}
+        # Lock the rows, then add this window's counters in one batched UPDATE
+        # per 500 rows, so concurrent flushes from other processes aren't lost.
+        with immediate_atomic():
+            QueryFingerprintStat.objects.bulk_create(
+                [
+                    QueryFingerprintStat(fingerprint_hash=key, fingerprint=sql, first_seen=now, last_seen=now)
+                    for key, (sql, _) in rows.items()
+                ],
+                ignore_conflicts=True,
+            )
+            saved = list(QueryFingerprintStat.objects.select_for_update().filter(fingerprint_hash__in=rows))
+            for row in saved:
+                stat = rows[row.fingerprint_hash][1]
+                row.calls += stat.calls
+                row.total_time_ms += stat.total * 1000
+                row.max_time_ms = max(row.max_time_ms, stat.max * 1000)
+                row.p95_ms = stat.p95() * 1000
+                row.last_seen = now
+            QueryFingerprintStat.objects.bulk_update(
+                saved, ['calls', 'total_time_ms', 'max_time_ms', 'p95_ms', 'last_seen'], batch_size=500
+            )
+
+
+OBSERVER = QueryObserver()
+_installed = False
+
+
+def _attach(sender, connection, **kwargs):
+    # Insert at the front: execute_wrapper() context managers pop from the
+    # end, and this may run while one of them is active.
+    if OBSERVER not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, OBSERVER)
+
+
+def flush_if_due():
+    if _installed and OBSERVER.flush_due():
+        OBSERVER.flush()
+
+
+def _flush_if_due(sender, **kwargs):
+    flush_if_due()
+
+
+def _flush_at_exit():
+    try:
+        OBSERVER.flush(log=False)
+    except Exception:
+        logger.debug('Query fingerprint flush at exit failed', exc_info=True)
+
+
+def install():
+    """
+    Observe every connection opened from now on and flush at exit; called by
+    the web and worker processes only. No-op when QUERY_STATS is off.
+    """
+    global _installed
+    if _installed or not getattr(settings, 'QUERY_STATS', False):
+        return
+    _installed = True
+    for connection in connections.all(initialized_only=True):
+        _attach(None, connection)
+    connection_created.connect(_attach, dispatch_uid='query_stats_attach')
+    request_finished.connect(_flush_if_due, dispatch_uid='query_stats_flush')
+    atexit.register(_flush_at_exit)
@@ -0,0 +1,68 @@
+"""
+orjson-backed drop-ins for DRF's JSONRenderer and JSONParser.
+
+Enabled with FAST_JSON=True. Responses are the same bytes the stock compact
+renderer produces: types orjson does not handle natively (Decimal, datetime,
+lazy translations, querysets, ...) go through DRF's own JSONEncoder.default,
+and \\u2028/\\u2029 are escaped the same way. Indented output (browsable API,
+`Accept: application/json; indent=4`) and anything orjson rejects, such as
+integers wider than 64 bits, fall back to the stock classes. Floats below
+1e-4 or from 1e16 up are written in an equivalent notation ("0.00001"
+instead of "1e-05"), and NaN renders as null rather than raising.
+"""
+import io
+import re
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    raise ImportError("orjson is not installed. Install it with: pip install orjson")
+
+# Datetimes are passed to DRF's encoder, which writes UTC as "Z"
+DUMPS_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+# orjson reads integers wider than 64 bits as floats; bodies that may hold one
+# are parsed by the stock parser instead
+LONG_NUMBER = re.compile(rb'\d{19}')
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=DUMPS_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+
+        raw = stream.read()
+        if LONG_NUMBER.search(raw):
+            return super().parse(io.BytesIO(raw), media_type, parser_context)
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # Let the stock parser accept what it can (NaN when STRICT_JSON
+            # is off) and word the error clients see
+            return super().parse(io.BytesIO(raw), media_type, parser_context)
@@ -33,6 +33,7 @@ INSTALLED_APPS = [
 # ✅ CORS MUST BE FIRST
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'config.middleware.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,12 +77,63 @@ if DATABASE_URL:
 else:
     DATABASES = {
         'default': {
-            'ENGINE': config('DATABASE_ENGINE', default='django.db.backends.sqlite3'),
+            'ENGINE': config('DATABASE_ENGINE', default='config.db_backends.sqlite3'),
             'NAME': BASE_DIR / 'db.sqlite3',
             'CONN_MAX_AGE': 600,
+            # Run on every new connection by config.db_backends.sqlite3. WAL
+            # lets readers proceed while the earnings engine is writing.
+            'PRAGMAS': {
+                'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),
+                'journal_mode': config('SQLITE_JOURNAL_MODE', default='wal'),
+                'synchronous': config('SQLITE_SYNCHRONOUS', default='normal'),
+                'mmap_size': config('SQLITE_MMAP_SIZE', default=268435456, cast=int),
+                'cache_size': config('SQLITE_CACHE_SIZE', default=-64000, cast=int),
+            },
+            # The historical migrations include PostgreSQL-only data fixes
+            # (e.g. 0014 reads information_schema), so the SQLite test
+            # database is created straight from the models.
+            'TEST': {'MIGRATE': False},
         }
     }
 
+# Optional read replica (config.db_router). Reports, admin changelists and
+# transaction lists read from it; users who just wrote stay on the primary
+# for REPLICA_STICKY_SECONDS.
+REPLICA_DATABASE_URL = config('REPLICA_DATABASE_URL', default='')
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=int)
+
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = dj_database_url.config(
+        default=REPLICA_DATABASE_URL,
+        conn_max_age=600,
+    )
+    DATABASES['replica'].setdefault('OPTIONS', {})
+    DATABASES['replica']['OPTIONS']['sslmode'] = 'require'
+    DATABASES['replica']['OPTIONS']['connect_timeout'] = 5
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+    MIDDLEWARE.append('config.middleware.ReplicaRoutingMiddleware')
+
+# Pooled PostgreSQL connections (config.db_pool). Each process keeps at most
+# MAX_SIZE server connections shared by all its threads; they go back to the
+# pool at the end of every request instead of staying open per thread.
+DATABASE_POOL = config('DATABASE_POOL', default=False, cast=bool)
+DATABASE_POOL_OPTIONS = {
+    'min_size': config('DATABASE_POOL_MIN_SIZE', default=2, cast=int),
+    'max_size': config('DATABASE_POOL_MAX_SIZE', default=10, cast=int),
+    'timeout': config('DATABASE_POOL_TIMEOUT', default=10, cast=float),
+    'max_idle': config('DATABASE_POOL_MAX_IDLE', default=300, cast=float),
+    'max_lifetime': config('DATABASE_POOL_MAX_LIFETIME', default=3600, cast=float),
+    'check_interval': config('DATABASE_POOL_CHECK_INTERVAL', default=5, cast=float),
+}
+
+if DATABASE_POOL:
+    for database in DATABASES.values():
+        if database['ENGINE'] == 'django.db.backends.postgresql':
+            database['ENGINE'] = 'config.db_backends.postgresql_pool'
+            database['CONN_MAX_AGE'] = 0
+            database['POOL'] = DATABASE_POOL_OPTIONS
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -100,10 +152,31 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 
 AUTH_USER_MODEL = 'users.User'
 
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Token lookups are cached only with a shared cache (REDIS_URL), so that
+# logouts and suspensions invalidate them in every process.
+AUTH_TOKEN_CACHE_TIMEOUT = config('AUTH_TOKEN_CACHE_TIMEOUT', default=60, cast=int)
+PAGINATION_COUNT_CACHE_TIMEOUT = config('PAGINATION_COUNT_CACHE_TIMEOUT', default=300, cast=int)
+
 # ✅ API-ONLY AUTH (NO CSRF)
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -117,6 +190,20 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'config.exceptions.custom_exception_handler',
 }
 
+# Render and parse JSON with orjson (config.renderers); needs `pip install orjson`
+FAST_JSON = config('FAST_JSON', default=False, cast=bool)
+
+if FAST_JSON:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
+        'config.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    )
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = (
+        'config.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    )
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=365),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=365),
@@ -161,6 +248,55 @@ CSRF_TRUSTED_ORIGINS = [
     'https://ultamine-pro-hub-37.vercel.app',
 ]
 
+# Per-request timing / query counting (config.middleware)
+REQUEST_INSTRUMENTATION = config('REQUEST_INSTRUMENTATION', default=True, cast=bool)
+SLOW_REQUEST_MS = config('SLOW_REQUEST_MS', default=1000, cast=int)
+SLOW_REQUEST_QUERIES = config('SLOW_REQUEST_QUERIES', default=50, cast=int)
+SERVER_TIMING_HEADER = config('SERVER_TIMING_HEADER', default=False, cast=bool)
+
+# Prometheus text exposition at /metrics (config.metrics). Point
+# METRICS_MULTIPROC_DIR at a directory shared by all gunicorn workers.
+# Only staff sessions and requests sending `Authorization: Bearer
+# <METRICS_AUTH_TOKEN>` may read it; with no token set scrapers are refused.
+METRICS_MULTIPROC_DIR = config('METRICS_MULTIPROC_DIR', default='')
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5, cast=int)
+METRICS_AUTH_TOKEN = config('METRICS_AUTH_TOKEN', default='')
+
+# Per-fingerprint SQL statistics, logged and saved to QueryFingerprintStat.
+# Collected only by the web (config.wsgi) and `run_worker` processes.
+QUERY_STATS = config('QUERY_STATS', default=False, cast=bool)
+QUERY_STATS_FLUSH_INTERVAL = config('QUERY_STATS_FLUSH_INTERVAL', default=300, cast=int)
+QUERY_STATS_TOP_N = config('QUERY_STATS_TOP_N', default=10, cast=int)
+
+# Transactions and daily earnings older than this many days (rounded down to
+# the start of that month) are moved to archive tables by `archive_history`.
+ARCHIVE_AFTER_DAYS = config('ARCHIVE_AFTER_DAYS', default=180, cast=int)
+
+# Earnings engine profiles (--profile or EARNINGS_PROFILE=1) are written here.
+PROFILE_DIR = config('PROFILE_DIR', default=str(BASE_DIR / 'profiles'))
+
+# Scheduler leader election: only the process holding the lease runs jobs.
+# A dead leader is replaced within roughly TTL + heartbeat seconds.
+SCHEDULER_LEASE_TTL = config('SCHEDULER_LEASE_TTL', default=30, cast=int)
+SCHEDULER_HEARTBEAT_INTERVAL = config('SCHEDULER_HEARTBEAT_INTERVAL', default=10, cast=int)
+
+# Background jobs (core.jobs) run by `manage.py run_worker`, which must be
+# deployed next to the web process. JOBS_EAGER runs them inline after commit
+# instead, for development without a worker. While no worker has sent a
+# heartbeat for WORKER_HEARTBEAT_TTL seconds the scheduler leader runs due
+# earnings jobs itself, and it logs an error and sets the jobs_overdue metric
+# when due jobs stay unclaimed for JOB_STALE_AFTER seconds.
+JOBS_EAGER = config('JOBS_EAGER', default=False, cast=bool)
+JOB_RETRY_DELAY = config('JOB_RETRY_DELAY', default=30, cast=int)
+JOB_STALE_AFTER = config('JOB_STALE_AFTER', default=900, cast=int)
+WORKER_HEARTBEAT_TTL = config('WORKER_HEARTBEAT_TTL', default=120, cast=int)
+ASYNC_IMAGE_UPLOADS = config('ASYNC_IMAGE_UPLOADS', default=False, cast=bool)
+
+# Spread the midnight earnings run over the day: with N > 0 buckets, users
+# with id % N == i are credited by their own job, queued i * HOURS / N later.
+EARNINGS_STAGGER_BUCKETS = config('EARNINGS_STAGGER_BUCKETS', default=0, cast=int)
+EARNINGS_STAGGER_HOURS = config('EARNINGS_STAGGER_HOURS', default=12, cast=int)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
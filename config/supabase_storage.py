@@ -45,8 +45,9 @@ class SupabaseStorage(Storage):
 
     def exists(self, name):
         try:
-            self.client.storage.from_(self.bucket_name).list(path=name)
-            return True
+            directory, filename = os.path.split(name)
+            files = self.client.storage.from_(self.bucket_name).list(path=directory)
+            return any(file.get('name') == filename for file in files)
         except:
             return False
 
@@ -1,10 +1,13 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from .models import (
-    MiningPackage, Deposit, Wallet, DailyEarning, Transaction,
-    Referral, Withdrawal, Product, ProductImage, Order, ROISetting, ReinvestSetting, Category
+    MiningPackage, Deposit, Wallet, DailyEarning, UserDailySummary, Transaction,
+    Referral, Withdrawal, Product, ProductImage, Order, ROISetting, ReinvestSetting, Category,
+    QueryFingerprintStat, TransactionArchive, DailyEarningArchive, BalanceCheckpoint,
+    WalletSnapshot, SchedulerLease, Job, WorkerHeartbeat
 )
-from .services import EarningService
+from .services import ApprovalService
+from .jobs import enqueue
 
 
 @admin.register(MiningPackage)
@@ -47,37 +50,24 @@ class DepositAdmin(admin.ModelAdmin):
     actions = ['approve_deposits', 'reject_deposits']
     
     def approve_deposits(self, request, queryset):
-        updated = 0
-        for deposit in queryset:
+        from django.utils import timezone
+        from datetime import timedelta
+        approved_ids = []
+        for deposit in queryset.select_related('package'):
             if deposit.status == 'pending':
-                user = deposit.user
-                wallet = user.wallet
-                wallet_balance_before = wallet.balance
-                wallet_signup_bonus_before = wallet.signup_bonus
-                
-                deposit.status = 'approved'
-                deposit.approved_by = request.user
-                from django.utils import timezone
-                deposit.approved_at = timezone.now()
-                deposit.save()
-                
-                wallet.refresh_from_db()
-                
-                if wallet.balance > wallet_balance_before:
-                    wallet.balance = wallet_balance_before
-                    wallet.save()
-                
-                if wallet.signup_bonus > wallet_signup_bonus_before:
-                    wallet.signup_bonus = wallet_signup_bonus_before
-                    wallet.save()
-                
-                updated += 1
+                now = timezone.now()
+                if Deposit.objects.filter(pk=deposit.pk, status='pending').update(
+                    status='approved',
+                    approved_by=request.user,
+                    approved_at=now,
+                    matures_on=now.date() + timedelta(days=deposit.package.duration_days),
+                    updated_at=now,
+                ):
+                    approved_ids.append(deposit.pk)
+        updated = len(approved_ids)
         
-        try:
-            EarningService.calculate_daily_earnings()
-            EarningService.process_referral_earnings()
-        except Exception as e:
-            pass
+        if approved_ids:
+            enqueue('earnings.deposits', {'deposit_ids': approved_ids})
         
         self.message_user(request, f'{updated} deposits approved.')
     
@@ -106,6 +96,14 @@ class DailyEarningAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at']
 
 
+@admin.register(UserDailySummary)
+class UserDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'mining', 'roi', 'reinvest', 'referral', 'total']
+    list_filter = ['date']
+    search_fields = ['user__email']
+    readonly_fields = ['updated_at']
+
+
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ['user', 'transaction_type', 'amount', 'status', 'created_at']
@@ -114,6 +112,44 @@ class TransactionAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at']
 
 
+@admin.register(TransactionArchive)
+class TransactionArchiveAdmin(admin.ModelAdmin):
+    list_display = ['user', 'transaction_type', 'amount', 'status', 'created_at', 'archived_at']
+    list_filter = ['transaction_type', 'status']
+    search_fields = ['user__email']
+    readonly_fields = ['id', 'user', 'transaction_type', 'amount', 'status', 'description', 'created_at', 'archived_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(DailyEarningArchive)
+class DailyEarningArchiveAdmin(admin.ModelAdmin):
+    list_display = ['user', 'earning_type', 'amount', 'earned_date', 'archived_at']
+    list_filter = ['earning_type']
+    search_fields = ['user__email']
+    readonly_fields = ['id', 'user', 'earning_type', 'amount', 'deposit', 'earned_date', 'created_at', 'archived_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(BalanceCheckpoint)
+class BalanceCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['user', 'month', 'balance', 'mining_income', 'roi_earnings', 'referral_earnings', 'signup_bonus', 'transaction_count']
+    list_filter = ['month']
+    search_fields = ['user__email']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(WalletSnapshot)
+class WalletSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'balance', 'mining_income', 'roi_earnings', 'referral_earnings', 'signup_bonus', 'taken_at']
+    list_filter = ['date']
+    search_fields = ['user__email']
+    readonly_fields = ['taken_at']
+
+
 @admin.register(Referral)
 class ReferralAdmin(admin.ModelAdmin):
     list_display = ['referrer', 'referral_user', 'level', 'commission_percentage', 'total_earned']
@@ -127,46 +163,32 @@ class WithdrawalAdmin(admin.ModelAdmin):
     list_display = ['user', 'amount', 'status', 'withdrawal_method', 'created_at']
     list_filter = ['status', 'withdrawal_method', 'created_at']
     search_fields = ['user__email', 'withdrawal_account']
-    readonly_fields = ['created_at', 'updated_at', 'approval_date', 'tax_amount', 'net_amount']
+    readonly_fields = ['created_at', 'updated_at', 'approval_date', 'tax_amount', 'net_amount', 'balance_held']
     
     fieldsets = (
         ('Withdrawal Request', {'fields': ('user', 'amount', 'withdrawal_method', 'withdrawal_account')}),
         ('Tax Info', {'fields': ('tax_amount', 'net_amount')}),
-        ('Approval', {'fields': ('status', 'approved_by', 'approval_date', 'rejection_reason')}),
+        ('Approval', {'fields': ('status', 'balance_held', 'approved_by', 'approval_date', 'rejection_reason')}),
         ('Timestamps', {'fields': ('created_at', 'updated_at')}),
     )
     
     actions = ['approve_withdrawals', 'reject_withdrawals']
     
     def approve_withdrawals(self, request, queryset):
-        from django.utils import timezone
-        updated = 0
-        for withdrawal in queryset:
-            if withdrawal.status == 'pending':
-                withdrawal.status = 'approved'
-                withdrawal.approved_by = request.user
-                withdrawal.approval_date = timezone.now()
-                withdrawal.save()
-                
-                wallet = withdrawal.user.wallet
-                wallet.balance -= withdrawal.amount
-                wallet.save()
-                
-                Transaction.objects.create(
-                    user=withdrawal.user,
-                    transaction_type='withdrawal',
-                    amount=-withdrawal.amount,
-                    description=f'Withdrawal via {withdrawal.withdrawal_method}'
-                )
-                updated += 1
-        
+        results = ApprovalService.approve_withdrawals(
+            list(queryset.filter(status='pending').values_list('pk', flat=True)), request.user
+        )
+        updated = sum(1 for error in results.values() if error is None)
         self.message_user(request, f'{updated} withdrawals approved.')
     
     approve_withdrawals.short_description = 'Approve selected withdrawals'
     
     def reject_withdrawals(self, request, queryset):
-        queryset.filter(status='pending').update(status='rejected')
-        self.message_user(request, 'Selected withdrawals rejected.')
+        results = ApprovalService.reject_withdrawals(
+            list(queryset.filter(status='pending').values_list('pk', flat=True))
+        )
+        updated = sum(1 for error in results.values() if error is None)
+        self.message_user(request, f'{updated} withdrawals rejected.')
     
     reject_withdrawals.short_description = 'Reject selected withdrawals'
 
@@ -279,3 +301,52 @@ class ROISettingAdmin(admin.ModelAdmin):
 class ReinvestSettingAdmin(admin.ModelAdmin):
     list_display = ['percentage', 'is_active', 'updated_at']
     list_filter = ['is_active']
+
+
+@admin.register(QueryFingerprintStat)
+class QueryFingerprintStatAdmin(admin.ModelAdmin):
+    list_display = ['short_fingerprint', 'calls', 'total_time_ms', 'avg_time_display', 'p95_ms', 'max_time_ms', 'last_seen']
+    search_fields = ['fingerprint']
+    readonly_fields = ['fingerprint_hash', 'fingerprint', 'calls', 'total_time_ms', 'max_time_ms', 'p95_ms', 'first_seen', 'last_seen']
+    actions = ['delete_selected']
+
+    def short_fingerprint(self, obj):
+        return obj.fingerprint[:120]
+    short_fingerprint.short_description = 'Statement'
+
+    def avg_time_display(self, obj):
+        return f"{obj.avg_time_ms:.2f}"
+    avg_time_display.short_description = 'Avg ms'
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(SchedulerLease)
+class SchedulerLeaseAdmin(admin.ModelAdmin):
+    list_display = ['name', 'holder', 'acquired_at', 'expires_at']
+    readonly_fields = ['name', 'holder', 'acquired_at', 'expires_at']
+
+
+@admin.register(WorkerHeartbeat)
+class WorkerHeartbeatAdmin(admin.ModelAdmin):
+    list_display = ['worker', 'started_at', 'last_seen']
+    readonly_fields = ['worker', 'started_at', 'last_seen']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'status', 'priority', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'key']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'locked_by', 'locked_until', 'last_error', 'result']
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        from django.utils import timezone
+        updated = queryset.filter(status='failed').update(
+            status='queued', attempts=0, run_at=timezone.now(), last_error=''
+        )
+        self.message_user(request, f'{updated} jobs queued for retry.')
+
+    retry_jobs.short_description = 'Retry selected failed jobs'
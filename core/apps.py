@@ -9,4 +9,5 @@ class CoreConfig(AppConfig):
     name = 'core'
     
     def ready(self):
+        from . import tasks  # noqa: F401 - registers background jobs
         logger.info("Core app initialized - scheduler disabled during startup")
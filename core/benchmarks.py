@@ -0,0 +1,240 @@
+"""
+Benchmark cases for the earnings engine, report generators and hot API endpoints.
+
+Each case is a callable taking a BenchmarkContext and is registered with
+`@benchmark(name)`. The `run_benchmarks` management command seeds datasets
+with `seed_scale_data`, runs every case, and records wall time and query
+count per case so results can be compared against a stored baseline.
+"""
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.db import connection, connections
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from users.models import User
+
+BENCHMARKS = []
+
+
+def benchmark(name, repeat=True, writes=False):
+    """
+    Register a benchmark case.
+
+    Cases with `repeat=False` are timed once (e.g. the earnings engine, which
+    is idempotent per day, so later runs would only measure the no-op path).
+    Cases with `writes=True` modify data and are skipped against an existing
+    database unless explicitly requested.
+    """
+    def decorator(func):
+        BENCHMARKS.append({'name': name, 'func': func, 'repeat': repeat, 'writes': writes})
+        return func
+    return decorator
+
+
+class BenchmarkContext:
+    def __init__(self, repeat=3):
+        self.repeat = repeat
+        self._client = None
+        self._user = None
+        self._pages = None
+
+    @property
+    def user(self):
+        """The user with the most deposits, i.e. the heaviest account to render"""
+        if self._user is None:
+            self._user = (
+                User.objects.annotate(deposit_count=Count('deposits'))
+                .order_by('-deposit_count', 'id')
+                .first()
+            )
+        return self._user
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = APIClient()
+            self._client.force_authenticate(self.user)
+        return self._client
+
+    @property
+    def pages(self):
+        """100-row serialized pages of the largest API lists, for the renderer cases"""
+        if self._pages is None:
+            from .models import DailyEarning, Deposit, Transaction
+            from .serializers import DailyEarningSerializer, DepositDetailSerializer, TransactionSerializer
+            pages = (
+                (TransactionSerializer, Transaction.objects.order_by('-created_at', '-id')),
+                (DailyEarningSerializer, DailyEarning.objects.order_by('-earned_date', '-id')),
+                (
+                    DepositDetailSerializer,
+                    Deposit.objects.select_related('package', 'user', 'approved_by').order_by('-created_at'),
+                ),
+            )
+            self._pages = [
+                {'next': None, 'previous': None, 'results': serializer(queryset[:100], many=True).data}
+                for serializer, queryset in pages
+            ]
+        return self._pages
+
+    def get(self, path, **params):
+        response = self.client.get(path, params)
+        if response.status_code != 200:
+            raise AssertionError(f'GET {path} returned {response.status_code}')
+        return response
+
+
+def measure(case, context):
+    """Run one case and return {'wall_ms', 'queries'} or {'error'}"""
+    runs = context.repeat if case['repeat'] else 1
+    timings = []
+    queries = 0
+    try:
+        for _ in range(runs):
+            # Count queries on every alias, so replica runs are measured too
+            with ExitStack() as stack:
+                captured = [stack.enter_context(CaptureQueriesContext(conn)) for conn in connections.all()]
+                start = time.perf_counter()
+                case['func'](context)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries = sum(len(capture.captured_queries) for capture in captured)
+    except Exception as exc:
+        return {'error': f'{type(exc).__name__}: {exc}'}
+    return {'wall_ms': round(statistics.median(timings), 2), 'queries': queries}
+
+
+def compare(results, baseline, tolerance=0.25, noise_floor_ms=5.0):
+    """
+    Return a list of regression messages for `results` against `baseline`.
+
+    Both are {dataset: {case: measurement}}. A case regresses when it now
+    errors, issues more queries, or is slower by more than `tolerance`
+    (fractional) and `noise_floor_ms`.
+    """
+    regressions = []
+    for dataset, cases in results.items():
+        for name, current in cases.items():
+            previous = baseline.get(dataset, {}).get(name)
+            if not previous or 'error' in previous:
+                continue
+            label = f'{dataset}/{name}'
+            if 'error' in current:
+                regressions.append(f'{label}: now fails ({current["error"]})')
+                continue
+            if current['queries'] > previous['queries']:
+                regressions.append(
+                    f'{label}: queries {previous["queries"]} -> {current["queries"]}'
+                )
+            allowed = previous['wall_ms'] * (1 + tolerance)
+            if current['wall_ms'] > allowed and current['wall_ms'] - previous['wall_ms'] > noise_floor_ms:
+                regressions.append(
+                    f'{label}: {previous["wall_ms"]}ms -> {current["wall_ms"]}ms'
+                )
+    return regressions
+
+
+@benchmark('api.my_wallet')
+def bench_my_wallet(context):
+    context.get('/api/core/wallet/')
+
+
+@benchmark('api.balance')
+def bench_balance(context):
+    context.get('/api/core/wallet/balance/')
+
+
+@benchmark('api.balance_new_connection')
+def bench_balance_new_connection(context):
+    # A request on a fresh connection, as for a new worker thread or after
+    # CONN_MAX_AGE; with DATABASE_POOL the connection setup comes from the pool
+    connection.close()
+    context.get('/api/core/wallet/balance/')
+
+
+@benchmark('api.my_deposits')
+def bench_my_deposits(context):
+    context.get('/api/core/deposits/my_deposits/')
+
+
+@benchmark('api.product_list')
+def bench_product_list(context):
+    context.get('/api/core/products/')
+
+
+@benchmark('render.drf_json')
+def bench_render_drf_json(context):
+    from rest_framework.renderers import JSONRenderer
+    renderer = JSONRenderer()
+    for page in context.pages:
+        renderer.render(page)
+
+
+@benchmark('render.orjson')
+def bench_render_orjson(context):
+    from config.renderers import ORJSONRenderer
+    renderer = ORJSONRenderer()
+    for page in context.pages:
+        renderer.render(page)
+
+
+def list_pages():
+    """(queryset, ModelSerializer, ValuesListSerializer) for each fast list endpoint"""
+    from .models import DailyEarning, Deposit, Order, Transaction, Withdrawal
+    from . import serializers
+    return (
+        (Transaction.objects.order_by('-created_at', '-id'),
+         serializers.TransactionSerializer, serializers.TransactionListSerializer),
+        (DailyEarning.objects.order_by('-earned_date', '-id'),
+         serializers.DailyEarningSerializer, serializers.DailyEarningListSerializer),
+        (Deposit.objects.order_by('-created_at'),
+         serializers.DepositDetailSerializer, serializers.DepositListSerializer),
+        (Withdrawal.objects.order_by('-created_at'),
+         serializers.WithdrawalDetailSerializer, serializers.WithdrawalListSerializer),
+        (Order.objects.order_by('-created_at'),
+         serializers.OrderDetailSerializer, serializers.OrderListSerializer),
+    )
+
+
+@benchmark('serialize.model_pages')
+def bench_serialize_model_pages(context):
+    for queryset, serializer_class, _ in list_pages():
+        serializer_class(queryset[:100], many=True).data
+
+
+@benchmark('serialize.values_pages')
+def bench_serialize_values_pages(context):
+    for queryset, _, list_serializer_class in list_pages():
+        list_serializer_class(list_serializer_class.values(queryset)[:100]).data
+
+
+@benchmark('report.users_excel')
+def bench_users_report(context):
+    from .reports import generate_users_report_excel
+    generate_users_report_excel()
+
+
+@benchmark('report.earnings_excel')
+def bench_earnings_report(context):
+    from .reports import generate_earnings_report_excel
+    generate_earnings_report_excel()
+
+
+@benchmark('report.orders_excel')
+def bench_orders_report(context):
+    from .reports import generate_orders_report_excel
+    generate_orders_report_excel()
+
+
+@benchmark('engine.calculate_daily_earnings', repeat=False, writes=True)
+def bench_calculate_daily_earnings(context):
+    from .services import EarningService
+    EarningService.calculate_daily_earnings()
+
+
+@benchmark('engine.process_referral_earnings', repeat=False, writes=True)
+def bench_process_referral_earnings(context):
+    from .services import EarningService
+    EarningService.process_referral_earnings()
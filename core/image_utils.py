@@ -1,7 +1,11 @@
 import uuid
 import os
+import time
 import logging
 from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from config.metrics import STORAGE_UPLOAD_LATENCY
 from supabase import create_client, Client
 
 logger = logging.getLogger(__name__)
@@ -38,6 +42,8 @@ def upload_image_to_supabase(file, folder: str = "deposits") -> str:
     Returns:
         Public URL of uploaded image
     """
+    start = time.monotonic()
+    outcome = 'error'
     try:
         if not file:
             raise ValueError("No file provided")
@@ -77,11 +83,14 @@ def upload_image_to_supabase(file, folder: str = "deposits") -> str:
         public_url = f"{supabase_url}/storage/v1/object/public/{bucket_name}/{file_path}"
         
         logger.info(f"Upload successful! URL: {public_url}")
+        outcome = 'success'
         return public_url
         
     except Exception as e:
         logger.error(f"Failed to upload image to Supabase: {str(e)}", exc_info=True)
         raise Exception(f"Failed to upload image to Supabase: {str(e)}")
+    finally:
+        STORAGE_UPLOAD_LATENCY.observe(time.monotonic() - start, folder=folder, outcome=outcome)
 
 
 def delete_image_from_supabase(image_url: str) -> bool:
@@ -106,3 +115,26 @@ def delete_image_from_supabase(image_url: str) -> bool:
     except Exception as e:
         logger.error(f"Failed to delete image from Supabase: {str(e)}", exc_info=True)
         return False
+
+
+def stage_image(file, folder: str) -> str:
+    """
+    Save an uploaded image to default storage for a background upload
+    
+    Returns:
+        Storage name of the staged file
+    """
+    file_extension = file.name.split('.')[-1].lower()
+    if not file_extension:
+        raise ValueError(f"Invalid file name: {file.name}")
+    return default_storage.save(f"pending_uploads/{folder}/{uuid.uuid4()}.{file_extension}", file)
+
+
+def upload_staged_image(name: str, folder: str, content_type: str) -> str:
+    """Upload a file saved by stage_image to Supabase, then remove the staged copy"""
+    with default_storage.open(name) as staged:
+        upload = ContentFile(staged.read(), name=name.rsplit('/', 1)[-1])
+    upload.content_type = content_type
+    public_url = upload_image_to_supabase(upload, folder=folder)
+    default_storage.delete(name)
+    return public_url
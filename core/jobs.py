@@ -0,0 +1,228 @@
+"""
+Background jobs stored in the main database.
+
+Work is registered with `@task(name)` (see core/tasks.py), queued with
+`enqueue(name, payload)` and executed by `manage.py run_worker`. Workers
+claim jobs with `SELECT ... FOR UPDATE SKIP LOCKED` where the database
+supports it, and with a conditional UPDATE on SQLite. A claimed job is
+locked for its `timeout`; if the worker dies, the job becomes claimable
+again once the lock expires. Failures are retried with exponential backoff
+up to `max_attempts`.
+
+With JOBS_EAGER=True jobs run inline right after the enqueuing transaction
+commits, which is convenient in development when no worker is running.
+Otherwise a worker is a required process. Workers record a heartbeat with
+`beat`; while none is alive the scheduler leader runs due earnings jobs
+itself, and `check_backlog` reports jobs nobody has claimed for
+JOB_STALE_AFTER.
+"""
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from config.metrics import JOB_DURATION, JOB_RUNS, JOBS_OVERDUE
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(name, priority=100, max_attempts=3, timeout=300):
+    """Register a function as the job `name`; it is called with the payload as keyword arguments"""
+    def decorator(func):
+        TASKS[name] = {
+            'func': func,
+            'priority': priority,
+            'max_attempts': max_attempts,
+            'timeout': timeout,
+        }
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, key=None, run_at=None, priority=None):
+    """
+    Queue the job `name` and return it.
+
+    With `key`, an existing job with the same key is returned instead of
+    queueing a duplicate (e.g. one earnings run per day).
+    """
+    from .models import Job
+
+    if name not in TASKS:
+        raise ValueError(f'Unknown job: {name}')
+    spec = TASKS[name]
+    fields = {
+        'name': name,
+        'payload': payload or {},
+        'priority': spec['priority'] if priority is None else priority,
+        'run_at': run_at or timezone.now(),
+        'max_attempts': spec['max_attempts'],
+        'timeout': spec['timeout'],
+    }
+
+    if key is None:
+        job = Job.objects.create(**fields)
+    else:
+        try:
+            with transaction.atomic():
+                job, created = Job.objects.get_or_create(key=key, defaults=fields)
+        except IntegrityError:
+            return Job.objects.get(key=key)
+        if not created:
+            return job
+
+    if getattr(settings, 'JOBS_EAGER', False):
+        transaction.on_commit(lambda: run_job(job.pk, 'eager'))
+    return job
+
+
+def _claimable(now):
+    from .models import Job
+
+    return Job.objects.filter(
+        Q(status='queued', run_at__lte=now)
+        | Q(status='running', locked_until__lt=now, attempts__lt=F('max_attempts'))
+    )
+
+
+def claim(worker_id, job_id=None):
+    """Lock the next due job (or `job_id`) for `worker_id`; returns it or None"""
+    from .models import Job
+
+    now = timezone.now()
+    candidates = _claimable(now).order_by('priority', 'run_at', 'id')
+    if job_id is not None:
+        candidates = candidates.filter(pk=job_id)
+
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            rows = candidates.select_for_update(skip_locked=True).values_list('pk', 'timeout')[:1]
+        else:
+            # SQLite has no row locks; the conditional UPDATE below decides
+            # which worker wins, and losers move on to the next candidate.
+            rows = candidates.values_list('pk', 'timeout')[:10]
+
+        for pk, timeout in rows:
+            claimed = _claimable(now).filter(pk=pk).update(
+                status='running',
+                locked_by=worker_id,
+                locked_until=now + timedelta(seconds=timeout),
+                attempts=F('attempts') + 1,
+                started_at=now,
+            )
+            if claimed:
+                return Job.objects.get(pk=pk)
+    return None
+
+
+def execute(job):
+    """Run a claimed job and record its outcome"""
+    from .models import Job
+
+    spec = TASKS.get(job.name)
+    owned = Job.objects.filter(pk=job.pk, status='running', locked_by=job.locked_by)
+    start = time.monotonic()
+    try:
+        if spec is None:
+            raise LookupError(f'No task registered as {job.name}')
+        result = spec['func'](**job.payload)
+    except Exception as e:
+        JOB_RUNS.inc(task=job.name, outcome='error')
+        logger.error(f'Job {job} failed: {str(e)}', exc_info=True)
+        now = timezone.now()
+        error = traceback.format_exc()[-4000:]
+        if job.attempts < job.max_attempts:
+            delay = getattr(settings, 'JOB_RETRY_DELAY', 30) * 2 ** (job.attempts - 1)
+            owned.update(
+                status='queued', run_at=now + timedelta(seconds=delay),
+                locked_until=None, last_error=error,
+            )
+        else:
+            owned.update(status='failed', locked_until=None, last_error=error, finished_at=now)
+        return False
+    finally:
+        JOB_DURATION.observe(time.monotonic() - start, task=job.name)
+
+    JOB_RUNS.inc(task=job.name, outcome='success')
+    # A job whose lock expired may have been claimed by another worker
+    # meanwhile; `owned` then matches nothing and that run's outcome wins.
+    owned.update(
+        status='succeeded', result=result, locked_until=None,
+        last_error='', finished_at=timezone.now(),
+    )
+    return True
+
+
+def run_job(job_id, worker_id):
+    """Claim and run one specific job if it is due; used for eager execution"""
+    job = claim(worker_id, job_id=job_id)
+    if job is not None:
+        execute(job)
+
+
+def fail_expired():
+    """Mark jobs whose last attempt timed out as failed; returns how many"""
+    from .models import Job
+
+    now = timezone.now()
+    return Job.objects.filter(
+        status='running', locked_until__lt=now, attempts__gte=F('max_attempts')
+    ).update(status='failed', locked_until=None, last_error='Timed out', finished_at=now)
+
+
+def check_backlog():
+    """Count queued jobs overdue by more than JOB_STALE_AFTER, logging an error if any"""
+    from .models import Job
+
+    stale_after = getattr(settings, 'JOB_STALE_AFTER', 900)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    overdue = Job.objects.filter(status='queued', run_at__lt=cutoff)
+    count = overdue.count()
+    JOBS_OVERDUE.set(count)
+    if count:
+        oldest = overdue.order_by('run_at').values_list('name', 'run_at').first()
+        logger.error(
+            f'{count} background jobs have been due for over {stale_after}s without '
+            f'being claimed (oldest: {oldest[0]} due {oldest[1].isoformat()}). '
+            f'Is `manage.py run_worker` running?'
+        )
+    return count
+
+
+def beat(worker_id, started_at):
+    """Record that the worker process `worker_id` is alive"""
+    from .models import WorkerHeartbeat
+
+    WorkerHeartbeat.objects.update_or_create(
+        worker=worker_id, defaults={'started_at': started_at, 'last_seen': timezone.now()}
+    )
+
+
+def retire(worker_id):
+    """Forget a worker that is shutting down, and any that stopped beating a day ago"""
+    from .models import WorkerHeartbeat
+
+    WorkerHeartbeat.objects.filter(
+        Q(worker=worker_id) | Q(last_seen__lt=timezone.now() - timedelta(days=1))
+    ).delete()
+
+
+def workers_alive():
+    """Whether a worker has sent a heartbeat within WORKER_HEARTBEAT_TTL seconds"""
+    from .models import WorkerHeartbeat
+
+    ttl = getattr(settings, 'WORKER_HEARTBEAT_TTL', 120)
+    return WorkerHeartbeat.objects.filter(last_seen__gte=timezone.now() - timedelta(seconds=ttl)).exists()
+
+
+def worker_name(index=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from core.models import Wallet, Transaction
+from core.services import WalletService
 from users.models import User
 
 
@@ -21,15 +22,11 @@ class Command(BaseCommand):
             ).exists()
             
             if not transaction_exists:
-                wallet.signup_bonus += bonus_amount
-                wallet.balance += bonus_amount
-                wallet.save()
-                
-                Transaction.objects.create(
-                    user=user,
+                WalletService.credit(
+                    user,
+                    bonus_amount,
+                    fields=('signup_bonus', 'balance'),
                     transaction_type='deposit',
-                    amount=bonus_amount,
-                    status='completed',
                     description='Signup bonus'
                 )
                 count += 1
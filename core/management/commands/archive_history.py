@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from core.models import MiningPackage, Transaction, DailyEarning
+from core.services import ArchiveService
+
+
+class Command(BaseCommand):
+    help = 'Move old transactions and daily earnings into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.ARCHIVE_AFTER_DAYS,
+            help='Archive history older than this many days (rounded down to the start of the month)',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--export',
+            action='store_true',
+            help='Also write each archived batch as gzipped NDJSON to default storage',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be archived')
+
+    def handle(self, *args, **options):
+        # The engine relies on live DailyEarning rows to avoid crediting a
+        # running deposit twice, so never archive inside a package's term.
+        longest_term = MiningPackage.objects.aggregate(days=Max('duration_days'))['days'] or 0
+        if options['days'] <= longest_term:
+            raise CommandError(f'--days must be greater than the longest package duration ({longest_term} days)')
+
+        cutoff = ArchiveService.cutoff_for(options['days'])
+        self.stdout.write(f'Archiving history before {cutoff:%Y-%m-%d}...')
+
+        if options['dry_run']:
+            transactions = Transaction.objects.filter(created_at__lt=cutoff).count()
+            earnings = DailyEarning.objects.filter(earned_date__lt=cutoff.date()).count()
+            self.stdout.write(f'Would archive {transactions} transactions and {earnings} daily earnings')
+            return
+
+        stats = ArchiveService.archive(cutoff, batch_size=options['batch_size'], export=options['export'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {stats['transactions']} transactions and {stats['daily_earnings']} daily earnings"
+        ))
+        if stats['files']:
+            self.stdout.write(f"Wrote {len(stats['files'])} export files under archive/")
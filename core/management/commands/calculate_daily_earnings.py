@@ -1,21 +1,117 @@
-from django.core.management.base import BaseCommand
-from core.services import EarningService
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from config.metrics import record_earnings_run
+from core.profiling import phase, profile_run, profiling_requested
+from core.services import EarningService, SnapshotService
 
 
 class Command(BaseCommand):
     help = 'Calculate daily earnings for all users'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile',
+            action='store_true',
+            help='Write a cProfile, per-phase and SQL breakdown to PROFILE_DIR',
+        )
+        parser.add_argument(
+            '--since',
+            help='First credit every missed day from this date (YYYY-MM-DD) through yesterday',
+        )
+
     def handle(self, *args, **options):
+        since = None
+        if options.get('since'):
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+            if since >= timezone.now().date():
+                raise CommandError('--since must be a date before today')
+
+        if not profiling_requested(options.get('profile', False)):
+            self.run(since)
+            return
+
+        with profile_run('calculate_daily_earnings') as profile:
+            self.run(since)
+        self.stdout.write(f"Profile written to {profile['path']}")
+
+    def run(self, since=None):
+        # Every phase runs even if an earlier one failed; the command then
+        # exits with an error so the earnings.daily job is retried.
+        failed = []
+        if since and not self.catch_up(since):
+            failed.append('catch-up')
+
         self.stdout.write(self.style.SUCCESS('Starting daily earnings calculation...'))
         
+        start = time.monotonic()
         try:
-            EarningService.calculate_daily_earnings()
-            self.stdout.write(self.style.SUCCESS('Daily earnings calculated successfully'))
+            stats = EarningService.calculate_daily_earnings()
+            record_earnings_run('daily', time.monotonic() - start, stats)
+            self.stdout.write(self.style.SUCCESS(
+                f"Daily earnings calculated successfully "
+                f"({stats['processed']} deposits, {stats['rows_written']} rows)"
+            ))
         except Exception as e:
+            record_earnings_run('daily', time.monotonic() - start, error=e)
             self.stdout.write(self.style.ERROR(f'Error calculating daily earnings: {str(e)}'))
+            failed.append('earnings')
         
+        start = time.monotonic()
         try:
-            EarningService.process_referral_earnings()
-            self.stdout.write(self.style.SUCCESS('Referral earnings processed successfully'))
+            with phase('referral'):
+                stats = EarningService.process_referral_earnings()
+            record_earnings_run('referral', time.monotonic() - start, stats)
+            self.stdout.write(self.style.SUCCESS(
+                f"Referral earnings processed successfully "
+                f"({stats['processed']} referrals, {stats['rows_written']} rows)"
+            ))
         except Exception as e:
+            record_earnings_run('referral', time.monotonic() - start, error=e)
             self.stdout.write(self.style.ERROR(f'Error processing referral earnings: {str(e)}'))
+            failed.append('referrals')
+
+        try:
+            with phase('settle'):
+                settled = EarningService.settle_matured_deposits()
+            self.stdout.write(self.style.SUCCESS(f'Matured deposits settled ({settled} deposits)'))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error settling matured deposits: {str(e)}'))
+            failed.append('settlement')
+
+        try:
+            with phase('snapshot'):
+                written = SnapshotService.capture(timezone.now().date())
+            self.stdout.write(self.style.SUCCESS(f'Wallet snapshots written ({written} wallets)'))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error writing wallet snapshots: {str(e)}'))
+            failed.append('snapshots')
+
+        if failed:
+            raise CommandError(f"Daily earnings run failed: {', '.join(failed)}")
+
+    def catch_up(self, since):
+        self.stdout.write(self.style.SUCCESS(f'Catching up missed days since {since}...'))
+        start = time.monotonic()
+        try:
+            results = EarningService.catch_up(since)
+        except Exception as e:
+            record_earnings_run('catch_up', time.monotonic() - start, error=e)
+            self.stdout.write(self.style.ERROR(f'Error catching up earnings: {str(e)}'))
+            return False
+
+        totals = {'processed': 0, 'rows_written': 0}
+        for day, stats in results.items():
+            totals['processed'] += stats['processed']
+            totals['rows_written'] += stats['rows_written'] + stats['referrals']
+            self.stdout.write(
+                f"  {day}: {stats['processed']} deposits, "
+                f"{stats['rows_written'] + stats['referrals']} rows"
+            )
+        record_earnings_run('catch_up', time.monotonic() - start, totals)
+        return True
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Show per-bucket progress of a staggered daily earnings run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Earnings date (YYYY-MM-DD), default today')
+
+    def handle(self, *args, **options):
+        day = timezone.now().date()
+        if options['date']:
+            try:
+                day = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--date must be a date in YYYY-MM-DD format')
+
+        jobs = list(
+            Job.objects.filter(name='earnings.bucket', key__startswith=f'earnings.bucket:{day}:')
+            .order_by('run_at', 'id')
+        )
+        if not jobs:
+            self.stdout.write(self.style.WARNING(f'No staggered earnings buckets queued for {day}'))
+            return
+
+        done = 0
+        for job in jobs:
+            result = job.result or {}
+            line = (
+                f"  bucket {job.payload['bucket']:>3}/{job.payload['buckets']}  {job.status:<9}  "
+                f"run_at {timezone.localtime(job.run_at):%H:%M}  attempts {job.attempts}"
+            )
+            if job.status == 'succeeded':
+                done += 1
+                line += f"  {result.get('processed', 0)} deposits, {result.get('rows_written', 0)} rows"
+            self.stdout.write(self.style.ERROR(line) if job.status == 'failed' else line)
+
+        referrals = Job.objects.filter(key=f'earnings.referrals:{day}').first()
+        if referrals is not None:
+            line = f"  referrals   {referrals.status:<9}  attempts {referrals.attempts}"
+            if referrals.status == 'succeeded':
+                line += f"  {(referrals.result or {}).get('rows_written', 0)} rows"
+            self.stdout.write(self.style.ERROR(line) if referrals.status == 'failed' else line)
+
+        style = self.style.SUCCESS if done == len(jobs) else self.style.WARNING
+        self.stdout.write(style(f'{done}/{len(jobs)} buckets done for {day}'))
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from core.services import SummaryService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the UserDailySummary rollup from DailyEarning and its archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Only rebuild this user id (repeatable)',
+        )
+        parser.add_argument(
+            '--since',
+            help='Only rebuild days on or after this date (YYYY-MM-DD)',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+
+        created = SummaryService.rebuild(user_ids=options['user_ids'], since=since)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} daily summaries'))
@@ -0,0 +1,59 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from core.services import LedgerService, ReconciliationService
+
+
+class Command(BaseCommand):
+    help = 'Recompute wallet columns from the transaction ledger, report differences and optionally fix them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Only reconcile this user id (repeatable)',
+        )
+        parser.add_argument(
+            '--tolerance',
+            default='0',
+            help='Ignore differences up to this amount (e.g. 0.01 for rounding noise)',
+        )
+        parser.add_argument('--show', type=int, default=20, help='Number of mismatched wallets to print')
+        parser.add_argument('--apply', action='store_true', help='Write the ledger values to mismatched wallets')
+
+    def handle(self, *args, **options):
+        try:
+            tolerance = Decimal(options['tolerance'])
+        except InvalidOperation:
+            raise CommandError('--tolerance must be a decimal amount')
+
+        mismatches = ReconciliationService.diff(options['user_ids'], tolerance)
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('All wallets match the ledger'))
+            return
+
+        drift = {field: Decimal('0') for field in LedgerService.WALLET_FIELDS}
+        for wallet, expected in mismatches:
+            for field, value in expected.items():
+                drift[field] += abs(wallet[field] - value)
+
+        self.stdout.write(self.style.WARNING(f'{len(mismatches)} wallets differ from the ledger'))
+        for field, amount in drift.items():
+            if amount:
+                self.stdout.write(f'  {field}: total drift ₨{amount:,.2f}')
+
+        for wallet, expected in mismatches[:options['show']]:
+            changes = ', '.join(
+                f'{field} {wallet[field]} -> {value}' for field, value in expected.items()
+            )
+            self.stdout.write(f"  user {wallet['user_id']}: {changes}")
+
+        if options['apply']:
+            updated = ReconciliationService.apply(
+                [wallet['user_id'] for wallet, _ in mismatches], tolerance
+            )
+            self.stdout.write(self.style.SUCCESS(f'Corrected {updated} wallets'))
+        else:
+            self.stdout.write('Run with --apply to correct them')
@@ -0,0 +1,135 @@
+import json
+import os
+import platform
+from contextlib import nullcontext
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from config.db_router import replica_configured, replica_reads
+from core.benchmarks import BENCHMARKS, BenchmarkContext, compare, measure
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the earnings engine, report generators and hot API endpoints '
+        'against seeded datasets and compare with a stored baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='100,1000',
+            help='Comma-separated user counts to seed, one dataset per size',
+        )
+        parser.add_argument('--days', type=int, default=30, help='Days of seeded history')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per read-only case (median is kept)')
+        parser.add_argument('--only', help='Comma-separated case name prefixes to run, e.g. api,engine')
+        parser.add_argument('--output', default='benchmarks/results.json')
+        parser.add_argument('--baseline', default='benchmarks/baseline.json')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed fractional slowdown')
+        parser.add_argument('--update-baseline', action='store_true', help='Store these results as the baseline')
+        parser.add_argument(
+            '--use-existing', action='store_true',
+            help='Benchmark the configured database as-is instead of seeding a test database',
+        )
+        parser.add_argument(
+            '--include-writes', action='store_true',
+            help='With --use-existing, also run cases that write (the earnings engine)',
+        )
+        parser.add_argument(
+            '--replica', action='store_true',
+            help='With --use-existing, run reads against the replica (REPLICA_DATABASE_URL)',
+        )
+
+    def handle(self, *args, **options):
+        cases = BENCHMARKS
+        if options['only']:
+            prefixes = tuple(prefix.strip() for prefix in options['only'].split(','))
+            cases = [case for case in cases if case['name'].startswith(prefixes)]
+
+        if options['replica']:
+            if not options['use_existing']:
+                raise CommandError('--replica requires --use-existing')
+            if not replica_configured():
+                raise CommandError('--replica requires REPLICA_DATABASE_URL to be set')
+
+        results = {}
+        if options['use_existing']:
+            if not options['include_writes']:
+                cases = [case for case in cases if not case['writes']]
+            results['existing'] = self.run_cases(cases, options)
+        else:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                for size in sizes:
+                    self.stdout.write(f'Seeding {size} users...')
+                    call_command('flush', interactive=False, verbosity=0)
+                    call_command(
+                        'seed_scale_data', users=size, days=options['days'],
+                        seed=options['seed'], allow_production=True, stdout=StringIO(),
+                    )
+                    results[f'users_{size}'] = self.run_cases(cases, options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        payload = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'debug': settings.DEBUG,
+                'replica': options['replica'],
+                'pool': getattr(settings, 'DATABASE_POOL', False),
+            },
+            'results': results,
+        }
+        self.write_json(options['output'], payload)
+        self.stdout.write(f'Results written to {options["output"]}')
+
+        if options['update_baseline']:
+            self.write_json(options['baseline'], payload)
+            self.stdout.write(self.style.SUCCESS(f'Baseline updated at {options["baseline"]}'))
+            return
+
+        if not os.path.exists(options['baseline']):
+            self.stdout.write(self.style.WARNING('No baseline found; run with --update-baseline to store one.'))
+            return
+
+        with open(options['baseline']) as fh:
+            baseline = json.load(fh)['results']
+        regressions = compare(results, baseline, options['tolerance'])
+        if regressions:
+            for message in regressions:
+                self.stdout.write(self.style.ERROR(f'  {message}'))
+            raise CommandError(f'{len(regressions)} benchmark regression(s) against baseline')
+        self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
+
+    def run_cases(self, cases, options):
+        context = BenchmarkContext(repeat=options['repeat'])
+        measurements = {}
+        for case in cases:
+            with replica_reads() if options['replica'] else nullcontext():
+                result = measure(case, context)
+            measurements[case['name']] = result
+            if 'error' in result:
+                self.stdout.write(self.style.WARNING(f'  {case["name"]}: {result["error"]}'))
+            else:
+                self.stdout.write(
+                    f'  {case["name"]}: {result["wall_ms"]}ms, {result["queries"]} queries'
+                )
+        return measurements
+
+    @staticmethod
+    def write_json(path, payload):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as fh:
+            json.dump(payload, fh, indent=2, sort_keys=True)
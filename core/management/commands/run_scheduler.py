@@ -14,13 +14,18 @@ class Command(BaseCommand):
             action='store_true',
             help='Run in test mode (executes immediately)',
         )
+        parser.add_argument(
+            '--profile',
+            action='store_true',
+            help='With --test, profile the run and write the report to PROFILE_DIR',
+        )
 
     def handle(self, *args, **options):
         if options['test']:
             self.stdout.write(self.style.SUCCESS('Running earnings calculation in test mode...'))
             from core.management.commands.calculate_daily_earnings import Command as EarningsCommand
             cmd = EarningsCommand()
-            cmd.handle()
+            cmd.handle(profile=options['profile'])
             return
 
         self.stdout.write(self.style.SUCCESS('Starting background scheduler...'))
@@ -0,0 +1,97 @@
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connections
+from config import query_stats
+from django.utils import timezone
+from core.jobs import beat, claim, execute, fail_expired, retire, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help='Number of worker threads')
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait before polling again when the queue is empty',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once no jobs are due instead of waiting for more',
+        )
+
+    def handle(self, *args, **options):
+        query_stats.install()
+        self.stop = threading.Event()
+
+        def signal_handler(sig, frame):
+            self.stdout.write('\nFinishing current jobs, then stopping...')
+            self.stop.set()
+
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+
+        self.stdout.write(self.style.SUCCESS(f"Starting {options['concurrency']} job worker(s)..."))
+        threads = [
+            threading.Thread(target=self.work, args=(index, options), name=f'job-worker-{index}', daemon=True)
+            for index in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+
+        # The scheduler runs earnings jobs itself while no worker heartbeat is fresh
+        process_id = worker_name().rsplit(':', 1)[0]
+        started_at = timezone.now()
+        interval = getattr(settings, 'WORKER_HEARTBEAT_TTL', 120) / 4
+        last_beat = None
+        while any(thread.is_alive() for thread in threads):
+            if last_beat is None or time.monotonic() - last_beat >= interval:
+                try:
+                    beat(process_id, started_at)
+                except DatabaseError as e:
+                    self.stdout.write(self.style.ERROR(f'Could not record worker heartbeat: {str(e)}'))
+                last_beat = time.monotonic()
+            for thread in threads:
+                thread.join(timeout=0.5)
+        try:
+            retire(process_id)
+        except DatabaseError:
+            pass
+        connections.close_all()
+        self.stdout.write(self.style.SUCCESS('Job workers stopped'))
+
+    def work(self, index, options):
+        worker_id = worker_name(index)
+        last_sweep = 0.0
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                try:
+                    if index == 0 and time.monotonic() - last_sweep > 60:
+                        fail_expired()
+                        last_sweep = time.monotonic()
+                    job = claim(worker_id)
+                except DatabaseError as e:
+                    self.stdout.write(self.style.ERROR(f'[{worker_id}] Could not claim a job: {str(e)}'))
+                    self.stop.wait(max(options['poll_interval'], 5))
+                    continue
+
+                if job is None:
+                    if options['burst']:
+                        return
+                    self.stop.wait(options['poll_interval'])
+                    continue
+
+                succeeded = execute(job)
+                query_stats.flush_if_due()
+                style = self.style.SUCCESS if succeeded else self.style.ERROR
+                self.stdout.write(style(f"[{worker_id}] {job.name} #{job.pk} {'done' if succeeded else 'failed'}"))
+        finally:
+            connections.close_all()
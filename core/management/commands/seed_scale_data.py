@@ -0,0 +1,410 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import (
+    MiningPackage, Deposit, Wallet, DailyEarning, Transaction, Referral,
+    Withdrawal, Category, Product, Order, ROISetting, ReinvestSetting
+)
+from core.services import EarningService, SnapshotService, SummaryService
+from users.models import User
+
+
+CENT = Decimal('0.01')
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk inserts keep the created_at/updated_at values we generate"""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+class BulkWriter:
+    """Buffer model instances and bulk_create them in fixed-size batches"""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.buffers = {}
+        self.counts = {}
+
+    def add(self, obj):
+        buffer = self.buffers.setdefault(type(obj), [])
+        buffer.append(obj)
+        if len(buffer) >= self.batch_size:
+            self.flush(type(obj))
+
+    def flush(self, model=None):
+        for key in ([model] if model else list(self.buffers)):
+            buffer = self.buffers.get(key)
+            if buffer:
+                key.objects.bulk_create(buffer, batch_size=self.batch_size)
+                self.counts[key.__name__] = self.counts.get(key.__name__, 0) + len(buffer)
+                buffer.clear()
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a deterministic, production-shaped dataset (users with referral trees, '
+        'deposits, wallets, earning/transaction history, products and orders) for load testing'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to create')
+        parser.add_argument('--days', type=int, default=90, help='Days of history to generate')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk INSERT')
+        parser.add_argument('--prefix', default='seed', help='Prefix for generated emails and codes')
+        parser.add_argument('--end-date', help='Last day of history (YYYY-MM-DD), defaults to yesterday')
+        parser.add_argument(
+            '--allow-production',
+            action='store_true',
+            help='Allow running with DEBUG=False',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['allow_production']:
+            raise CommandError('Refusing to seed with DEBUG=False; pass --allow-production to override.')
+
+        self.rng = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        self.writer = BulkWriter(options['batch_size'])
+        if options['end_date']:
+            self.end_date = datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+        else:
+            self.end_date = timezone.now().date() - timedelta(days=1)
+        self.start_date = self.end_date - timedelta(days=options['days'] - 1)
+
+        if User.objects.filter(email__startswith=f'{self.prefix}-').exists():
+            raise CommandError(f'Users with prefix "{self.prefix}" already exist; choose another --prefix.')
+
+        started = time.monotonic()
+        call_command('setup_initial_data', stdout=StringIO())
+        self.packages = list(MiningPackage.objects.filter(is_active=True))
+        roi_setting = ROISetting.objects.filter(is_active=True).first()
+        if roi_setting:
+            self.roi_percentage = (roi_setting.min_percentage + roi_setting.max_percentage) / 2
+        else:
+            self.roi_percentage = Decimal('1.0')
+        reinvest = ReinvestSetting.objects.filter(is_active=True).first()
+        self.reinvest_percentage = reinvest.percentage if reinvest else Decimal('0')
+
+        models = (User, Deposit, Wallet, DailyEarning, Transaction, Referral, Withdrawal, Product, Order, Category)
+        with explicit_timestamps(*models), transaction.atomic():
+            users = self.create_users(options['users'])
+            self.stdout.write(f'Created {len(users)} users')
+            self.create_history(users)
+            self.create_catalog_and_orders(users)
+            self.writer.flush()
+            self.writer.counts['UserDailySummary'] = SummaryService.rebuild(
+                user_ids=User.objects.filter(email__startswith=f'{self.prefix}-').values('id')
+            )
+            self.writer.counts['WalletSnapshot'] = SnapshotService.capture(self.end_date)
+
+        elapsed = time.monotonic() - started
+        for name, count in sorted(self.writer.counts.items()):
+            self.stdout.write(f'  {name}: {count}')
+        total = sum(self.writer.counts.values())
+        self.stdout.write(self.style.SUCCESS(f'Seeded {total} rows in {elapsed:.1f}s'))
+
+    def random_moment(self, day):
+        seconds = self.rng.randrange(86400)
+        return timezone.make_aware(datetime.combine(day, dt_time.min)) + timedelta(seconds=seconds)
+
+    def random_day(self, start=None):
+        start = start or self.start_date
+        span = (self.end_date - start).days
+        return start + timedelta(days=self.rng.randint(0, max(span, 0)))
+
+    def create_users(self, count):
+        password = make_password('password')
+        code_prefix = self.prefix.upper()[:8]
+        users = []
+        for index in range(count):
+            joined = self.random_moment(self.start_date)
+            email = f'{self.prefix}-{index}@example.com'
+            users.append(User(
+                username=email,
+                email=email,
+                password=password,
+                first_name='Seed',
+                last_name=str(index),
+                referral_code=f'{code_prefix}{index:010d}'[:20],
+                date_joined=joined,
+                created_at=joined,
+                updated_at=joined,
+            ))
+        User.objects.bulk_create(users, batch_size=self.writer.batch_size)
+        self.writer.counts['User'] = count
+        users = list(
+            User.objects.filter(email__startswith=f'{self.prefix}-').order_by('id')
+        )
+
+        # Most users are referred by someone who joined shortly before them,
+        # which produces chains several levels deep.
+        referred = []
+        for index, user in enumerate(users[1:], start=1):
+            if self.rng.random() < 0.8:
+                window = max(1, min(index, 25))
+                user.referred_by = users[index - self.rng.randint(1, window)]
+                referred.append(user)
+        # bulk_update builds one CASE branch per row, so keep its batches small.
+        User.objects.bulk_update(referred, ['referred_by'], batch_size=500)
+
+        by_id = {user.id: user for user in users}
+        for user in users:
+            upline = by_id.get(user.referred_by_id)
+            level = 1
+            while upline and level <= 3:
+                self.writer.add(Referral(
+                    referrer_id=upline.id,
+                    referral_user_id=user.id,
+                    level=level,
+                    commission_percentage=EarningService.get_referral_commission(level),
+                    created_at=user.created_at,
+                ))
+                upline = by_id.get(upline.referred_by_id)
+                level += 1
+        self.users_by_id = by_id
+        return users
+
+    def create_history(self, users):
+        wallets = {
+            user.id: {
+                'mining_income': Decimal('0'), 'roi_earnings': Decimal('0'),
+                'referral_earnings': Decimal('0'), 'signup_bonus': Decimal('100'),
+                'balance': Decimal('100'), 'last_earning_date': None,
+            }
+            for user in users
+        }
+
+        for user in users:
+            self.add_transaction(user.id, 'deposit', Decimal('100'), 'Signup bonus', user.created_at)
+
+        deposits = []
+        for user in users:
+            for _ in range(self.rng.choice((0, 1, 1, 1, 2, 2, 3))):
+                deposits.append(self.build_deposit(user))
+        Deposit.objects.bulk_create(deposits, batch_size=self.writer.batch_size)
+        self.writer.counts['Deposit'] = len(deposits)
+
+        approved_by_user = {}
+        for deposit in deposits:
+            self.add_transaction(
+                deposit.user_id, 'deposit', deposit.amount,
+                f'Deposit for {deposit.package.name}', deposit.created_at,
+            )
+            if deposit.status in Deposit.FUNDED_STATUSES:
+                approved_by_user.setdefault(deposit.user_id, []).append(deposit)
+
+        for user_id, approved in approved_by_user.items():
+            self.accrue_user(self.users_by_id[user_id], approved, wallets)
+
+        for user in users:
+            wallet = wallets[user.id]
+            if wallet['balance'] > Decimal('1500') and self.rng.random() < 0.3:
+                self.create_withdrawal(user, wallet)
+
+        for user in users:
+            wallet = wallets[user.id]
+            self.writer.add(Wallet(
+                user_id=user.id,
+                created_at=user.created_at,
+                updated_at=self.random_moment(self.end_date),
+                **wallet,
+            ))
+
+    def build_deposit(self, user):
+        package = self.rng.choice(self.packages)
+        created_on = self.random_day(max(self.start_date, user.created_at.date()))
+        created_at = self.random_moment(created_on)
+        status = self.rng.choices(('approved', 'pending', 'rejected'), weights=(75, 15, 10))[0]
+        approved_at = created_at + timedelta(hours=self.rng.randint(1, 36)) if status == 'approved' else None
+        if approved_at and approved_at.date() > self.end_date:
+            status, approved_at = 'pending', None
+        matures_on = approved_at.date() + timedelta(days=package.duration_days) if approved_at else None
+        if matures_on and matures_on <= self.end_date:
+            status = 'matured'
+
+        return Deposit(
+            user_id=user.id,
+            package=package,
+            amount=package.price,
+            status=status,
+            payment_method=self.rng.choice(('bank_transfer', 'card', 'crypto')),
+            transaction_id=f'{self.prefix}-{self.rng.getrandbits(48):012x}',
+            account_name=f'{user.first_name} {user.last_name}',
+            approved_at=approved_at,
+            matures_on=matures_on,
+            rejection_reason='Payment not received' if status == 'rejected' else '',
+            created_at=created_at,
+            updated_at=approved_at or created_at,
+        )
+
+    def accrue_user(self, user, deposits, wallets):
+        """Replay approvals, upline commissions and the daily engine for one user's approved deposits"""
+        wallet = wallets[user.id]
+        deposits.sort(key=lambda deposit: deposit.approved_at)
+        for deposit in deposits:
+            package = deposit.package
+            wallet['mining_income'] += deposit.amount
+            wallet['balance'] += deposit.amount
+            self.add_transaction(
+                user.id, 'deposit', deposit.amount,
+                f'Deposit approved for {package.name}', deposit.approved_at,
+            )
+            self.pay_upline_commissions(user, deposit, wallets, deposit.approved_at)
+
+        # Earnings compound on the running balance the same way the daily
+        # engine computes ROI, one day at a time.
+        day = deposits[0].approved_at.date()
+        while day <= self.end_date:
+            active = [
+                deposit for deposit in deposits
+                if deposit.approved_at.date() <= day
+                and (day - deposit.approved_at.date()).days < deposit.package.duration_days
+            ]
+            if not active and day > deposits[-1].approved_at.date():
+                break
+            moment = timezone.make_aware(datetime.combine(day, dt_time.min))
+            for deposit in active:
+                moment += timedelta(seconds=self.rng.randrange(1, 30))
+                self.accrue_day(user, deposit, day, moment, wallet)
+            day += timedelta(days=1)
+
+    def accrue_day(self, user, deposit, day, moment, wallet):
+        package = deposit.package
+        mining = package.daily_earning
+        roi = (wallet['balance'] * self.roi_percentage / 100).quantize(CENT)
+        reinvest = ((mining + roi) * self.reinvest_percentage / 100).quantize(CENT)
+        for earning_type, amount, description in (
+            ('mining', mining, f'Daily mining from {package.name}'),
+            ('roi', roi, f'Daily ROI earning ({self.roi_percentage}%)'),
+            ('reinvest', reinvest, f'Auto reinvest ({self.reinvest_percentage}%)'),
+        ):
+            if amount <= 0:
+                continue
+            self.writer.add(DailyEarning(
+                user_id=user.id, earning_type=earning_type, amount=amount,
+                deposit=deposit, earned_date=day, created_at=moment,
+            ))
+            self.add_transaction(user.id, earning_type, amount, description, moment)
+        wallet['mining_income'] += mining
+        wallet['roi_earnings'] += roi
+        wallet['balance'] += mining + roi
+        wallet['last_earning_date'] = day
+
+    def pay_upline_commissions(self, user, deposit, wallets, approved_at):
+        upline = self.users_by_id.get(user.referred_by_id)
+        for level, percentage, _ in EarningService.DEPOSIT_COMMISSION_LEVELS:
+            if not upline:
+                break
+            commission = (deposit.amount * percentage / 100).quantize(CENT)
+            wallets[upline.id]['referral_earnings'] += commission
+            self.add_transaction(
+                upline.id, 'referral', commission,
+                f'Level {level} referral commission from {user.email}', approved_at,
+            )
+            upline = self.users_by_id.get(upline.referred_by_id)
+
+    def create_withdrawal(self, user, wallet):
+        amount = Decimal('1000')
+        requested_at = self.random_moment(self.random_day(self.end_date - timedelta(days=6)))
+        method = self.rng.choice(('bank_transfer', 'easypaisa', 'jazzcash'))
+        approved_at = requested_at + timedelta(hours=2)
+        tax = (amount * Decimal('0.20')).quantize(CENT)
+        self.writer.add(Withdrawal(
+            user_id=user.id,
+            amount=amount,
+            withdrawal_method=method,
+            withdrawal_account=f'03{self.rng.randrange(10 ** 9):09d}',
+            status='approved',
+            tax_amount=tax,
+            net_amount=amount - tax,
+            approval_date=approved_at,
+            created_at=requested_at,
+            updated_at=approved_at,
+        ))
+        wallet['balance'] -= amount
+        self.add_transaction(user.id, 'withdrawal', -amount, f'Withdrawal via {method}', approved_at)
+
+    def add_transaction(self, user_id, transaction_type, amount, description, created_at):
+        self.writer.add(Transaction(
+            user_id=user_id,
+            transaction_type=transaction_type,
+            amount=amount,
+            status='completed',
+            description=description,
+            created_at=created_at,
+        ))
+
+    def create_catalog_and_orders(self, users):
+        now = timezone.now()
+        categories = []
+        for index in range(5):
+            category, _ = Category.objects.get_or_create(
+                name=f'{self.prefix.title()} Category {index + 1}',
+                defaults={'description': 'Generated for load testing', 'created_at': now, 'updated_at': now},
+            )
+            categories.append(category)
+
+        products = [
+            Product(
+                name=f'{self.prefix.title()} Product {index + 1}',
+                description='Generated for load testing',
+                price=Decimal(self.rng.randrange(500, 50000, 50)),
+                delivery_charges=Decimal(self.rng.choice((0, 150, 250))),
+                category=self.rng.choice(categories),
+                stock=self.rng.randint(0, 500),
+                created_at=now,
+                updated_at=now,
+            )
+            for index in range(max(10, len(users) // 100))
+        ]
+        Product.objects.bulk_create(products, batch_size=self.writer.batch_size)
+        self.writer.counts['Product'] = len(products)
+
+        for user in users:
+            for _ in range(self.rng.choice((0, 0, 0, 1, 1, 2))):
+                product = self.rng.choice(products)
+                quantity = self.rng.randint(1, 3)
+                total = product.price * quantity
+                discount = Decimal('10.00')
+                ordered_at = self.random_moment(self.random_day(max(self.start_date, user.created_at.date())))
+                self.writer.add(Order(
+                    user_id=user.id,
+                    product=product,
+                    quantity=quantity,
+                    total_price=total,
+                    discount_percentage=discount,
+                    final_price=(total - total * discount / 100).quantize(CENT) + product.delivery_charges,
+                    delivery_charges=product.delivery_charges,
+                    payment_method=self.rng.choice(('cod', 'bank_transfer')),
+                    status=self.rng.choice(('pending', 'confirmed', 'delivered', 'cancelled')),
+                    shipping_address=f'House {self.rng.randint(1, 999)}, Street {self.rng.randint(1, 99)}, Lahore',
+                    phone=f'03{self.rng.randrange(10 ** 9):09d}',
+                    email=user.email,
+                    customer_name=f'{user.first_name} {user.last_name}',
+                    created_at=ordered_at,
+                    updated_at=ordered_at,
+                ))
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_remove_product_images'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dailyearning',
+            index=models.Index(fields=['user', '-earned_date', '-id'], name='earning_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyearning',
+            index=models.Index(fields=['-earned_date', '-id'], name='earning_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='transaction_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['-created_at', '-id'], name='transaction_created_idx'),
+        ),
+    ]
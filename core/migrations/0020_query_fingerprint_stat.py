@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryFingerprintStat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint_hash', models.CharField(max_length=32, unique=True)),
+                ('fingerprint', models.TextField()),
+                ('calls', models.BigIntegerField(default=0)),
+                ('total_time_ms', models.FloatField(default=0)),
+                ('max_time_ms', models.FloatField(default=0)),
+                ('p95_ms', models.FloatField(default=0, help_text='p95 over the most recent flush window')),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-total_time_ms'],
+            },
+        ),
+    ]
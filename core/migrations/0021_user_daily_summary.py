@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_query_fingerprint_stat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDailySummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('mining', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('roi', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('reinvest', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('referral', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'User daily summaries',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['-date', '-id'], name='summary_date_idx')],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
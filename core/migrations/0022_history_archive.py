@@ -0,0 +1,69 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_user_daily_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('mining_income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('roi_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('referral_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('signup_bonus', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_checkpoints', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-month'],
+                'unique_together': {('user', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyEarningArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('earning_type', models.CharField(choices=[('mining', 'Mining Income'), ('roi', 'ROI Earnings'), ('referral', 'Referral Earnings'), ('reinvest', 'Auto Reinvest')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('earned_date', models.DateField()),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('deposit', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.deposit')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_daily_earnings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-earned_date'],
+                'indexes': [models.Index(fields=['user', '-earned_date', '-id'], name='earnarchive_user_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TransactionArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('transaction_type', models.CharField(choices=[('deposit', 'Deposit'), ('mining', 'Mining Income'), ('roi', 'ROI Earnings'), ('referral', 'Referral Earnings'), ('withdrawal', 'Withdrawal'), ('reinvest', 'Auto Reinvest')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('status', models.CharField(default='completed', max_length=20)),
+                ('description', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at', '-id'], name='txarchive_user_created_idx'), models.Index(fields=['-created_at', '-id'], name='txarchive_created_idx')],
+            },
+        ),
+    ]
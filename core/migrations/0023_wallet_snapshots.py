@@ -0,0 +1,35 @@
+# Generated by Django 5.0.6 on 2026-10-19 15:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_history_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('mining_income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('roi_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('referral_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('signup_bonus', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('taken_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wallet_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['user', '-taken_at'], name='snapshot_user_taken_idx'), models.Index(fields=['-taken_at'], name='snapshot_taken_idx')],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.6 on 2026-10-19 15:19
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_matures_on(apps, schema_editor):
+    """Set matures_on for deposits approved before the column existed"""
+    Deposit = apps.get_model('core', 'Deposit')
+    
+    deposits = (
+        Deposit.objects.filter(status='approved', approved_at__isnull=False, matures_on__isnull=True)
+        .select_related('package')
+        .only('id', 'approved_at', 'package__duration_days')
+    )
+    batch = []
+    for deposit in deposits.iterator(chunk_size=2000):
+        deposit.matures_on = deposit.approved_at.date() + timedelta(days=deposit.package.duration_days)
+        batch.append(deposit)
+        if len(batch) >= 500:
+            Deposit.objects.bulk_update(batch, ['matures_on'])
+            batch = []
+    Deposit.objects.bulk_update(batch, ['matures_on'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_job_queue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deposit',
+            name='matures_on',
+            field=models.DateField(blank=True, help_text='First day without earnings: approval date plus the package duration', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='deposit',
+            index=models.Index(fields=['status', 'matures_on'], name='deposit_status_matures_idx'),
+        ),
+        migrations.RunPython(backfill_matures_on, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_deposit_matures_on'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='deposit',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending Approval'), ('approved', 'Approved'), ('matured', 'Matured'), ('rejected', 'Rejected')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_deposit_matured_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='withdrawal',
+            name='balance_held',
+            field=models.BooleanField(default=False, help_text='Amount was debited when requested: approval leaves the balance alone, rejection refunds it'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.6 on 2026-10-19 15:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_withdrawal_balance_held'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerHeartbeat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('worker', models.CharField(max_length=100, unique=True)),
+                ('started_at', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -25,8 +25,12 @@ class Deposit(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending Approval'),
         ('approved', 'Approved'),
+        ('matured', 'Matured'),
         ('rejected', 'Rejected'),
     ]
+    # Deposits that were paid for: 'approved' ones still earn, 'matured'
+    # ones have run their full duration and been settled.
+    FUNDED_STATUSES = ('approved', 'matured')
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='deposits')
     package = models.ForeignKey(MiningPackage, on_delete=models.CASCADE)
@@ -44,21 +48,46 @@ class Deposit(models.Model):
     approved_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='approved_deposits')
     approved_at = models.DateTimeField(null=True, blank=True)
     rejection_reason = models.TextField(blank=True)
+    matures_on = models.DateField(
+        null=True, blank=True,
+        help_text='First day without earnings: approval date plus the package duration',
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'matures_on'], name='deposit_status_matures_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.email} - ₨{self.amount}"
 
+    def save(self, *args, **kwargs):
+        if self.status == 'approved' and self.approved_at and not self.matures_on:
+            self.matures_on = self.approved_at.date() + timedelta(days=self.package.duration_days)
+        super().save(*args, **kwargs)
+
     @property
     def remaining_days(self):
         if not self.package:
             return 0
-        if self.status == 'approved' and self.approved_at:
-            elapsed = (timezone.now() - self.approved_at).days
-            remaining = self.package.duration_days - elapsed
-            return max(0, remaining)
-        return self.package.duration_days
+        return self.count_remaining_days(
+            self.status, self.matures_on, self.approved_at, self.package.duration_days
+        )
+
+    @staticmethod
+    def count_remaining_days(status, matures_on, approved_at, duration_days, now=None):
+        """`remaining_days` from column values, for callers working on .values() rows"""
+        if status == 'matured':
+            return 0
+        now = now or timezone.now()
+        if status == 'approved' and matures_on:
+            return max(0, (matures_on - now.date()).days)
+        if status == 'approved' and approved_at:
+            elapsed = (now - approved_at).days
+            return max(0, duration_days - elapsed)
+        return duration_days
 
 
 class Wallet(models.Model):
@@ -98,11 +127,38 @@ class DailyEarning(models.Model):
     class Meta:
         ordering = ['-earned_date']
         unique_together = ['user', 'earning_type', 'earned_date', 'deposit']
+        indexes = [
+            models.Index(fields=['user', '-earned_date', '-id'], name='earning_user_date_idx'),
+            models.Index(fields=['-earned_date', '-id'], name='earning_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.earning_type} - ₨{self.amount}"
 
 
+class UserDailySummary(models.Model):
+    """One row per user per day with that day's DailyEarning amounts rolled up by type"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_summaries')
+    date = models.DateField()
+    mining = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    roi = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    reinvest = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    referral = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['user', 'date']
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='summary_date_idx'),
+        ]
+        verbose_name_plural = 'User daily summaries'
+
+    def __str__(self):
+        return f"{self.user.email} - {self.date} - ₨{self.total}"
+
+
 class Transaction(models.Model):
     TRANSACTION_TYPE = [
         ('deposit', 'Deposit'),
@@ -126,11 +182,113 @@ class Transaction(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='transaction_user_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='transaction_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.transaction_type} - ₨{self.amount}"
 
 
+class TransactionArchive(models.Model):
+    """Transactions moved out of the live table by `archive_history`, keeping their ids"""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_transactions')
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TRANSACTION_TYPE)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    status = models.CharField(max_length=20, default='completed')
+    description = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='txarchive_user_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='txarchive_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} - {self.transaction_type} - ₨{self.amount} (archived)"
+
+
+class DailyEarningArchive(models.Model):
+    """DailyEarning rows moved out of the live table by `archive_history`, keeping their ids"""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_daily_earnings')
+    earning_type = models.CharField(max_length=20, choices=DailyEarning.EARNING_TYPE)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    deposit = models.ForeignKey(Deposit, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    earned_date = models.DateField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-earned_date']
+        indexes = [
+            models.Index(fields=['user', '-earned_date', '-id'], name='earnarchive_user_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} - {self.earning_type} - ₨{self.amount} (archived)"
+
+
+class BalanceCheckpoint(models.Model):
+    """
+    Per-user, per-month wallet movements of archived transactions.
+
+    Adding a user's checkpoints to the ledger of their live transactions gives
+    the same totals as the full history, so reconciliation never has to read
+    the archive.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='balance_checkpoints')
+    month = models.DateField(help_text='First day of the month')
+    mining_income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    roi_earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    referral_earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    signup_bonus = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transaction_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-month']
+        unique_together = ['user', 'month']
+
+    def __str__(self):
+        return f"{self.user.email} - {self.month:%Y-%m} - ₨{self.balance}"
+
+
+class WalletSnapshot(models.Model):
+    """
+    Copy of a wallet taken after a daily earnings run.
+
+    Only wallets that changed since the previous run get a new row, so a
+    user's balance at any moment is their latest snapshot taken before it
+    plus the ledger movements in between.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='wallet_snapshots')
+    date = models.DateField()
+    mining_income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    roi_earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    referral_earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    signup_bonus = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['user', 'date']
+        indexes = [
+            models.Index(fields=['user', '-taken_at'], name='snapshot_user_taken_idx'),
+            models.Index(fields=['-taken_at'], name='snapshot_taken_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} - {self.date} - ₨{self.balance}"
+
+
 class Referral(models.Model):
     referrer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='referrals_given')
     referral_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='referred_by_users')
@@ -169,6 +327,10 @@ class Withdrawal(models.Model):
     approved_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='approved_withdrawals')
     approval_date = models.DateTimeField(null=True, blank=True)
     rejection_reason = models.TextField(blank=True)
+    balance_held = models.BooleanField(
+        default=False,
+        help_text='Amount was debited when requested: approval leaves the balance alone, rejection refunds it',
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -308,3 +470,91 @@ class WithdrawalTaxSetting(models.Model):
 
     def __str__(self):
         return f"Withdrawal Tax: {self.percentage}%"
+
+
+class QueryFingerprintStat(models.Model):
+    """Accumulated SQL statistics per normalized statement, flushed by config.query_stats"""
+    fingerprint_hash = models.CharField(max_length=32, unique=True)
+    fingerprint = models.TextField()
+    calls = models.BigIntegerField(default=0)
+    total_time_ms = models.FloatField(default=0)
+    max_time_ms = models.FloatField(default=0)
+    p95_ms = models.FloatField(default=0, help_text='p95 over the most recent flush window')
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-total_time_ms']
+
+    @property
+    def avg_time_ms(self):
+        return self.total_time_ms / self.calls if self.calls else 0
+
+    def __str__(self):
+        return self.fingerprint[:80]
+
+
+class SchedulerLease(models.Model):
+    """
+    Named lease deciding which process runs scheduled jobs.
+
+    The holder renews `expires_at` on every heartbeat; once it lapses any
+    other process may take the lease over with a conditional UPDATE.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    holder = models.CharField(max_length=100)
+    acquired_at = models.DateTimeField()
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} held by {self.holder} until {self.expires_at}"
+
+
+class Job(models.Model):
+    """Unit of background work stored in the database and executed by `run_worker`"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    key = models.CharField(
+        max_length=200, unique=True, null=True, blank=True,
+        help_text='Deduplication key; enqueueing an existing key returns that job',
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    priority = models.IntegerField(default=100, help_text='Lower runs first')
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    timeout = models.IntegerField(default=300, help_text='Seconds before a running job counts as lost and is retried')
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'priority', 'run_at'], name='job_claim_idx'),
+            models.Index(fields=['status', 'locked_until'], name='job_lock_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class WorkerHeartbeat(models.Model):
+    """Last sign of life from a `run_worker` process; see core.jobs.workers_alive"""
+    worker = models.CharField(max_length=100, unique=True)
+    started_at = models.DateTimeField()
+    last_seen = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.worker} last seen {self.last_seen}"
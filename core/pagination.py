@@ -0,0 +1,162 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+from rest_framework.response import Response
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over a compound (column, id) key.
+
+    DRF's CursorPagination only filters on the first ordering column and
+    falls back to OFFSET for ties, which degrades badly on columns such as
+    `earned_date` that are shared by many rows. Here the cursor position
+    carries every ordering column, so each page is a single indexed range
+    scan no matter how deep the client pages.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    position_separator = '|'
+
+    count_query_param = 'count'
+    count_cache_timeout = getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 300)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes'):
+            self.count = self.get_count_estimate(queryset)
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(
+                self._get_keyset_filter(queryset.model, current_position, reverse)
+            )
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+    def get_count_estimate(self, queryset):
+        """Return a cached COUNT(*) for the queryset, refreshed at most every few minutes"""
+        sql = str(queryset.order_by().query)
+        key = 'pagination-count:' + hashlib.md5(sql.encode('utf-8')).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.order_by().count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field_name = order.lstrip('-')
+            if isinstance(instance, dict):
+                values.append(str(instance[field_name]))
+            else:
+                values.append(str(getattr(instance, field_name)))
+        return self.position_separator.join(values)
+
+    def _get_keyset_filter(self, model, position, reverse):
+        raw_values = position.split(self.position_separator)
+        if len(raw_values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        keys = []
+        for order, raw in zip(self.ordering, raw_values):
+            field_name = order.lstrip('-')
+            field = model._meta.pk if field_name == 'pk' else model._meta.get_field(field_name)
+            try:
+                value = field.to_python(raw)
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+            lookup = 'lt' if reverse != order.startswith('-') else 'gt'
+            keys.append((field_name, lookup, value))
+
+        # (a < x) OR (a = x AND b < y) OR ...
+        condition = Q()
+        for index, (field_name, lookup, value) in enumerate(keys):
+            branch = Q(**{f'{field_name}__{lookup}': value})
+            for prefix_name, _, prefix_value in keys[:index]:
+                branch &= Q(**{prefix_name: prefix_value})
+            condition |= branch
+        return condition
+
+
+class TransactionCursorPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class DailyEarningCursorPagination(KeysetPagination):
+    ordering = ('-earned_date', '-id')
+
+
+class UserDailySummaryCursorPagination(KeysetPagination):
+    ordering = ('-date', '-id')
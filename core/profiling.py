@@ -0,0 +1,121 @@
+"""
+Opt-in profiling for the earnings engine.
+
+Wrap a run in `profile_run(label)` to capture a cProfile dump, a per-phase
+timing breakdown and the slowest SQL statements by total time. Code under
+test marks its phases with `phase('load')`, `phase('write')`, etc.; outside
+of a profiled run those markers do nothing.
+
+Profiling is enabled with `--profile` on `calculate_daily_earnings` and
+`run_scheduler --test`, or for every run (including the scheduled one) with
+EARNINGS_PROFILE=1.
+"""
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+_active_session = contextvars.ContextVar('profile_session', default=None)
+
+
+def profiling_requested(flag=False):
+    return flag or os.environ.get('EARNINGS_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+
+class ProfileSession:
+    def __init__(self, label):
+        self.label = label
+        self.phases = {}
+        self.statements = {}
+        self.profiler = cProfile.Profile()
+
+    def add_phase(self, name, elapsed):
+        total, calls = self.phases.get(name, (0.0, 0))
+        self.phases[name] = (total + elapsed, calls + 1)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            total, calls = self.statements.get(sql, (0.0, 0))
+            self.statements[sql] = (total + time.perf_counter() - start, calls + 1)
+
+    def report(self, wall_time, top_n):
+        lines = [
+            f'Profile: {self.label}',
+            f'Recorded: {timezone.now().isoformat()}',
+            f'Wall time: {wall_time:.3f}s',
+            '',
+            'Phases (seconds, calls):',
+        ]
+        for name, (total, calls) in sorted(self.phases.items(), key=lambda item: -item[1][0]):
+            lines.append(f'  {name:<12} {total:10.3f} {calls:10d}')
+
+        query_total = sum(total for total, _ in self.statements.values())
+        query_calls = sum(calls for _, calls in self.statements.values())
+        lines += ['', f'SQL: {query_calls} statements, {query_total:.3f}s total', f'Top {top_n} by total time:']
+        ranked = sorted(self.statements.items(), key=lambda item: -item[1][0])[:top_n]
+        for sql, (total, calls) in ranked:
+            lines.append(f'  {total:9.3f}s {calls:8d}x  {sql[:500]}')
+
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=stream)
+        stats.sort_stats('cumulative').print_stats(top_n * 2)
+        lines += ['', stream.getvalue()]
+        return '\n'.join(lines)
+
+
+@contextmanager
+def phase(name):
+    """Attribute the wall time of the enclosed block to `name` in the active profile"""
+    session = _active_session.get()
+    if session is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        session.add_phase(name, time.perf_counter() - start)
+
+
+@contextmanager
+def profile_run(label, top_n=25, directory=None):
+    """
+    Profile the enclosed block and write `<label>-<timestamp>.txt` (report)
+    and `.prof` (raw pstats, for snakeviz and friends) to PROFILE_DIR.
+
+    Yields a dict whose 'path' is filled in with the report path on exit.
+    """
+    directory = directory or getattr(settings, 'PROFILE_DIR', 'profiles')
+    session = ProfileSession(label)
+    result = {'path': None}
+    token = _active_session.set(session)
+    start = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(session))
+            session.profiler.enable()
+            try:
+                yield result
+            finally:
+                session.profiler.disable()
+    finally:
+        _active_session.reset(token)
+        wall_time = time.perf_counter() - start
+        os.makedirs(directory, exist_ok=True)
+        stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+        base = os.path.join(directory, f'{label}-{stamp}')
+        session.profiler.dump_stats(f'{base}.prof')
+        with open(f'{base}.txt', 'w') as fh:
+            fh.write(session.report(wall_time, top_n))
+        result['path'] = f'{base}.txt'
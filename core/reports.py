@@ -4,7 +4,8 @@ from django.utils import timezone
 from django.db import models
 from decimal import Decimal
 
-from .models import Deposit, Withdrawal, Order, DailyEarning
+from .models import Deposit, Withdrawal, Order, UserDailySummary
+from .services import SnapshotService
 from users.models import User
 
 
@@ -33,12 +34,12 @@ def generate_users_report_excel():
     for user in users:
         total_deposits = Deposit.objects.filter(
             user=user, 
-            status='approved'
+            status__in=Deposit.FUNDED_STATUSES
         ).aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
         
-        total_earnings = DailyEarning.objects.filter(
+        total_earnings = UserDailySummary.objects.filter(
             user=user
-        ).aggregate(total=models.Sum('earning_amount'))['total'] or Decimal('0.00')
+        ).aggregate(total=models.Sum('total'))['total'] or Decimal('0.00')
         
         worksheet.append([
             user.id,
@@ -78,7 +79,7 @@ def generate_earnings_report_excel():
     worksheet = workbook.active
     worksheet.title = "Earnings Report"
     
-    headers = ["Date", "User", "Email", "Earning Type", "Amount", "Balance"]
+    headers = ["Date", "User", "Email", "Mining", "ROI", "Reinvest", "Referral", "Total", "Balance"]
     worksheet.append(headers)
     
     header_fill = PatternFill(start_color="70AD47", end_color="70AD47", fill_type="solid")
@@ -89,15 +90,19 @@ def generate_earnings_report_excel():
         cell.font = header_font
         cell.alignment = Alignment(horizontal="center")
     
-    daily_earnings = DailyEarning.objects.all().order_by('-created_at')[:1000]
-    for earning in daily_earnings:
+    summaries = list(UserDailySummary.objects.select_related('user').order_by('-date', '-id')[:1000])
+    balances = SnapshotService.balances_on((summary.user_id, summary.date) for summary in summaries)
+    for summary in summaries:
         worksheet.append([
-            earning.created_at.strftime("%Y-%m-%d %H:%M"),
-            earning.user.username,
-            earning.user.email,
-            "Mining ROI",
-            f"₨{earning.earning_amount:,.2f}",
-            f"₨{earning.user.wallet.balance:,.2f}"
+            summary.date.strftime("%Y-%m-%d"),
+            summary.user.username,
+            summary.user.email,
+            f"₨{summary.mining:,.2f}",
+            f"₨{summary.roi:,.2f}",
+            f"₨{summary.reinvest:,.2f}",
+            f"₨{summary.referral:,.2f}",
+            f"₨{summary.total:,.2f}",
+            f"₨{balances[(summary.user_id, summary.date)]:,.2f}"
         ])
     
     for column in worksheet.columns:
@@ -251,15 +256,16 @@ def generate_earnings_report_pdf():
     elements.append(Paragraph(f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
     elements.append(Spacer(1, 0.3 * inch))
     
-    daily_earnings = DailyEarning.objects.all().order_by('-created_at')[:50]
+    summaries = list(UserDailySummary.objects.select_related('user').order_by('-date', '-id')[:50])
+    balances = SnapshotService.balances_on((summary.user_id, summary.date) for summary in summaries)
     data = [["Date", "User", "Amount", "Balance"]]
     
-    for earning in daily_earnings:
+    for summary in summaries:
         data.append([
-            earning.created_at.strftime("%Y-%m-%d"),
-            earning.user.username,
-            f"₨{earning.earning_amount:,.2f}",
-            f"₨{earning.user.wallet.balance:,.2f}"
+            summary.date.strftime("%Y-%m-%d"),
+            summary.user.username,
+            f"₨{summary.total:,.2f}",
+            f"₨{balances[(summary.user_id, summary.date)]:,.2f}"
         ])
     
     table = Table(data, colWidths=[1.5*inch, 1.5*inch, 1.5*inch, 1.5*inch])
@@ -336,3 +342,20 @@ def generate_orders_report_pdf():
     doc.build(elements)
     buffer.seek(0)
     return buffer
+
+
+EXCEL_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+REPORTS = {
+    'users': (generate_users_report_excel, generate_users_report_pdf),
+    'earnings': (generate_earnings_report_excel, generate_earnings_report_pdf),
+    'orders': (generate_orders_report_excel, generate_orders_report_pdf),
+}
+
+
+def render_report(report, file_format='excel'):
+    """Generate `report` and return (buffer, filename, content_type)"""
+    excel, pdf = REPORTS[report]
+    if file_format.lower() == 'pdf':
+        return pdf(), f'{report}_report.pdf', 'application/pdf'
+    return excel(), f'{report}_report.xlsx', EXCEL_CONTENT_TYPE
@@ -1,20 +1,193 @@
 from apscheduler.schedulers.background import BackgroundScheduler
-from django.core.management import call_command
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from datetime import timedelta
 import logging
 import os
+import socket
+import time
+import uuid
 
 logger = logging.getLogger(__name__)
 
 scheduler = BackgroundScheduler(daemon=True)
 _scheduler_started = False
 
+
+class LeaderLease:
+    """
+    Database lease electing one scheduler process among all workers and instances.
+    
+    Every process runs the scheduler, but only the lease holder executes
+    jobs. The holder renews the lease every SCHEDULER_HEARTBEAT_INTERVAL
+    seconds; if it dies, another process takes over once SCHEDULER_LEASE_TTL
+    has passed without a renewal.
+    """
+    
+    def __init__(self, name='scheduler'):
+        self.name = name
+        self.holder = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.is_leader = False
+    
+    @property
+    def ttl(self):
+        return getattr(settings, 'SCHEDULER_LEASE_TTL', 30)
+    
+    def acquire(self):
+        """Take or renew the lease; returns whether this process now holds it"""
+        from .models import SchedulerLease
+        
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=self.ttl)
+        try:
+            # A single conditional UPDATE, so two processes can never both win
+            taken = bool(SchedulerLease.objects.filter(
+                Q(holder=self.holder) | Q(expires_at__lt=now),
+                name=self.name,
+            ).update(holder=self.holder, expires_at=expires_at))
+            if taken:
+                if not self.is_leader:
+                    SchedulerLease.objects.filter(name=self.name).update(acquired_at=now)
+            else:
+                try:
+                    with transaction.atomic():
+                        SchedulerLease.objects.create(
+                            name=self.name, holder=self.holder, acquired_at=now, expires_at=expires_at
+                        )
+                    taken = True
+                except IntegrityError:
+                    taken = False
+        except DatabaseError as e:
+            logger.warning(f"Could not renew scheduler lease: {str(e)}")
+            taken = False
+        
+        if taken != self.is_leader:
+            logger.info(f"Scheduler lease {'acquired' if taken else 'lost'} by {self.holder}")
+        self.is_leader = taken
+        return taken
+    
+    def wait_for(self, timeout):
+        """Retry `acquire` until it succeeds or `timeout` seconds pass"""
+        deadline = time.monotonic() + timeout
+        while not self.acquire():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(getattr(settings, 'SCHEDULER_HEARTBEAT_INTERVAL', 10))
+        return True
+    
+    def release(self):
+        """Give up the lease so another process can take over immediately"""
+        from .models import SchedulerLease
+        
+        if not self.is_leader:
+            return
+        try:
+            SchedulerLease.objects.filter(name=self.name, holder=self.holder).update(
+                expires_at=timezone.now()
+            )
+        except DatabaseError as e:
+            logger.warning(f"Could not release scheduler lease: {str(e)}")
+        self.is_leader = False
+
+
+lease = LeaderLease()
+
+
+def renew_lease_task():
+    lease.acquire()
+
+
+def run_earnings_without_worker():
+    """
+    Run due earnings jobs in this process when no `run_worker` is alive, so
+    a missing worker delays the nightly credit by minutes rather than forever.
+    Returns how many jobs ran.
+    """
+    from .jobs import run_job, worker_name, workers_alive
+    from .models import Job
+    
+    if workers_alive():
+        return 0
+    due = list(
+        Job.objects.filter(name__startswith='earnings.', status='queued', run_at__lte=timezone.now())
+        .order_by('priority', 'run_at', 'id').values_list('pk', flat=True)
+    )
+    if due:
+        logger.error(
+            f"No job worker has sent a heartbeat; running {len(due)} due earnings jobs in the "
+            f"scheduler. Deploy `manage.py run_worker` to take them off this process."
+        )
+    for pk in due:
+        run_job(pk, f'{worker_name()}:scheduler')
+    return len(due)
+
+
+def check_job_backlog_task():
+    # Only the leader reports, so one missing worker logs one error per check
+    if lease.is_leader and not getattr(settings, 'JOBS_EAGER', False):
+        from .jobs import check_backlog
+        run_earnings_without_worker()
+        check_backlog()
+
+
+def schedule_earnings_buckets(day):
+    """
+    Queue one earnings job per user-id bucket for `day`, spread evenly over
+    EARNINGS_STAGGER_HOURS from now. Every bucket credits `day` whenever it
+    runs, so a late bucket never moves earnings to the next date.
+    
+    Referral commissions depend on other users' earnings, so they are paid
+    by one earnings.referrals job queued for the end of the window, which
+    waits for every bucket to finish.
+    """
+    from .jobs import enqueue
+    
+    buckets = settings.EARNINGS_STAGGER_BUCKETS
+    hours = timedelta(hours=getattr(settings, 'EARNINGS_STAGGER_HOURS', 12))
+    spacing = hours / buckets
+    start = timezone.now()
+    jobs = [
+        enqueue(
+            'earnings.bucket',
+            {'date': day.isoformat(), 'bucket': bucket, 'buckets': buckets},
+            key=f'earnings.bucket:{day}:{bucket}/{buckets}',
+            run_at=start + spacing * bucket,
+        )
+        for bucket in range(buckets)
+    ]
+    enqueue(
+        'earnings.referrals',
+        {'date': day.isoformat()},
+        key=f'earnings.referrals:{day}',
+        run_at=start + hours,
+    )
+    return jobs
+
+
 def run_daily_earnings_task():
+    # Followers wait long enough for a dead leader's lease to lapse, so the
+    # run still happens once if the leader died just before midnight.
+    interval = getattr(settings, 'SCHEDULER_HEARTBEAT_INTERVAL', 10)
+    if not lease.wait_for(lease.ttl + interval):
+        logger.info("Skipping daily earnings: another process holds the scheduler lease")
+        return
+    
     try:
-        logger.info("Running daily earnings calculation...")
-        call_command('calculate_daily_earnings')
-        logger.info("Daily earnings calculation completed successfully")
+        today = timezone.now().date()
+        if getattr(settings, 'EARNINGS_STAGGER_BUCKETS', 0) > 0:
+            jobs = schedule_earnings_buckets(today)
+            logger.info(f"Queued daily earnings for {today} in {len(jobs)} staggered buckets")
+            return
+        
+        from .jobs import enqueue
+        job = enqueue('earnings.daily', key=f'earnings.daily:{today}')
+        logger.info(f"Queued daily earnings calculation as job {job.pk}")
+        if not getattr(settings, 'JOBS_EAGER', False):
+            run_earnings_without_worker()
     except Exception as e:
-        logger.error(f"Error in daily earnings task: {str(e)}", exc_info=True)
+        logger.error(f"Error queueing daily earnings task: {str(e)}", exc_info=True)
 
 def start_scheduler():
     global _scheduler_started
@@ -43,6 +216,31 @@ def start_scheduler():
             )
             logger.info("Daily earnings job added to scheduler")
         
+        if 'scheduler_lease_heartbeat' not in [job.id for job in scheduler.get_jobs()]:
+            scheduler.add_job(
+                renew_lease_task,
+                'interval',
+                seconds=getattr(settings, 'SCHEDULER_HEARTBEAT_INTERVAL', 10),
+                id='scheduler_lease_heartbeat',
+                name='Renew the scheduler leader lease',
+                replace_existing=True,
+                next_run_time=timezone.now(),
+                max_instances=1,
+                coalesce=True
+            )
+        
+        if 'job_backlog_check' not in [job.id for job in scheduler.get_jobs()]:
+            scheduler.add_job(
+                check_job_backlog_task,
+                'interval',
+                seconds=60,
+                id='job_backlog_check',
+                name='Run earnings without a worker and warn about unclaimed jobs',
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True
+            )
+        
         if not scheduler.running:
             logger.info("Starting background scheduler...")
             scheduler.start()
@@ -58,6 +256,7 @@ def stop_scheduler():
     if scheduler.running:
         try:
             scheduler.shutdown(wait=False)
+            lease.release()
             logger.info("Earnings scheduler stopped")
         except Exception as e:
             logger.error(f"Error stopping scheduler: {str(e)}", exc_info=True)
@@ -1,10 +1,13 @@
 from rest_framework import serializers
 from django.conf import settings
+from django.utils import timezone
 from .models import (
-    MiningPackage, Deposit, Wallet, DailyEarning, Transaction,
+    MiningPackage, Deposit, Wallet, DailyEarning, UserDailySummary, Transaction,
+    TransactionArchive, DailyEarningArchive,
     Referral, Withdrawal, Product, Order, ROISetting, ReinvestSetting, WithdrawalTaxSetting, Category, ProductImage
 )
-from .image_utils import upload_image_to_supabase, delete_image_from_supabase
+from .image_utils import upload_image_to_supabase, delete_image_from_supabase, stage_image
+from .jobs import enqueue
 from users.models import User
 
 
@@ -26,13 +29,52 @@ def get_file_url(file_field, request=None):
         return None
 
 
+class BackgroundImageMixin:
+    """
+    Uploads and deletes Supabase images inline, or with ASYNC_IMAGE_UPLOADS
+    stages the file and leaves the upload to an `images.upload` job, which
+    fills in the URL field once the row is saved.
+    """
+
+    @staticmethod
+    def _uploads_deferred():
+        return getattr(settings, 'ASYNC_IMAGE_UPLOADS', False)
+
+    def _upload_image(self, file, folder, field):
+        if not self._uploads_deferred():
+            return upload_image_to_supabase(file, folder=folder)
+        staged = getattr(self, '_staged_images', [])
+        staged.append((field, folder, file.content_type or 'image/jpeg', stage_image(file, folder)))
+        self._staged_images = staged
+        return None
+
+    def _delete_image(self, url):
+        if self._uploads_deferred():
+            enqueue('images.delete', {'url': url})
+        else:
+            delete_image_from_supabase(url)
+
+    def _queue_staged_images(self, instance):
+        for field, folder, content_type, name in getattr(self, '_staged_images', []):
+            enqueue('images.upload', {
+                'name': name,
+                'folder': folder,
+                'content_type': content_type,
+                'model': instance._meta.label,
+                'pk': instance.pk,
+                'field': field,
+            })
+        self._staged_images = []
+        return instance
+
+
 class MiningPackageSerializer(serializers.ModelSerializer):
     class Meta:
         model = MiningPackage
         fields = '__all__'
 
 
-class DepositSerializer(serializers.ModelSerializer):
+class DepositSerializer(BackgroundImageMixin, serializers.ModelSerializer):
     package_name = serializers.SerializerMethodField()
     daily_earning = serializers.SerializerMethodField()
     remaining_days = serializers.SerializerMethodField()
@@ -85,8 +127,8 @@ class DepositSerializer(serializers.ModelSerializer):
         proof_file = validated_data.pop('deposit_proof_file', None)
         if proof_file:
             try:
-                image_url = upload_image_to_supabase(proof_file, folder='deposit_proofs')
-                if not image_url:
+                image_url = self._upload_image(proof_file, 'deposit_proofs', 'deposit_proof')
+                if not image_url and not self._uploads_deferred():
                     raise Exception("Upload returned empty URL")
                 validated_data['deposit_proof'] = image_url
             except Exception as e:
@@ -96,14 +138,14 @@ class DepositSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         self._handle_deposit_proof_upload(validated_data)
-        return super().create(validated_data)
+        return self._queue_staged_images(super().create(validated_data))
 
     def update(self, instance, validated_data):
         if 'deposit_proof_file' in validated_data:
             if instance.deposit_proof:
-                delete_image_from_supabase(instance.deposit_proof)
+                self._delete_image(instance.deposit_proof)
             self._handle_deposit_proof_upload(validated_data)
-        return super().update(instance, validated_data)
+        return self._queue_staged_images(super().update(instance, validated_data))
 
 
 class DepositDetailSerializer(serializers.ModelSerializer):
@@ -162,6 +204,12 @@ class DailyEarningSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class UserDailySummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserDailySummary
+        fields = ['id', 'date', 'mining', 'roi', 'reinvest', 'referral', 'total']
+
+
 class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
@@ -169,6 +217,20 @@ class TransactionSerializer(serializers.ModelSerializer):
         read_only_fields = ['user']
 
 
+class TransactionArchiveSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TransactionArchive
+        fields = ['id', 'transaction_type', 'amount', 'status', 'description', 'created_at', 'user']
+        read_only_fields = fields
+
+
+class DailyEarningArchiveSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyEarningArchive
+        fields = ['id', 'earning_type', 'amount', 'earned_date', 'created_at', 'user', 'deposit']
+        read_only_fields = fields
+
+
 class ReferralSerializer(serializers.ModelSerializer):
     referrer_email = serializers.CharField(source='referrer.email', read_only=True)
     referral_email = serializers.CharField(source='referral_user.email', read_only=True)
@@ -188,7 +250,8 @@ class WithdrawalSerializer(serializers.ModelSerializer):
         model = Withdrawal
         fields = ['id', 'user', 'user_email', 'amount', 'withdrawal_method', 'withdrawal_account',
                   'status', 'tax_amount', 'net_amount', 'created_at', 'updated_at']
-        read_only_fields = ['status', 'user', 'tax_amount', 'net_amount', 'approved_by']
+        # The amount is held from the balance when the request is made
+        read_only_fields = ['status', 'user', 'amount', 'tax_amount', 'net_amount', 'approved_by']
 
 
 class WithdrawalDetailSerializer(serializers.ModelSerializer):
@@ -198,7 +261,7 @@ class WithdrawalDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Withdrawal
         fields = '__all__'
-        read_only_fields = ['user', 'tax_amount', 'net_amount']
+        read_only_fields = ['user', 'tax_amount', 'net_amount', 'balance_held']
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -207,7 +270,7 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class ProductImageSerializer(serializers.ModelSerializer):
+class ProductImageSerializer(BackgroundImageMixin, serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
     image_file = serializers.FileField(write_only=True, required=False)
 
@@ -228,7 +291,7 @@ class ProductImageSerializer(serializers.ModelSerializer):
         image_file = validated_data.pop('image_file', None)
         if image_file:
             try:
-                image_url = upload_image_to_supabase(image_file, folder='product_images')
+                image_url = self._upload_image(image_file, 'product_images', 'image')
                 validated_data['image'] = image_url
             except Exception as e:
                 raise serializers.ValidationError(f"Image upload failed: {str(e)}")
@@ -237,17 +300,17 @@ class ProductImageSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         self._handle_image_upload(validated_data)
-        return super().create(validated_data)
+        return self._queue_staged_images(super().create(validated_data))
 
     def update(self, instance, validated_data):
         if 'image_file' in validated_data:
             if instance.image:
-                delete_image_from_supabase(instance.image)
+                self._delete_image(instance.image)
             self._handle_image_upload(validated_data)
-        return super().update(instance, validated_data)
+        return self._queue_staged_images(super().update(instance, validated_data))
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(BackgroundImageMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     image_url = serializers.SerializerMethodField()
     product_images = ProductImageSerializer(many=True, read_only=True)
@@ -270,7 +333,7 @@ class ProductSerializer(serializers.ModelSerializer):
         image_file = validated_data.pop('image_file', None)
         if image_file:
             try:
-                image_url = upload_image_to_supabase(image_file, folder='products')
+                image_url = self._upload_image(image_file, 'products', 'image')
                 validated_data['image'] = image_url
             except Exception as e:
                 raise serializers.ValidationError(f"Image upload failed: {str(e)}")
@@ -279,17 +342,17 @@ class ProductSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         self._handle_image_upload(validated_data)
-        return super().create(validated_data)
+        return self._queue_staged_images(super().create(validated_data))
 
     def update(self, instance, validated_data):
         if 'image_file' in validated_data:
             if instance.image:
-                delete_image_from_supabase(instance.image)
+                self._delete_image(instance.image)
             self._handle_image_upload(validated_data)
-        return super().update(instance, validated_data)
+        return self._queue_staged_images(super().update(instance, validated_data))
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(BackgroundImageMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_image_url = serializers.SerializerMethodField()
     txid_proof_url = serializers.SerializerMethodField()
@@ -299,7 +362,7 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = ['id', 'user', 'product', 'product_name', 'product_image_url', 'quantity',
               'total_price', 'discount_percentage', 'final_price', 'delivery_charges', 'payment_method',
-              'status', 'shipping_address', 'phone', 'email', 'customer_name', 'transaction_id',
+              'status', 'shipping_address', 'phone', 'email', 'customer_name',
               'txid', 'txid_proof', 'txid_proof_file', 'txid_proof_url', 'created_at', 'updated_at']
         read_only_fields = ['status', 'user', 'total_price', 'final_price', 'txid_proof']
 
@@ -320,7 +383,7 @@ class OrderSerializer(serializers.ModelSerializer):
         proof_file = validated_data.pop('txid_proof_file', None)
         if proof_file:
             try:
-                image_url = upload_image_to_supabase(proof_file, folder='order_proofs')
+                image_url = self._upload_image(proof_file, 'order_proofs', 'txid_proof')
                 validated_data['txid_proof'] = image_url
             except Exception as e:
                 raise serializers.ValidationError(f"Image upload failed: {str(e)}")
@@ -329,14 +392,14 @@ class OrderSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         self._handle_txid_proof_upload(validated_data)
-        return super().create(validated_data)
+        return self._queue_staged_images(super().create(validated_data))
 
     def update(self, instance, validated_data):
         if 'txid_proof_file' in validated_data:
             if instance.txid_proof:
-                delete_image_from_supabase(instance.txid_proof)
+                self._delete_image(instance.txid_proof)
             self._handle_txid_proof_upload(validated_data)
-        return super().update(instance, validated_data)
+        return self._queue_staged_images(super().update(instance, validated_data))
 
 
 class OrderDetailSerializer(serializers.ModelSerializer):
@@ -348,7 +411,7 @@ class OrderDetailSerializer(serializers.ModelSerializer):
         model = Order
         fields = ['id', 'user', 'user_email', 'product', 'quantity',
                   'total_price', 'discount_percentage', 'final_price', 'delivery_charges', 'payment_method',
-                  'status', 'shipping_address', 'phone', 'email', 'customer_name', 'transaction_id',
+                  'status', 'shipping_address', 'phone', 'email', 'customer_name',
                   'txid', 'txid_proof', 'txid_proof_url', 'created_at', 'updated_at']
         read_only_fields = ['user', 'total_price', 'final_price']
 
@@ -374,3 +437,133 @@ class WithdrawalTaxSettingSerializer(serializers.ModelSerializer):
     class Meta:
         model = WithdrawalTaxSetting
         fields = '__all__'
+
+
+class ValuesListSerializer:
+    """
+    Fast read-only twin of `serializer_class` for high-volume list endpoints.
+
+    Rows come from `values(queryset)` as plain dicts, so no model instances
+    are built, and every column is converted by the matching field's own
+    to_representation, so the output is the same as serializer_class's.
+    Fields that are not a single column (SerializerMethodFields, nested
+    serializers) are built by a `get_<name>(row)` method from the extra
+    columns in `lookups`; `prepare(rows)` can load what those need per page.
+    """
+    serializer_class = None
+    lookups = ()
+
+    def __init__(self, rows, context=None):
+        self.rows = rows
+        self.context = context or {}
+
+    @classmethod
+    def get_plan(cls):
+        """[(name, column, convert, method)] in serializer_class's field order, built once per class"""
+        if '_plan' not in cls.__dict__:
+            plan = []
+            for name, field in cls.serializer_class().fields.items():
+                if field.write_only:
+                    continue
+                method = getattr(cls, f'get_{name}', None)
+                if method is not None:
+                    plan.append((name, None, None, method))
+                elif isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer,
+                                        serializers.ManyRelatedField)) or field.source == '*':
+                    raise TypeError(f'{cls.__name__} needs a get_{name}() method')
+                elif isinstance(field, serializers.RelatedField):
+                    # values() already gives the primary key
+                    plan.append((name, field.source, None, None))
+                else:
+                    plan.append((name, field.source.replace('.', '__'), field.to_representation, None))
+            cls._plan = plan
+        return cls._plan
+
+    @classmethod
+    def values(cls, queryset):
+        columns = [column for _, column, _, _ in cls.get_plan() if column]
+        return queryset.values(*dict.fromkeys(columns + list(cls.lookups)))
+
+    def prepare(self, rows):
+        pass
+
+    @property
+    def data(self):
+        plan = self.get_plan()
+        rows = list(self.rows)
+        self.prepare(rows)
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, convert, method in plan:
+                if method is not None:
+                    item[name] = method(self, row)
+                else:
+                    value = row[column]
+                    item[name] = value if value is None or convert is None else convert(value)
+            data.append(item)
+        return data
+
+
+class TransactionListSerializer(ValuesListSerializer):
+    serializer_class = TransactionSerializer
+
+
+class DailyEarningListSerializer(ValuesListSerializer):
+    serializer_class = DailyEarningSerializer
+
+
+class WithdrawalListSerializer(ValuesListSerializer):
+    serializer_class = WithdrawalDetailSerializer
+
+
+class DepositListSerializer(ValuesListSerializer):
+    serializer_class = DepositDetailSerializer
+    lookups = ('package', 'package__daily_earning', 'package__duration_days', 'status', 'matures_on', 'approved_at')
+
+    def prepare(self, rows):
+        packages = MiningPackage.objects.in_bulk({row['package'] for row in rows})
+        self.packages = {
+            pk: MiningPackageSerializer(package, context=self.context).data
+            for pk, package in packages.items()
+        }
+        self.now = timezone.now()
+
+    def get_package(self, row):
+        return self.packages[row['package']]
+
+    def get_daily_earning(self, row):
+        return row['package__daily_earning']
+
+    def get_remaining_days(self, row):
+        return Deposit.count_remaining_days(
+            row['status'], row['matures_on'], row['approved_at'], row['package__duration_days'], self.now
+        )
+
+    def get_deposit_proof_url(self, row):
+        url = (row['deposit_proof'] or '').strip()
+        if url.startswith('http://') or url.startswith('https://'):
+            return url
+        return None
+
+
+class OrderListSerializer(ValuesListSerializer):
+    serializer_class = OrderDetailSerializer
+    lookups = ('product',)
+
+    def prepare(self, rows):
+        products = (
+            Product.objects.select_related('category').prefetch_related('product_images')
+            .in_bulk({row['product'] for row in rows})
+        )
+        self.products = {
+            pk: ProductSerializer(product, context=self.context).data
+            for pk, product in products.items()
+        }
+
+    def get_product(self, row):
+        return self.products[row['product']]
+
+    def get_txid_proof_url(self, row):
+        proof = row['txid_proof']
+        return proof if proof and proof.startswith('http') else None
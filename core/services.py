@@ -1,195 +1,912 @@
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Sum
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction, IntegrityError
+from django.db.backends.utils import format_number
+from django.db.models import (
+    Sum, Count, Max, F, Q, Case, When, Value, DecimalField, DateField, OuterRef, Subquery
+)
+from django.db.models.functions import Coalesce, Mod, TruncMonth
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
 from decimal import Decimal
-from datetime import timedelta
+from datetime import datetime, time, timedelta
+from io import BytesIO
+import gzip
+import heapq
+import json
+from config.db_backends import immediate_atomic
+from .profiling import phase
 from .models import (
     Deposit, DailyEarning, Wallet, Transaction, Referral,
-    ROISetting, ReinvestSetting, Withdrawal
+    ROISetting, ReinvestSetting, Withdrawal, UserDailySummary,
+    TransactionArchive, DailyEarningArchive, BalanceCheckpoint, WalletSnapshot, Job
 )
 from users.models import User
 
 
+class WalletService:
+    """
+    Lock-free wallet mutations.
+
+    Each change is applied as a single `UPDATE ... SET col = col + delta`
+    together with its Transaction rows inside one database transaction, so
+    concurrent approvals and earnings runs never overwrite each other.
+
+    Deltas are rounded to cents like the Transaction amounts they mirror;
+    SQLite would otherwise keep the extra digits in the column and drift
+    away from the ledger. Callers that add several amounts into one delta
+    should round each of them with `cents` first.
+    """
+
+    @staticmethod
+    def cents(amount):
+        """Round `amount` the way a DecimalField with two places stores it"""
+        return Decimal(format_number(amount, 14, 2))
+
+    @staticmethod
+    def apply(user, deltas, transactions=(), **assignments):
+        """Add each `deltas` amount to its wallet column and record `transactions`"""
+        deltas = {field: WalletService.cents(amount) for field, amount in deltas.items()}
+        updates = {field: F(field) + amount for field, amount in deltas.items() if amount}
+        updates.update(assignments)
+
+        with transaction.atomic():
+            if updates:
+                updates['updated_at'] = timezone.now()
+                if not Wallet.objects.filter(user=user).update(**updates):
+                    Wallet.objects.get_or_create(user=user, defaults={'balance': 0})
+                    Wallet.objects.filter(user=user).update(**updates)
+
+            return Transaction.objects.bulk_create([
+                Transaction(user=user, **entry) for entry in transactions
+            ])
+
+    @staticmethod
+    def apply_bulk(deltas_by_user, transactions=()):
+        """
+        Apply `deltas_by_user` ({user_id: {field: amount}}) to many wallets with
+        one CASE-based UPDATE, and bulk insert `transactions` (dicts with user_id)
+        """
+        deltas_by_user = {
+            user_id: {field: WalletService.cents(amount) for field, amount in deltas.items()}
+            for user_id, deltas in deltas_by_user.items()
+        }
+        deltas_by_user = {
+            user_id: {field: amount for field, amount in deltas.items() if amount}
+            for user_id, deltas in deltas_by_user.items()
+        }
+        user_ids = [user_id for user_id, deltas in deltas_by_user.items() if deltas]
+
+        with transaction.atomic():
+            if user_ids:
+                existing = set(
+                    Wallet.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True)
+                )
+                Wallet.objects.bulk_create(
+                    [Wallet(user_id=user_id) for user_id in user_ids if user_id not in existing],
+                    ignore_conflicts=True
+                )
+
+                fields = {field for deltas in deltas_by_user.values() for field in deltas}
+                updates = {}
+                for field in fields:
+                    whens = [
+                        When(user_id=user_id, then=Value(deltas[field]))
+                        for user_id, deltas in deltas_by_user.items() if field in deltas
+                    ]
+                    updates[field] = F(field) + Case(
+                        *whens,
+                        default=Value(Decimal('0')),
+                        output_field=DecimalField(max_digits=14, decimal_places=2)
+                    )
+                updates['updated_at'] = timezone.now()
+                Wallet.objects.filter(user_id__in=user_ids).update(**updates)
+
+            return Transaction.objects.bulk_create([
+                Transaction(**entry) for entry in transactions
+            ])
+
+    @staticmethod
+    def credit(user, amount, fields=('balance',), transaction_type=None, description=''):
+        """Credit `amount` to each of `fields`, optionally recording a Transaction"""
+        transactions = []
+        if transaction_type:
+            transactions.append({
+                'transaction_type': transaction_type,
+                'amount': amount,
+                'description': description,
+            })
+        return WalletService.apply(user, {field: amount for field in fields}, transactions)
+
+    @staticmethod
+    def debit(user, amount, fields=('balance',), transaction_type=None, description=''):
+        """Debit `amount` from each of `fields`, optionally recording a negative Transaction"""
+        return WalletService.credit(user, -amount, fields, transaction_type, description)
+
+    @staticmethod
+    def hold(user, amount, transactions=()):
+        """
+        Debit `amount` from the balance only if the balance covers it, and
+        record `transactions` if it did. The check and the debit are one
+        conditional UPDATE, so concurrent requests cannot overdraw.
+        """
+        amount = WalletService.cents(amount)
+        with transaction.atomic():
+            held = Wallet.objects.filter(user=user, balance__gte=amount).update(
+                balance=F('balance') - amount,
+                updated_at=timezone.now()
+            )
+            if held:
+                Transaction.objects.bulk_create([
+                    Transaction(user=user, **entry) for entry in transactions
+                ])
+        return bool(held)
+
+
+class SummaryService:
+    """
+    Maintains UserDailySummary, the per-user per-day rollup of DailyEarning.
+    
+    The engine calls `add` in the same transaction that inserts the raw
+    DailyEarning rows, so readers can use the rollup instead of aggregating
+    the raw table; `rebuild` recomputes it from DailyEarning.
+    """
+    
+    EARNING_TYPES = ('mining', 'roi', 'reinvest', 'referral')
+    
+    @staticmethod
+    def add(user_id, date, amounts):
+        """Add {earning_type: amount} to the user's summary for `date`"""
+        # Round the way DailyEarning.amount is stored so the rollup matches a
+        # SUM over the raw rows to the cent.
+        amounts = {
+            earning_type: WalletService.cents(amount)
+            for earning_type, amount in amounts.items() if amount
+        }
+        if not amounts:
+            return
+        total = sum(amounts.values())
+        updates = {earning_type: F(earning_type) + amount for earning_type, amount in amounts.items()}
+        updates['total'] = F('total') + total
+        updates['updated_at'] = timezone.now()
+        
+        with transaction.atomic():
+            summary = UserDailySummary.objects.filter(user_id=user_id, date=date)
+            if summary.update(**updates):
+                return
+            try:
+                with transaction.atomic():
+                    UserDailySummary.objects.create(user_id=user_id, date=date, total=total, **amounts)
+            except IntegrityError:
+                summary.update(**updates)
+    
+    @staticmethod
+    def rebuild(user_ids=None, since=None, batch_size=2000):
+        """
+        Recompute summaries from DailyEarning and DailyEarningArchive,
+        optionally for some users or from a date on
+        """
+        summaries = UserDailySummary.objects.all()
+        if user_ids is not None:
+            summaries = summaries.filter(user_id__in=user_ids)
+        if since is not None:
+            summaries = summaries.filter(date__gte=since)
+        
+        zero = Value(Decimal('0'))
+        totals = {
+            earning_type: Sum(Case(
+                When(earning_type=earning_type, then=F('amount')),
+                default=zero,
+                output_field=DecimalField(max_digits=14, decimal_places=2)
+            ))
+            for earning_type in SummaryService.EARNING_TYPES
+        }
+        
+        def day_totals(model):
+            earnings = model.objects.all()
+            if user_ids is not None:
+                earnings = earnings.filter(user_id__in=user_ids)
+            if since is not None:
+                earnings = earnings.filter(earned_date__gte=since)
+            return (
+                earnings.order_by('user_id', 'earned_date')
+                .values('user_id', 'earned_date')
+                .annotate(total=Sum('amount'), **totals)
+                .iterator(chunk_size=batch_size)
+            )
+        
+        # Both streams are sorted by (user, day), so they merge in one pass;
+        # a day still split between the live and archive tables is summed.
+        key = itemgetter('user_id', 'earned_date')
+        merged = heapq.merge(day_totals(DailyEarning), day_totals(DailyEarningArchive), key=key)
+        
+        created = 0
+        with transaction.atomic():
+            summaries.delete()
+            batch = []
+            for (user_id, date), parts in groupby(merged, key=key):
+                parts = list(parts)
+                batch.append(UserDailySummary(
+                    user_id=user_id,
+                    date=date,
+                    **{
+                        field: sum(part[field] for part in parts)
+                        for field in ('total', *SummaryService.EARNING_TYPES)
+                    }
+                ))
+                if len(batch) >= batch_size:
+                    UserDailySummary.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            UserDailySummary.objects.bulk_create(batch)
+            created += len(batch)
+        return created
+
+
+class LedgerService:
+    """
+    Which Transaction rows move which Wallet column.
+    
+    Reinvest rows, pending-deposit records and order records are
+    informational and move nothing; deposit-approval commissions
+    ('Level N referral commission') only move referral_earnings.
+    """
+    
+    WALLET_FIELDS = ('mining_income', 'roi_earnings', 'referral_earnings', 'signup_bonus', 'balance')
+    
+    @staticmethod
+    def wallet_conditions():
+        signup = Q(transaction_type='deposit', description='Signup bonus')
+        approved_deposit = Q(transaction_type='deposit', description__startswith='Deposit approved for')
+        daily_referral = Q(transaction_type='referral', description__startswith='Referral commission from')
+        return {
+            'mining_income': Q(transaction_type='mining') | approved_deposit,
+            'roi_earnings': Q(transaction_type='roi'),
+            'referral_earnings': Q(transaction_type='referral'),
+            'signup_bonus': signup,
+            'balance': (
+                signup | approved_deposit | daily_referral
+                | Q(transaction_type__in=['mining', 'roi', 'withdrawal'])
+            ),
+        }
+    
+    @staticmethod
+    def totals(transactions, *group_by):
+        """
+        Group a Transaction (or TransactionArchive) queryset by `group_by` and
+        annotate each wallet column's net movement plus `transaction_count`
+        """
+        output_field = DecimalField(max_digits=14, decimal_places=2)
+        annotations = {
+            field: Coalesce(Sum('amount', filter=condition), Value(Decimal('0')), output_field=output_field)
+            for field, condition in LedgerService.wallet_conditions().items()
+        }
+        return (
+            transactions.order_by()
+            .values(*group_by)
+            .annotate(transaction_count=Count('id'), **annotations)
+        )
+
+
+class ReconciliationService:
+    """
+    Recomputes wallet columns from the ledger and diffs them with the stored values.
+    
+    Expected totals come from LedgerService over live transactions plus the
+    BalanceCheckpoint rows of archived months. Withdrawal holds and their
+    refunds are Transaction rows like any other balance movement.
+    """
+    
+    @staticmethod
+    def expected_totals(user_ids=None):
+        """Return {user_id: {wallet field: expected amount}} using a few GROUP BY queries"""
+        transactions = Transaction.objects.all()
+        checkpoints = BalanceCheckpoint.objects.all()
+        if user_ids is not None:
+            transactions = transactions.filter(user_id__in=user_ids)
+            checkpoints = checkpoints.filter(user_id__in=user_ids)
+        
+        expected = defaultdict(lambda: dict.fromkeys(LedgerService.WALLET_FIELDS, Decimal('0')))
+        for row in LedgerService.totals(transactions, 'user_id'):
+            for field in LedgerService.WALLET_FIELDS:
+                expected[row['user_id']][field] += row[field]
+        
+        checkpoint_totals = checkpoints.order_by().values('user_id').annotate(
+            **{field: Sum(field) for field in LedgerService.WALLET_FIELDS}
+        )
+        for row in checkpoint_totals:
+            for field in LedgerService.WALLET_FIELDS:
+                expected[row['user_id']][field] += row[field]
+        
+        cent = Decimal('0.01')
+        return {
+            user_id: {field: amount.quantize(cent) for field, amount in totals.items()}
+            for user_id, totals in expected.items()
+        }
+    
+    @staticmethod
+    def diff(user_ids=None, tolerance=Decimal('0')):
+        """
+        Return [(wallet values dict, {field: expected})] for every wallet whose
+        stored columns differ from the ledger by more than `tolerance`
+        """
+        expected = ReconciliationService.expected_totals(user_ids)
+        wallets = Wallet.objects.order_by('id').values('id', 'user_id', *LedgerService.WALLET_FIELDS)
+        if user_ids is not None:
+            wallets = wallets.filter(user_id__in=user_ids)
+        
+        zero = dict.fromkeys(LedgerService.WALLET_FIELDS, Decimal('0'))
+        mismatches = []
+        for wallet in wallets.iterator(chunk_size=5000):
+            totals = expected.get(wallet['user_id'], zero)
+            changed = {
+                field: totals[field] for field in LedgerService.WALLET_FIELDS
+                if abs(wallet[field] - totals[field]) > tolerance
+            }
+            if changed:
+                mismatches.append((wallet, changed))
+        return mismatches
+    
+    @staticmethod
+    def apply(user_ids, tolerance=Decimal('0'), batch_size=1000):
+        """
+        Correct the wallets of `user_ids` to their ledger totals; returns wallets updated.
+        
+        Each batch locks its wallets before re-reading the ledger, so a credit
+        that commits concurrently is either already counted or waits for us.
+        """
+        updated = 0
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), batch_size):
+            batch_ids = user_ids[start:start + batch_size]
+            with transaction.atomic():
+                wallets = list(Wallet.objects.select_for_update().filter(user_id__in=batch_ids))
+                expected = ReconciliationService.expected_totals(batch_ids)
+                zero = dict.fromkeys(LedgerService.WALLET_FIELDS, Decimal('0'))
+                changed = []
+                for wallet in wallets:
+                    totals = expected.get(wallet.user_id, zero)
+                    if any(abs(getattr(wallet, field) - totals[field]) > tolerance for field in LedgerService.WALLET_FIELDS):
+                        for field in LedgerService.WALLET_FIELDS:
+                            setattr(wallet, field, totals[field])
+                        wallet.updated_at = timezone.now()
+                        changed.append(wallet)
+                Wallet.objects.bulk_update(changed, [*LedgerService.WALLET_FIELDS, 'updated_at'])
+                updated += len(changed)
+        return updated
+
+
+class SnapshotService:
+    """
+    Writes WalletSnapshot rows and answers "what was this wallet at time T".
+
+    A wallet at T is its latest snapshot taken at or before T plus the ledger
+    movements between the two, so with daily snapshots a historical lookup
+    only reads a day of transactions instead of the user's whole history.
+    """
+
+    @staticmethod
+    def end_of_day(date):
+        return timezone.make_aware(datetime.combine(date + timedelta(days=1), time.min))
+
+    @staticmethod
+    def capture(date, batch_size=5000):
+        """
+        Snapshot every wallet changed since the previous capture; returns rows written.
+
+        A snapshot's ledger movements are replayed from its taken_at, so
+        taken_at must split the ledger exactly where the balances were read.
+        The wallets are read under a row lock (the write lock on SQLite) and
+        taken_at is stamped once the read is done: a credit that committed
+        before the read has an earlier created_at, and one that waited for
+        the lock gets a later one. The wallets stay locked until the
+        snapshot rows are committed.
+        """
+        previous = WalletSnapshot.objects.aggregate(latest=Max('taken_at'))['latest']
+        started_at = timezone.now()
+
+        with immediate_atomic():
+            wallets = (
+                Wallet.objects.select_for_update()
+                .order_by('id')
+                .values('user_id', *LedgerService.WALLET_FIELDS)
+            )
+            if previous is not None:
+                wallets = wallets.filter(updated_at__gte=previous)
+
+            written = 0
+            batch = []
+            for wallet in wallets.iterator(chunk_size=batch_size):
+                batch.append(WalletSnapshot(date=date, taken_at=started_at, **wallet))
+                if len(batch) >= batch_size:
+                    written += SnapshotService._save(batch)
+                    batch = []
+            if batch:
+                written += SnapshotService._save(batch)
+
+            WalletSnapshot.objects.filter(date=date, taken_at=started_at).update(taken_at=timezone.now())
+        return written
+
+    @staticmethod
+    def _save(snapshots):
+        WalletSnapshot.objects.bulk_create(
+            snapshots,
+            update_conflicts=True,
+            unique_fields=['user', 'date'],
+            update_fields=[*LedgerService.WALLET_FIELDS, 'taken_at'],
+        )
+        return len(snapshots)
+
+    @staticmethod
+    def wallets_at(moment, user_ids, batch_size=2000):
+        """
+        Return {user_id: {wallet field: amount}} as of `moment` for `user_ids`.
+
+        Users without a snapshot before `moment` fall back to summing their
+        full ledger; users with no wallet movement at all are left out.
+        """
+        user_ids = list(user_ids)
+        result = {}
+        for start in range(0, len(user_ids), batch_size):
+            batch_ids = user_ids[start:start + batch_size]
+            latest = (
+                WalletSnapshot.objects.filter(user_id=OuterRef('user_id'), taken_at__lte=moment)
+                .order_by('-taken_at')
+                .values('id')[:1]
+            )
+            snapshots = (
+                WalletSnapshot.objects.filter(user_id__in=batch_ids, id=Subquery(latest))
+                .values('user_id', 'taken_at', *LedgerService.WALLET_FIELDS)
+            )
+
+            # Snapshots are written in bulk, so most users share a taken_at and
+            # each group needs only one set of delta queries.
+            groups = defaultdict(list)
+            for row in snapshots:
+                result[row['user_id']] = {field: row[field] for field in LedgerService.WALLET_FIELDS}
+                groups[row['taken_at']].append(row['user_id'])
+            groups[None] = [user_id for user_id in batch_ids if user_id not in result]
+
+            for since, ids in groups.items():
+                if ids:
+                    SnapshotService._add_movements(result, ids, since, moment)
+        
+        cent = Decimal('0.01')
+        return {
+            user_id: {field: amount.quantize(cent) for field, amount in wallet.items()}
+            for user_id, wallet in result.items()
+        }
+
+    @staticmethod
+    def _add_movements(result, user_ids, since, until):
+        """Add ledger movements of `user_ids` in (since, until] to `result`"""
+        window = Q(user_id__in=user_ids, created_at__lte=until)
+        if since is not None:
+            window &= Q(created_at__gt=since)
+
+        zero = dict.fromkeys(LedgerService.WALLET_FIELDS, Decimal('0'))
+        for model in (Transaction, TransactionArchive):
+            for row in LedgerService.totals(model.objects.filter(window), 'user_id'):
+                wallet = result.setdefault(row['user_id'], dict(zero))
+                for field in LedgerService.WALLET_FIELDS:
+                    wallet[field] += row[field]
+
+    @staticmethod
+    def balances_on(pairs):
+        """Return {(user_id, date): end-of-day balance} for an iterable of (user_id, date)"""
+        users_by_date = defaultdict(set)
+        for user_id, date in pairs:
+            users_by_date[date].add(user_id)
+
+        balances = {}
+        for date, user_ids in users_by_date.items():
+            wallets = SnapshotService.wallets_at(SnapshotService.end_of_day(date), user_ids)
+            for user_id in user_ids:
+                balances[(user_id, date)] = wallets.get(user_id, {}).get('balance', Decimal('0'))
+        return balances
+
+
 class EarningService:
     
     @staticmethod
-    def calculate_daily_earnings():
-        """Calculate daily mining and ROI earnings for all active deposits"""
-        today = timezone.now().date()
+    def calculate_daily_earnings(deposit_ids=None, user_ids=None, date=None, opening_balances=None, bucket=None):
+        """
+        Calculate daily mining and ROI earnings for all active deposits, or only
+        for the given `deposit_ids` / `user_ids` when either is passed.
+        
+        `bucket` = (index, count) limits the run to users whose id modulo
+        `count` is `index`, for staggered accrual across the day.
+        
+        `date` credits a past day instead of today. ROI is then computed on
+        `opening_balances` ({user_id: balance}, see `catch_up`) rather than on
+        the current wallet, and the dict is advanced by what gets credited.
+        
+        Returns {'processed': deposits credited, 'rows_written': rows inserted}.
+        """
+        today = date or timezone.now().date()
         
+        # Matured deposits only match when catching up a day before they matured
         approved_deposits = Deposit.objects.filter(
-            status='approved',
+            status__in=Deposit.FUNDED_STATUSES,
+            matures_on__gt=today,
             package__is_active=True
-        )
+        ).select_related('package')
+        if deposit_ids is not None:
+            approved_deposits = approved_deposits.filter(pk__in=deposit_ids)
+        if user_ids is not None:
+            approved_deposits = approved_deposits.filter(user_id__in=user_ids)
+        if bucket is not None:
+            approved_deposits = EarningService._in_bucket(approved_deposits, 'user_id', bucket)
         
-        for deposit in approved_deposits:
-            if not deposit.approved_at:
-                continue
-                
-            approved_date = deposit.approved_at.date()
-            days_elapsed = (today - approved_date).days
-            
-            if days_elapsed >= deposit.package.duration_days:
-                continue
-            
-            user = deposit.user
-            wallet = user.wallet
-            
-            mining_earning = deposit.package.daily_earning
-            
+        with phase('load'):
             roi_setting = ROISetting.objects.filter(is_active=True).first()
             if not roi_setting:
                 roi_percentage = Decimal('1.0')
             else:
                 roi_percentage = (roi_setting.min_percentage + roi_setting.max_percentage) / 2
             
-            roi_earning = (wallet.balance * roi_percentage) / 100
+            reinvest_setting = ReinvestSetting.objects.filter(is_active=True).first()
+            approved_deposits = list(approved_deposits)
+        
+        stats = {'processed': 0, 'rows_written': 0}
+        for deposit in approved_deposits:
+            # A catch-up date can precede the approval
+            if not deposit.approved_at or deposit.approved_at.date() > today:
+                continue
             
-            existing_mining = DailyEarning.objects.filter(
+            stats['processed'] += 1
+            stats['rows_written'] += EarningService._credit_deposit_earnings(
+                deposit, today, roi_percentage, reinvest_setting, opening_balances
+            )
+        return stats
+    
+    @staticmethod
+    def settle_matured_deposits(today=None):
+        """
+        Move approved deposits whose term has ended to 'matured' with a single
+        UPDATE, so the live set stays proportional to active investments
+        """
+        today = today or timezone.now().date()
+        return Deposit.objects.filter(status='approved', matures_on__lte=today).update(
+            status='matured',
+            updated_at=timezone.now()
+        )
+    
+    @staticmethod
+    def opening_balances(day, bucket=None):
+        """
+        {user_id: balance} at the start of `day` for users with deposits
+        earning that day (optionally one user-id `bucket`), read from wallet
+        snapshots so credits and holds made during the day don't count
+        """
+        deposits = Deposit.objects.filter(status__in=Deposit.FUNDED_STATUSES, matures_on__gt=day)
+        if bucket is not None:
+            deposits = EarningService._in_bucket(deposits, 'user_id', bucket)
+        user_ids = list(deposits.values_list('user_id', flat=True).distinct())
+        wallets = SnapshotService.wallets_at(SnapshotService.end_of_day(day - timedelta(days=1)), user_ids)
+        return {user_id: wallets.get(user_id, {}).get('balance', Decimal('0')) for user_id in user_ids}
+    
+    @staticmethod
+    def _in_bucket(queryset, user_field, bucket):
+        index, count = bucket
+        return queryset.annotate(user_bucket=Mod(user_field, count)).filter(user_bucket=index)
+    
+    @staticmethod
+    def catch_up(since, until=None):
+        """
+        Credit every day from `since` through `until` (default yesterday) that
+        the nightly run missed, oldest first.
+        
+        Each day's ROI uses the balance at the start of that day, read from
+        wallet snapshots, plus what the earlier days of this catch-up credited.
+        Returns {date: {'processed', 'rows_written', 'referrals'}}.
+        """
+        until = until or timezone.now().date() - timedelta(days=1)
+        user_ids = list(
+            Deposit.objects.filter(status__in=Deposit.FUNDED_STATUSES, matures_on__gt=since)
+            .values_list('user_id', flat=True).distinct()
+        )
+        credited = defaultdict(Decimal)
+        results = {}
+        day = since
+        while day <= until:
+            with phase('load'):
+                wallets = SnapshotService.wallets_at(SnapshotService.end_of_day(day - timedelta(days=1)), user_ids)
+            opening = {
+                user_id: wallets.get(user_id, {}).get('balance', Decimal('0')) + credited[user_id]
+                for user_id in user_ids
+            }
+            before = dict(opening)
+            stats = EarningService.calculate_daily_earnings(date=day, opening_balances=opening)
+            for user_id, balance in opening.items():
+                credited[user_id] += balance - before[user_id]
+            with phase('referral'):
+                stats['referrals'] = EarningService.process_referral_earnings(date=day)['rows_written']
+            results[day] = stats
+            day += timedelta(days=1)
+        return results
+    
+    @staticmethod
+    def _credit_deposit_earnings(deposit, today, roi_percentage, reinvest_setting, opening_balances=None):
+        """Credit one deposit's mining, ROI and reinvest earnings for `today`; returns rows written"""
+        user = deposit.user
+        if opening_balances is not None:
+            balance = opening_balances.get(user.id)
+        else:
+            with phase('load'):
+                balance = Wallet.objects.filter(user=user).values_list('balance', flat=True).first()
+        if balance is None:
+            return 0
+        
+        with phase('compute'):
+            mining_earning = deposit.package.daily_earning
+            roi_earning = WalletService.cents((balance * roi_percentage) / 100)
+        
+        deltas = {'mining_income': Decimal('0'), 'roi_earnings': Decimal('0'), 'balance': Decimal('0')}
+        summary = {}
+        transactions = []
+        
+        with phase('write'), immediate_atomic():
+            _, created = DailyEarning.objects.get_or_create(
                 user=user,
                 earning_type='mining',
                 earned_date=today,
-                deposit=deposit
-            ).exists()
-            
-            if not existing_mining:
-                DailyEarning.objects.create(
-                    user=user,
-                    earning_type='mining',
-                    amount=mining_earning,
-                    deposit=deposit,
-                    earned_date=today
-                )
-                
-                wallet.mining_income += mining_earning
-                Transaction.objects.create(
-                    user=user,
-                    transaction_type='mining',
-                    amount=mining_earning,
-                    description=f'Daily mining from {deposit.package.name}'
-                )
-            
-            existing_roi = DailyEarning.objects.filter(
-                user=user,
-                earning_type='roi',
-                earned_date=today,
-                deposit=deposit
-            ).exists()
+                deposit=deposit,
+                defaults={'amount': mining_earning}
+            )
+            if created:
+                deltas['mining_income'] += mining_earning
+                deltas['balance'] += mining_earning
+                summary['mining'] = mining_earning
+                transactions.append({
+                    'transaction_type': 'mining',
+                    'amount': mining_earning,
+                    'description': f'Daily mining from {deposit.package.name}',
+                })
             
-            if not existing_roi and roi_earning > 0:
-                DailyEarning.objects.create(
+            if roi_earning > 0:
+                _, created = DailyEarning.objects.get_or_create(
                     user=user,
                     earning_type='roi',
-                    amount=roi_earning,
+                    earned_date=today,
                     deposit=deposit,
-                    earned_date=today
-                )
-                
-                wallet.roi_earnings += roi_earning
-                Transaction.objects.create(
-                    user=user,
-                    transaction_type='roi',
-                    amount=roi_earning,
-                    description=f'Daily ROI earning ({roi_percentage}%)'
+                    defaults={'amount': roi_earning}
                 )
+                if created:
+                    deltas['roi_earnings'] += roi_earning
+                    deltas['balance'] += roi_earning
+                    summary['roi'] = roi_earning
+                    transactions.append({
+                        'transaction_type': 'roi',
+                        'amount': roi_earning,
+                        'description': f'Daily ROI earning ({roi_percentage}%)',
+                    })
             
-            reinvest_setting = ReinvestSetting.objects.filter(is_active=True).first()
             if reinvest_setting and reinvest_setting.percentage > 0:
                 total_daily_earning = mining_earning + roi_earning
                 reinvest_amount = (total_daily_earning * reinvest_setting.percentage) / 100
                 
                 if reinvest_amount > 0:
-                    existing_reinvest = DailyEarning.objects.filter(
+                    _, created = DailyEarning.objects.get_or_create(
                         user=user,
                         earning_type='reinvest',
                         earned_date=today,
-                        deposit=deposit
-                    ).exists()
-                    
-                    if not existing_reinvest:
-                        DailyEarning.objects.create(
-                            user=user,
-                            earning_type='reinvest',
-                            amount=reinvest_amount,
-                            deposit=deposit,
-                            earned_date=today
-                        )
-                        
-                        wallet.balance += reinvest_amount
-                        Transaction.objects.create(
-                            user=user,
-                            transaction_type='reinvest',
-                            amount=reinvest_amount,
-                            description=f'Auto reinvest ({reinvest_setting.percentage}%)'
-                        )
-            
-            total_earning = mining_earning + roi_earning
+                        deposit=deposit,
+                        defaults={'amount': reinvest_amount}
+                    )
+                    if created:
+                        summary['reinvest'] = reinvest_amount
+                        transactions.append({
+                            'transaction_type': 'reinvest',
+                            'amount': reinvest_amount,
+                            'description': f'Auto reinvest ({reinvest_setting.percentage}%)',
+                        })
             
-            if reinvest_setting and reinvest_setting.percentage > 0:
-                available_earning = total_earning - ((total_earning * reinvest_setting.percentage) / 100)
+            SummaryService.add(user.id, today, summary)
+            # The reinvested share and the available share together add up
+            # to the full daily earning, so the balance grows by mining + ROI.
+            if opening_balances is not None:
+                opening_balances[user.id] += deltas['balance']
+                WalletService.apply(user, deltas, transactions)
             else:
-                available_earning = total_earning
-            
-            wallet.balance += available_earning
-            wallet.last_earning_date = today
-            wallet.save()
+                WalletService.apply(user, deltas, transactions, last_earning_date=today)
+        # Each credited earning writes one DailyEarning and one Transaction row
+        return len(transactions) * 2
     
     @staticmethod
-    def process_referral_earnings():
-        """Process referral earnings for active referrals"""
-        today = timezone.now().date()
+    def process_referral_earnings(user_ids=None, date=None):
+        """
+        Process referral earnings for active referrals, or only for referrals of
+        the given referred `user_ids`, for today or a past `date`.
+        
+        Commissions are a share of the referred user's earnings for the day,
+        so run this once those are credited for every user (after all buckets
+        of a staggered run).
+        
+        Returns {'processed': referrals examined, 'rows_written': rows inserted}.
+        """
+        today = date or timezone.now().date()
         
-        referrals = Referral.objects.all()
+        referrals = Referral.objects.select_related('referrer', 'referral_user')
+        if user_ids is not None:
+            referrals = referrals.filter(referral_user_id__in=user_ids)
         
+        stats = {'processed': 0, 'rows_written': 0}
         for referral in referrals:
+            stats['processed'] += 1
             referrer = referral.referrer
             referred_user = referral.referral_user
             
             active_deposits = Deposit.objects.filter(
                 user=referred_user,
-                status='approved'
+                status__in=Deposit.FUNDED_STATUSES
             ).exists()
             
             if not active_deposits:
                 continue
             
-            today_earnings = DailyEarning.objects.filter(
+            today_earnings = UserDailySummary.objects.filter(
                 user=referred_user,
-                earned_date=today
-            ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0.00')
+                date=today
+            ).values_list('total', flat=True).first() or Decimal('0.00')
             
             if today_earnings > 0:
                 commission_percentage = EarningService.get_referral_commission(referral.level)
-                referral_earning = (today_earnings * commission_percentage) / 100
+                referral_earning = WalletService.cents((today_earnings * commission_percentage) / 100)
                 
                 if referral_earning > 0:
-                    existing = DailyEarning.objects.filter(
+                    existing = UserDailySummary.objects.filter(
                         user=referrer,
-                        earning_type='referral',
-                        earned_date=today
+                        date=today,
+                        referral__gt=0
                     ).exists()
                     
                     if not existing:
-                        DailyEarning.objects.create(
-                            user=referrer,
-                            earning_type='referral',
-                            amount=referral_earning,
-                            earned_date=today
-                        )
-                        
-                        wallet = referrer.wallet
-                        wallet.referral_earnings += referral_earning
-                        wallet.balance += referral_earning
-                        wallet.save()
-                        
-                        referral.total_earned += referral_earning
-                        referral.save()
-                        
-                        Transaction.objects.create(
-                            user=referrer,
-                            transaction_type='referral',
-                            amount=referral_earning,
-                            description=f'Referral commission from {referred_user.email} ({commission_percentage}%)'
-                        )
+                        with immediate_atomic():
+                            DailyEarning.objects.create(
+                                user=referrer,
+                                earning_type='referral',
+                                amount=referral_earning,
+                                earned_date=today
+                            )
+                            SummaryService.add(referrer.id, today, {'referral': referral_earning})
+                            
+                            Referral.objects.filter(pk=referral.pk).update(
+                                total_earned=F('total_earned') + referral_earning
+                            )
+                            
+                            WalletService.credit(
+                                referrer,
+                                referral_earning,
+                                fields=('referral_earnings', 'balance'),
+                                transaction_type='referral',
+                                description=f'Referral commission from {referred_user.email} ({commission_percentage}%)'
+                            )
+                        stats['rows_written'] += 2
+        return stats
+    
+    @staticmethod
+    def calculate_earnings_for_deposits(deposit_ids):
+        """
+        Credit today's earnings for just these deposits and the referral
+        commissions that depend on them, using the same rules as the nightly run
+        """
+        deposit_ids = list(deposit_ids)
+        if not deposit_ids:
+            return
+        user_ids = set(
+            Deposit.objects.filter(pk__in=deposit_ids).values_list('user_id', flat=True)
+        )
+        EarningService.calculate_daily_earnings(deposit_ids=deposit_ids)
+        # Until today's staggered earnings.referrals job has run, leave the
+        # commissions to it: a partial-day payout here would block its full one
+        if getattr(settings, 'EARNINGS_STAGGER_BUCKETS', 0) and not Job.objects.filter(
+            key=f'earnings.referrals:{timezone.now().date()}', status='succeeded'
+        ).exists():
+            return
+        EarningService.process_referral_earnings(user_ids=user_ids)
+    
+    # (level, commission %, upline must have an approved deposit)
+    DEPOSIT_COMMISSION_LEVELS = [
+        (1, Decimal('5.00'), False),
+        (2, Decimal('2.00'), True),
+        (3, Decimal('1.00'), True),
+    ]
+    
+    @staticmethod
+    def process_deposit_commissions(deposits):
+        """
+        Pay one-off upline commissions for newly approved `deposits`.
+        
+        The referral chains of all depositors are loaded level by level and
+        every Referral, Wallet and Transaction write is batched, so the cost
+        is a fixed number of queries regardless of how many deposits are passed.
+        """
+        deposits = [deposit for deposit in deposits if deposit.user.referred_by_id]
+        if not deposits:
+            return
+        
+        max_level = len(EarningService.DEPOSIT_COMMISSION_LEVELS)
+        uplines = {}
+        pending = {deposit.user.referred_by_id for deposit in deposits}
+        for _ in range(max_level):
+            pending -= uplines.keys()
+            if not pending:
+                break
+            rows = User.objects.filter(id__in=pending).values('id', 'referred_by_id', 'account_status')
+            uplines.update({row['id']: row for row in rows})
+            pending = {row['referred_by_id'] for row in rows if row['referred_by_id']}
+        
+        funded_uplines = set(
+            Deposit.objects.filter(user_id__in=uplines.keys(), status__in=Deposit.FUNDED_STATUSES)
+            .values_list('user_id', flat=True).distinct()
+        )
+        
+        earned = defaultdict(Decimal)
+        levels = {}
+        wallet_deltas = defaultdict(lambda: {'referral_earnings': Decimal('0')})
+        transactions = []
+        
+        for deposit in deposits:
+            current = uplines.get(deposit.user.referred_by_id)
+            for level, percentage, requires_deposit in EarningService.DEPOSIT_COMMISSION_LEVELS:
+                if not current or current['account_status'] != 'active':
+                    break
+                
+                if not requires_deposit or current['id'] in funded_uplines:
+                    commission_amount = WalletService.cents(Decimal(deposit.amount) * (percentage / Decimal('100')))
+                    pair = (current['id'], deposit.user_id)
+                    earned[pair] += commission_amount
+                    levels.setdefault(pair, (level, percentage))
+                    wallet_deltas[current['id']]['referral_earnings'] += commission_amount
+                    transactions.append({
+                        'user_id': current['id'],
+                        'transaction_type': 'referral',
+                        'amount': commission_amount,
+                        'description': f'Level {level} referral commission from {deposit.user.email}',
+                    })
+                
+                current = uplines.get(current['referred_by_id'])
+        
+        if not earned:
+            return
+        
+        with transaction.atomic():
+            existing = {
+                (ref.referrer_id, ref.referral_user_id): ref.pk
+                for ref in Referral.objects.filter(
+                    referrer_id__in={referrer_id for referrer_id, _ in earned},
+                    referral_user_id__in={user_id for _, user_id in earned},
+                ).only('id', 'referrer_id', 'referral_user_id')
+                if (ref.referrer_id, ref.referral_user_id) in earned
+            }
+            
+            Referral.objects.bulk_create([
+                Referral(
+                    referrer_id=referrer_id,
+                    referral_user_id=user_id,
+                    level=levels[(referrer_id, user_id)][0],
+                    commission_percentage=levels[(referrer_id, user_id)][1],
+                    total_earned=amount,
+                )
+                for (referrer_id, user_id), amount in earned.items()
+                if (referrer_id, user_id) not in existing
+            ])
+            
+            if existing:
+                Referral.objects.filter(pk__in=existing.values()).update(
+                    total_earned=F('total_earned') + Case(
+                        *[When(pk=pk, then=Value(earned[pair])) for pair, pk in existing.items()],
+                        default=Value(Decimal('0')),
+                        output_field=DecimalField(max_digits=14, decimal_places=2)
+                    )
+                )
+            
+            WalletService.apply_bulk(wallet_deltas, transactions)
     
     @staticmethod
     def get_referral_commission(level):
@@ -229,7 +946,7 @@ class EarningService:
         
         total_invested = Deposit.objects.filter(
             user=user,
-            status='approved'
+            status__in=Deposit.FUNDED_STATUSES
         ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0.00')
         
         total_withdrawals = Withdrawal.objects.filter(
@@ -239,10 +956,10 @@ class EarningService:
         
         referral_count = user.referrals_given.count()
         
-        today_earnings = DailyEarning.objects.filter(
+        today_earnings = UserDailySummary.objects.filter(
             user=user,
-            earned_date=timezone.now().date()
-        ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0.00')
+            date=timezone.now().date()
+        ).values_list('total', flat=True).first() or Decimal('0.00')
         
         return {
             'balance': wallet.balance,
@@ -257,3 +974,258 @@ class EarningService:
             'today_earnings': today_earnings,
             'last_earning_date': wallet.last_earning_date,
         }
+
+
+class ApprovalService:
+    """
+    Set-based approval and rejection of deposits and withdrawals.
+    
+    Every method takes a list of ids, processes the ones that are still
+    pending inside one transaction, and returns {id: error or None}.
+    
+    Withdrawal requests hold their amount (`balance_held`, debited when
+    requested), so approving one leaves the balance alone and rejecting it
+    refunds the amount with a Transaction. Requests made before holds
+    existed are debited on approval and rejected without a refund.
+    """
+    
+    NOT_FOUND = 'Not found'
+    
+    @staticmethod
+    def _lock_pending(queryset, ids, already_processed):
+        results = {pk: ApprovalService.NOT_FOUND for pk in ids}
+        rows = list(queryset.select_for_update(of=('self',)).filter(pk__in=ids))
+        pending = []
+        for row in rows:
+            if row.status == 'pending':
+                results[row.pk] = None
+                pending.append(row)
+            else:
+                results[row.pk] = already_processed
+        return pending, results
+    
+    @staticmethod
+    def approve_deposits(deposit_ids, approved_by):
+        """Approve pending deposits, credit wallets and pay upline commissions"""
+        with transaction.atomic():
+            deposits, results = ApprovalService._lock_pending(
+                Deposit.objects.select_related('user', 'package'),
+                deposit_ids,
+                'Deposit already processed'
+            )
+            if not deposits:
+                return results
+            
+            now = timezone.now()
+            by_duration = defaultdict(list)
+            for deposit in deposits:
+                by_duration[deposit.package.duration_days].append(deposit.pk)
+            for duration_days, ids in by_duration.items():
+                Deposit.objects.filter(pk__in=ids).update(
+                    status='approved',
+                    approved_by=approved_by,
+                    approved_at=now,
+                    matures_on=now.date() + timedelta(days=duration_days),
+                    updated_at=now,
+                )
+            
+            wallet_deltas = defaultdict(lambda: {'mining_income': Decimal('0'), 'balance': Decimal('0')})
+            transactions = []
+            for deposit in deposits:
+                wallet_deltas[deposit.user_id]['mining_income'] += deposit.amount
+                wallet_deltas[deposit.user_id]['balance'] += deposit.amount
+                transactions.append({
+                    'user_id': deposit.user_id,
+                    'transaction_type': 'deposit',
+                    'amount': deposit.amount,
+                    'description': f'Deposit approved for {deposit.package.name}',
+                })
+            WalletService.apply_bulk(wallet_deltas, transactions)
+            
+            EarningService.process_deposit_commissions(deposits)
+        return results
+    
+    @staticmethod
+    def reject_deposits(deposit_ids, reason=''):
+        """Reject pending deposits"""
+        with transaction.atomic():
+            deposits, results = ApprovalService._lock_pending(
+                Deposit.objects.all(), deposit_ids, 'Deposit already processed'
+            )
+            Deposit.objects.filter(pk__in=[deposit.pk for deposit in deposits]).update(
+                status='rejected',
+                rejection_reason=reason,
+                updated_at=timezone.now(),
+            )
+        return results
+    
+    @staticmethod
+    def approve_withdrawals(withdrawal_ids, approved_by):
+        """Approve pending withdrawals, debiting the amounts that were not held"""
+        with transaction.atomic():
+            withdrawals, results = ApprovalService._lock_pending(
+                Withdrawal.objects.all(), withdrawal_ids, 'Withdrawal already processed'
+            )
+            if not withdrawals:
+                return results
+            
+            now = timezone.now()
+            Withdrawal.objects.filter(pk__in=[withdrawal.pk for withdrawal in withdrawals]).update(
+                status='approved',
+                approved_by=approved_by,
+                approval_date=now,
+                updated_at=now,
+            )
+            
+            wallet_deltas = defaultdict(lambda: {'balance': Decimal('0')})
+            transactions = []
+            for withdrawal in withdrawals:
+                if withdrawal.balance_held:
+                    continue
+                wallet_deltas[withdrawal.user_id]['balance'] -= withdrawal.amount
+                transactions.append({
+                    'user_id': withdrawal.user_id,
+                    'transaction_type': 'withdrawal',
+                    'amount': -withdrawal.amount,
+                    'description': f'Withdrawal via {withdrawal.withdrawal_method}',
+                })
+            WalletService.apply_bulk(wallet_deltas, transactions)
+        return results
+    
+    @staticmethod
+    def reject_withdrawals(withdrawal_ids, reason=''):
+        """Reject pending withdrawals, refunding the amounts that were held"""
+        with transaction.atomic():
+            withdrawals, results = ApprovalService._lock_pending(
+                Withdrawal.objects.all(), withdrawal_ids, 'Withdrawal already processed'
+            )
+            if not withdrawals:
+                return results
+            
+            Withdrawal.objects.filter(pk__in=[withdrawal.pk for withdrawal in withdrawals]).update(
+                status='rejected',
+                rejection_reason=reason,
+                updated_at=timezone.now(),
+            )
+            
+            wallet_deltas = defaultdict(lambda: {'balance': Decimal('0')})
+            transactions = []
+            for withdrawal in withdrawals:
+                if not withdrawal.balance_held:
+                    continue
+                wallet_deltas[withdrawal.user_id]['balance'] += withdrawal.amount
+                transactions.append({
+                    'user_id': withdrawal.user_id,
+                    'transaction_type': 'withdrawal',
+                    'amount': withdrawal.amount,
+                    'description': f'Refund of rejected withdrawal via {withdrawal.withdrawal_method}',
+                })
+            WalletService.apply_bulk(wallet_deltas, transactions)
+        return results
+
+
+class ArchiveService:
+    """
+    Moves Transaction and DailyEarning rows older than a cutoff into the
+    archive tables.
+    
+    Each batch is copied, checkpointed and deleted in one database
+    transaction, so an interrupted run loses nothing and can be re-run.
+    Archived transactions are folded into per-user monthly
+    BalanceCheckpoint rows for reconciliation.
+    """
+    
+    TRANSACTION_FIELDS = ('id', 'user_id', 'transaction_type', 'amount', 'status', 'description', 'created_at')
+    DAILY_EARNING_FIELDS = ('id', 'user_id', 'earning_type', 'amount', 'deposit_id', 'earned_date', 'created_at')
+    
+    @staticmethod
+    def cutoff_for(days, now=None):
+        """Start of the month `days` ago, so that only whole months are archived"""
+        day = (now or timezone.now()).date() - timedelta(days=days)
+        return timezone.make_aware(datetime.combine(day.replace(day=1), time.min))
+    
+    @staticmethod
+    def archive(cutoff, batch_size=5000, export=False):
+        """Archive rows created before `cutoff`; returns {'transactions', 'daily_earnings', 'files'}"""
+        stats = {'transactions': 0, 'daily_earnings': 0, 'files': []}
+        exporter = stats['files'].append if export else None
+        
+        while True:
+            moved = ArchiveService._archive_transaction_batch(cutoff, batch_size, exporter)
+            if not moved:
+                break
+            stats['transactions'] += moved
+        
+        while True:
+            moved = ArchiveService._archive_daily_earning_batch(cutoff.date(), batch_size, exporter)
+            if not moved:
+                break
+            stats['daily_earnings'] += moved
+        return stats
+    
+    @staticmethod
+    def _archive_transaction_batch(cutoff, batch_size, exporter):
+        with transaction.atomic():
+            rows = list(
+                Transaction.objects.filter(created_at__lt=cutoff)
+                .order_by('id')
+                .values(*ArchiveService.TRANSACTION_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return 0
+            batch = Transaction.objects.filter(pk__in=[row['id'] for row in rows])
+            ArchiveService._checkpoint(batch)
+            TransactionArchive.objects.bulk_create(
+                [TransactionArchive(**row) for row in rows], ignore_conflicts=True
+            )
+            if exporter:
+                exporter(ArchiveService._export('transactions', rows))
+            batch.delete()
+        return len(rows)
+    
+    @staticmethod
+    def _archive_daily_earning_batch(cutoff_date, batch_size, exporter):
+        with transaction.atomic():
+            rows = list(
+                DailyEarning.objects.filter(earned_date__lt=cutoff_date)
+                .order_by('id')
+                .values(*ArchiveService.DAILY_EARNING_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return 0
+            DailyEarningArchive.objects.bulk_create(
+                [DailyEarningArchive(**row) for row in rows], ignore_conflicts=True
+            )
+            if exporter:
+                exporter(ArchiveService._export('daily_earnings', rows))
+            DailyEarning.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        return len(rows)
+    
+    @staticmethod
+    def _checkpoint(transactions):
+        """Add the ledger movements of `transactions` to their users' monthly checkpoints"""
+        months = transactions.annotate(month=TruncMonth('created_at', output_field=DateField()))
+        for row in LedgerService.totals(months, 'user_id', 'month'):
+            amounts = {field: row[field] for field in LedgerService.WALLET_FIELDS}
+            updates = {field: F(field) + amount for field, amount in amounts.items()}
+            updates['transaction_count'] = F('transaction_count') + row['transaction_count']
+            updates['updated_at'] = timezone.now()
+            
+            checkpoint = BalanceCheckpoint.objects.filter(user_id=row['user_id'], month=row['month'])
+            if not checkpoint.update(**updates):
+                BalanceCheckpoint.objects.create(
+                    user_id=row['user_id'],
+                    month=row['month'],
+                    transaction_count=row['transaction_count'],
+                    **amounts
+                )
+    
+    @staticmethod
+    def _export(kind, rows):
+        """Write `rows` as gzipped NDJSON to default storage and return the stored name"""
+        buffer = BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb') as archive_file:
+            for row in rows:
+                archive_file.write(json.dumps(row, cls=DjangoJSONEncoder).encode('utf-8') + b'\n')
+        name = f"archive/{kind}/{rows[0]['id']}-{rows[-1]['id']}.ndjson.gz"
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
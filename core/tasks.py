@@ -0,0 +1,105 @@
+"""
+Background job definitions, executed by `manage.py run_worker`.
+
+Payloads must be JSON-serializable; return values are stored on the Job.
+"""
+import time
+import uuid
+from datetime import date as Date
+from io import StringIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+
+from config.db_router import replica_reads
+from config.metrics import record_earnings_run
+from .jobs import task
+
+
+@task('earnings.daily', priority=10, max_attempts=3, timeout=3600)
+def run_daily_earnings(since=None):
+    output = StringIO()
+    call_command('calculate_daily_earnings', since=since, stdout=output)
+    return {'output': output.getvalue()[-4000:]}
+
+
+@task('earnings.bucket', priority=10, max_attempts=3, timeout=3600)
+def run_earnings_bucket(date, bucket, buckets):
+    """Credit one user-id bucket of a staggered daily run; see EARNINGS_STAGGER_BUCKETS"""
+    from .services import EarningService, SnapshotService
+    day = Date.fromisoformat(date)
+    start = time.monotonic()
+    try:
+        # ROI uses the balance at the start of the day, however late the bucket runs
+        opening = EarningService.opening_balances(day, bucket=(bucket, buckets))
+        stats = EarningService.calculate_daily_earnings(
+            date=day, opening_balances=opening, bucket=(bucket, buckets)
+        )
+        EarningService.settle_matured_deposits(day)
+        SnapshotService.capture(day)
+    except Exception as e:
+        record_earnings_run('bucket', time.monotonic() - start, error=e)
+        raise
+    record_earnings_run('bucket', time.monotonic() - start, stats)
+    return stats
+
+
+@task('earnings.referrals', priority=15, max_attempts=10, timeout=3600)
+def run_staggered_referrals(date):
+    """
+    Pay the referral commissions of a staggered run once every bucket of
+    `date` has succeeded, so each commission sees the referred user's full day.
+    While buckets are still pending the job fails and is retried with backoff.
+    """
+    from .models import Job
+    from .services import EarningService, SnapshotService
+    day = Date.fromisoformat(date)
+    pending = (
+        Job.objects.filter(name='earnings.bucket', key__startswith=f'earnings.bucket:{day}:')
+        .exclude(status='succeeded').count()
+    )
+    if pending:
+        raise RuntimeError(f'{pending} earnings buckets for {day} have not finished yet')
+
+    start = time.monotonic()
+    try:
+        stats = EarningService.process_referral_earnings(date=day)
+        SnapshotService.capture(day)
+    except Exception as e:
+        record_earnings_run('referral', time.monotonic() - start, error=e)
+        raise
+    record_earnings_run('referral', time.monotonic() - start, stats)
+    return stats
+
+
+@task('earnings.deposits', priority=20)
+def calculate_earnings_for_deposits(deposit_ids):
+    from .services import EarningService
+    EarningService.calculate_earnings_for_deposits(deposit_ids)
+
+
+@task('reports.generate', priority=50, max_attempts=2, timeout=900)
+def generate_report(report, file_format='excel'):
+    from .reports import render_report
+    with replica_reads():
+        buffer, filename, content_type = render_report(report, file_format)
+    name = default_storage.save(f'reports/{uuid.uuid4()}/{filename}', ContentFile(buffer.getvalue()))
+    return {'file': name, 'filename': filename, 'content_type': content_type}
+
+
+@task('images.upload', priority=30, max_attempts=5)
+def upload_image(name, folder, content_type, model, pk, field):
+    """Upload a staged image to Supabase and store its URL on `model` row `pk`"""
+    from .image_utils import upload_staged_image
+    url = upload_staged_image(name, folder, content_type)
+    apps.get_model(model).objects.filter(pk=pk).update(**{field: url})
+    return {'url': url}
+
+
+@task('images.delete', priority=200, max_attempts=5)
+def delete_image(url):
+    from .image_utils import delete_image_from_supabase
+    if not delete_image_from_supabase(url):
+        raise RuntimeError(f'Could not delete {url}')
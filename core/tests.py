@@ -1,3 +1,1266 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import importlib
+import io
+import importlib.util
+import json
+import os
+import tempfile
+import time
+import uuid
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from config import db_router, metrics, query_stats
+from config.db_backends import immediate_atomic
+from config.db_pool import ConnectionPool, PoolTimeout
+from config.middleware import ReplicaRoutingMiddleware
+from users.models import User
+from users.serializers import UserDetailSerializer
+from . import jobs, scheduler
+from .benchmarks import BenchmarkContext, compare, list_pages
+from .scheduler import LeaderLease, run_earnings_without_worker, schedule_earnings_buckets
+from .models import (
+    BalanceCheckpoint, DailyEarning, DailyEarningArchive, Deposit, Job, MiningPackage, Order,
+    QueryFingerprintStat, ROISetting, SchedulerLease, Transaction, TransactionArchive, UserDailySummary, Wallet,
+    Withdrawal, WorkerHeartbeat,
+)
+from .serializers import DepositDetailSerializer, ValuesListSerializer
+from .services import (
+    ApprovalService, ArchiveService, EarningService, ReconciliationService, SnapshotService,
+    SummaryService, WalletService,
+)
+from .views import parse_id_list
+
+
+def make_user(email, balance='0', **extra):
+    user = User.objects.create_user(username=email, email=email, password='secret', **extra)
+    Wallet.objects.create(user=user, balance=Decimal(balance))
+    return user
+
+
+def make_deposit(user, amount, package=None):
+    package = package or MiningPackage.objects.create(
+        name='Starter', price=Decimal('500'), daily_earning=Decimal('10.00'), duration_days=30
+    )
+    return Deposit.objects.create(
+        user=user, package=package, amount=Decimal(amount), payment_method='bank_transfer'
+    )
+
+
+class ArchivePaginationTests(TestCase):
+    def setUp(self):
+        self.user = make_user('owner@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        now = timezone.now()
+        self.live = []
+        for days, amount in ((1, '30.00'), (2, '10.00'), (3, '20.00')):
+            tx = Transaction.objects.create(
+                user=self.user, transaction_type='mining', amount=Decimal(amount), description='live'
+            )
+            Transaction.objects.filter(pk=tx.pk).update(created_at=now - timedelta(days=days))
+            self.live.append(tx.pk)
+        self.archived = []
+        for pk, days in ((2, 400), (1, 401)):
+            TransactionArchive.objects.create(
+                id=pk, user=self.user, transaction_type='mining', amount=Decimal('5.00'),
+                description='archived', created_at=now - timedelta(days=days)
+            )
+            self.archived.append(pk)
+
+    def collect(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_pages_continue_into_archive_newest_first(self):
+        ids = self.collect('/api/core/transactions/?page_size=2')
+        self.assertEqual(ids, self.live + self.archived)
+
+    def test_default_ordering_parameter_is_accepted(self):
+        ids = self.collect('/api/core/transactions/?page_size=2&ordering=-created_at')
+        self.assertEqual(ids, self.live + self.archived)
+
+    def test_other_ordering_is_refused(self):
+        response = self.client.get('/api/core/transactions/?ordering=amount')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.data)
+
+        response = self.client.get('/api/core/daily-earnings/my_earnings/?ordering=amount')
+        self.assertEqual(response.status_code, 400)
+
+
+class WalletRoundingTests(TestCase):
+    def test_apply_rounds_deltas_to_cents(self):
+        user = make_user('rounding@example.com')
+        for _ in range(3):
+            WalletService.apply(
+                user,
+                {'mining_income': Decimal('0.3333'), 'balance': Decimal('0.3333')},
+                [{'transaction_type': 'mining', 'amount': Decimal('0.3333')}],
+            )
+        wallet = Wallet.objects.get(user=user)
+        self.assertEqual(wallet.balance, Decimal('0.99'))
+        self.assertEqual(wallet.mining_income, Decimal('0.99'))
+        self.assertEqual(ReconciliationService.diff([user.id]), [])
+
+    def test_apply_bulk_rounds_deltas_to_cents(self):
+        user = make_user('bulk-rounding@example.com')
+        for _ in range(3):
+            WalletService.apply_bulk(
+                {user.id: {'balance': Decimal('0.3333'), 'roi_earnings': Decimal('0.3333')}},
+                [{'user_id': user.id, 'transaction_type': 'roi', 'amount': Decimal('0.3333')}],
+            )
+        wallet = Wallet.objects.get(user=user)
+        self.assertEqual(wallet.balance, Decimal('0.99'))
+        self.assertEqual(ReconciliationService.diff([user.id]), [])
+
+    def test_earnings_run_matches_ledger(self):
+        ROISetting.objects.create(min_percentage=Decimal('1.37'), max_percentage=Decimal('1.37'))
+        admin = make_user('admin@example.com', is_staff=True)
+        referrer = make_user('referrer@example.com')
+        users = [make_user(f'investor{i}@example.com', referred_by=referrer) for i in range(4)]
+        deposits = [make_deposit(user, amount) for user in users for amount in ('1234.57', '777.77')]
+        ApprovalService.approve_deposits([deposit.pk for deposit in deposits], admin)
+
+        EarningService.calculate_daily_earnings()
+        EarningService.process_referral_earnings()
+        self.assertEqual(ReconciliationService.diff(), [])
+
+
+class ApprovalTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('staff@example.com', is_staff=True, is_superuser=True)
+        self.user = make_user('member@example.com', balance='5000')
+        self.client = APIClient()
+
+    def balance(self):
+        return Wallet.objects.get(user=self.user).balance
+
+    def request_withdrawal(self, amount):
+        self.client.force_authenticate(self.user)
+        return self.client.post('/api/core/withdrawals/', {
+            'amount': amount, 'withdrawal_method': 'easypaisa', 'withdrawal_account': '03001234567'
+        }, format='json')
+
+    def test_deposit_is_credited_once(self):
+        deposit = make_deposit(self.user, '1000.00')
+        self.assertEqual(ApprovalService.approve_deposits([deposit.pk], self.admin), {deposit.pk: None})
+        self.assertEqual(
+            ApprovalService.approve_deposits([deposit.pk], self.admin),
+            {deposit.pk: 'Deposit already processed'}
+        )
+        self.assertEqual(self.balance(), Decimal('6000.00'))
+        self.assertEqual(Transaction.objects.filter(user=self.user, transaction_type='deposit').count(), 1)
+
+    def test_reject_does_not_undo_approval(self):
+        deposit = make_deposit(self.user, '1000.00')
+        ApprovalService.approve_deposits([deposit.pk], self.admin)
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(f'/api/core/deposits/{deposit.pk}/reject/')
+        self.assertEqual(response.status_code, 400)
+        deposit.refresh_from_db()
+        self.assertEqual(deposit.status, 'approved')
+
+    def test_request_holds_amount(self):
+        self.assertEqual(self.request_withdrawal('2000').status_code, 201)
+        self.assertEqual(self.balance(), Decimal('3000.00'))
+        # Pending requests cannot add up to more than the balance
+        self.assertEqual(self.request_withdrawal('4000').status_code, 400)
+
+        withdrawal = Withdrawal.objects.get(user=self.user)
+        self.assertTrue(withdrawal.balance_held)
+        self.assertEqual(ApprovalService.approve_withdrawals([withdrawal.pk], self.admin), {withdrawal.pk: None})
+        self.assertEqual(self.balance(), Decimal('3000.00'))
+
+    def assert_rejected_with_refund(self, withdrawal):
+        withdrawal.refresh_from_db()
+        self.assertEqual(withdrawal.status, 'rejected')
+        self.assertEqual(self.balance(), Decimal('5000.00'))
+        refunds = Transaction.objects.filter(user=self.user, transaction_type='withdrawal', amount__gt=0)
+        self.assertEqual(refunds.count(), 1)
+
+    def test_rest_reject_refunds_held_amount(self):
+        self.request_withdrawal('2000')
+        withdrawal = Withdrawal.objects.get(user=self.user)
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.post(f'/api/core/withdrawals/{withdrawal.pk}/reject/').status_code, 200)
+        self.assertEqual(self.client.post(f'/api/core/withdrawals/{withdrawal.pk}/reject/').status_code, 400)
+        self.assert_rejected_with_refund(withdrawal)
+
+    def test_bulk_reject_refunds_held_amount(self):
+        self.request_withdrawal('2000')
+        withdrawal = Withdrawal.objects.get(user=self.user)
+        self.client.force_authenticate(self.admin)
+        response = self.client.post('/api/core/withdrawals/bulk_reject/', {'ids': [withdrawal.pk]}, format='json')
+        self.assertEqual(response.data['processed'], 1)
+        self.assert_rejected_with_refund(withdrawal)
+
+    def test_admin_reject_refunds_held_amount(self):
+        self.request_withdrawal('2000')
+        withdrawal = Withdrawal.objects.get(user=self.user)
+        self.client.force_login(self.admin)
+        self.client.post('/admin/core/withdrawal/', {
+            'action': 'reject_withdrawals', '_selected_action': [withdrawal.pk]
+        })
+        self.assert_rejected_with_refund(withdrawal)
+
+    def test_unheld_request_is_debited_on_approval_only(self):
+        approved = Withdrawal.objects.create(
+            user=self.user, amount=Decimal('1000'), withdrawal_method='easypaisa', withdrawal_account='0300'
+        )
+        rejected = Withdrawal.objects.create(
+            user=self.user, amount=Decimal('1000'), withdrawal_method='easypaisa', withdrawal_account='0300'
+        )
+        ApprovalService.approve_withdrawals([approved.pk], self.admin)
+        ApprovalService.reject_withdrawals([rejected.pk])
+        self.assertEqual(self.balance(), Decimal('4000.00'))
+
+
+class ParseIdListTests(TestCase):
+    def test_accepts_ints_and_digit_strings(self):
+        self.assertEqual(parse_id_list({'ids': [3, '4', 3]}), [3, 4])
+        self.assertEqual(parse_id_list({'ids': '5, 6'}), [5, 6])
+
+    def test_rejects_other_values(self):
+        for value in ([1.5], [True], ['1e3'], ['-1'], [None], [], '', 7):
+            self.assertIsNone(parse_id_list({'ids': value}), value)
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('auditor@example.com', is_staff=True, is_superuser=True)
+        user = make_user('saver@example.com')
+        ApprovalService.approve_deposits([make_deposit(user, '5000.00').pk], self.admin)
+        self.user = User.objects.get(pk=user.pk)
+
+    def reconcile(self):
+        out = StringIO()
+        call_command('reconcile_wallets', stdout=out)
+        return out.getvalue()
+
+    def test_rejected_withdrawals_match_ledger(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/core/withdrawals/', {
+            'amount': '2000', 'withdrawal_method': 'jazzcash', 'withdrawal_account': '03001234567'
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        held = Withdrawal.objects.get(user=self.user)
+        unheld = Withdrawal.objects.create(
+            user=self.user, amount=Decimal('1000'), withdrawal_method='jazzcash', withdrawal_account='0300'
+        )
+
+        client.force_login(self.admin)
+        client.post('/admin/core/withdrawal/', {
+            'action': 'reject_withdrawals', '_selected_action': [held.pk, unheld.pk]
+        })
+        self.assertEqual(Wallet.objects.get(user=self.user).balance, Decimal('5000.00'))
+        self.assertIn('All wallets match the ledger', self.reconcile())
+
+    def test_snapshots_replay_refunds(self):
+        SnapshotService.capture(timezone.now().date())
+        withdrawal = Withdrawal.objects.create(
+            user=self.user, amount=Decimal('1000'), withdrawal_method='jazzcash', withdrawal_account='0300'
+        )
+        ApprovalService.reject_withdrawals([withdrawal.pk])
+        wallets = SnapshotService.wallets_at(timezone.now(), [self.user.id])
+        self.assertEqual(wallets[self.user.id]['balance'], Decimal('5000.00'))
+
+
+class SnapshotTests(TestCase):
+    def test_capture_does_not_replay_credits_it_read(self):
+        admin = make_user('snapshots@example.com', is_staff=True)
+        user = make_user('tracked@example.com')
+        ApprovalService.approve_deposits([make_deposit(user, '5000.00').pk], admin)
+
+        # A credit stamped after the capture started but committed before
+        # the wallets were read is already in the snapshot
+        now = timezone.now()
+        started, credited, finished = (now + timedelta(minutes=minutes) for minutes in (1, 2, 3))
+        WalletService.apply(
+            user,
+            {'mining_income': Decimal('100'), 'balance': Decimal('100')},
+            [{'transaction_type': 'mining', 'amount': Decimal('100')}],
+        )
+        Transaction.objects.filter(user=user, transaction_type='mining').update(created_at=credited)
+
+        with mock.patch('core.services.timezone.now', side_effect=[started, finished]):
+            SnapshotService.capture(now.date())
+
+        wallets = SnapshotService.wallets_at(finished + timedelta(minutes=1), [user.id])
+        self.assertEqual(wallets[user.id]['balance'], Decimal('5100.00'))
+
+
+class SchedulerLeaseTests(TestCase):
+    def test_one_leader_until_its_lease_lapses(self):
+        first, second = LeaderLease(), LeaderLease()
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        acquired_at = SchedulerLease.objects.get(name='scheduler').acquired_at
+        self.assertTrue(first.acquire())
+        self.assertEqual(SchedulerLease.objects.get(name='scheduler').acquired_at, acquired_at)
+
+        SchedulerLease.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(second.acquire())
+        self.assertFalse(first.acquire())
+        self.assertFalse(first.is_leader)
+        lease = SchedulerLease.objects.get(name='scheduler')
+        self.assertEqual(lease.holder, second.holder)
+        self.assertGreater(lease.acquired_at, acquired_at)
+
+        second.release()
+        self.assertFalse(second.is_leader)
+        self.assertTrue(first.acquire())
+
+    @override_settings(
+        SCHEDULER_LEASE_TTL=0, SCHEDULER_HEARTBEAT_INTERVAL=0, EARNINGS_STAGGER_BUCKETS=0, JOBS_EAGER=True
+    )
+    def test_only_the_leader_queues_the_daily_run(self):
+        self.addCleanup(scheduler.lease.release)
+        now = timezone.now()
+        SchedulerLease.objects.create(
+            name='scheduler', holder='other-host:1:abc', acquired_at=now, expires_at=now + timedelta(minutes=1)
+        )
+        scheduler.run_daily_earnings_task()
+        self.assertFalse(Job.objects.exists())
+
+        SchedulerLease.objects.update(expires_at=now - timedelta(seconds=1))
+        scheduler.run_daily_earnings_task()
+        self.assertTrue(scheduler.lease.is_leader)
+        self.assertEqual(list(Job.objects.values_list('name', flat=True)), ['earnings.daily'])
+
+
+@mock.patch.dict(jobs.TASKS, {'tests.echo': {
+    'func': lambda **payload: payload, 'priority': 100, 'max_attempts': 3, 'timeout': 60,
+}})
+class JobQueueTests(TestCase):
+    def test_job_is_claimed_by_one_worker(self):
+        job = jobs.enqueue('tests.echo', {'n': 1})
+
+        first = jobs.claim('worker-1')
+        self.assertEqual(first.pk, job.pk)
+        self.assertEqual(first.locked_by, 'worker-1')
+        self.assertIsNone(jobs.claim('worker-2'))
+
+        self.assertTrue(jobs.execute(first))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.result), ('succeeded', 1, {'n': 1}))
+
+    def test_expired_lock_passes_job_to_one_other_worker(self):
+        jobs.enqueue('tests.echo', {'n': 2})
+        stale = jobs.claim('worker-1')
+        Job.objects.filter(pk=stale.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        current = jobs.claim('worker-2')
+        self.assertEqual(current.pk, stale.pk)
+        self.assertIsNone(jobs.claim('worker-3'))
+
+        # The worker that lost its lock cannot record an outcome any more
+        jobs.execute(stale)
+        current.refresh_from_db()
+        self.assertEqual((current.status, current.locked_by), ('running', 'worker-2'))
+
+    @override_settings(JOB_RETRY_DELAY=10)
+    def test_failures_back_off_then_fail(self):
+        def fail():
+            raise ValueError('upstream unavailable')
+        jobs.TASKS['tests.fail'] = {'func': fail, 'priority': 100, 'max_attempts': 3, 'timeout': 60}
+        job = jobs.enqueue('tests.fail')
+
+        for attempt, delay in ((1, 10), (2, 20)):
+            with self.assertLogs('core.jobs', 'ERROR'):
+                before = timezone.now()
+                self.assertFalse(jobs.execute(jobs.claim('worker-1')))
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('queued', attempt))
+            self.assertGreaterEqual(job.run_at, before + timedelta(seconds=delay))
+            self.assertIsNone(jobs.claim('worker-1'))
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.execute(jobs.claim('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        self.assertIn('upstream unavailable', job.last_error)
+        self.assertIsNone(jobs.claim('worker-1'))
+
+    def test_key_deduplicates_jobs(self):
+        first = jobs.enqueue('tests.echo', {'n': 1}, key='echo:today')
+        self.assertEqual(jobs.enqueue('tests.echo', {'n': 2}, key='echo:today').pk, first.pk)
+        jobs.execute(jobs.claim('worker-1'))
+        self.assertEqual(jobs.enqueue('tests.echo', {'n': 3}, key='echo:today').pk, first.pk)
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertNotEqual(jobs.enqueue('tests.echo', {'n': 4}).pk, first.pk)
+
+    def test_check_backlog_reports_unclaimed_jobs(self):
+        now = timezone.now()
+        jobs.enqueue('tests.echo', run_at=now - timedelta(hours=1))
+        jobs.enqueue('tests.echo', run_at=now)
+        with self.assertLogs('core.jobs', 'ERROR') as logs:
+            self.assertEqual(jobs.check_backlog(), 1)
+        self.assertIn('run_worker', logs.output[0])
+
+
+class EarningsJobTests(TestCase):
+    def test_failed_earnings_run_is_retried(self):
+        job = jobs.enqueue('earnings.daily')
+        failure = RuntimeError('database went away')
+        with mock.patch.object(EarningService, 'calculate_daily_earnings', side_effect=failure), \
+                self.assertLogs('core.jobs', 'ERROR'):
+            self.assertFalse(jobs.execute(jobs.claim('worker-1')))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('Daily earnings run failed: earnings', job.last_error)
+
+    def test_daily_run_job_credits_earnings(self):
+        admin = make_user('jobs-admin@example.com', is_staff=True)
+        ApprovalService.approve_deposits([make_deposit(make_user('queued@example.com'), '5000.00').pk], admin)
+        job = jobs.enqueue('earnings.daily', key='earnings.daily:today')
+
+        self.assertTrue(jobs.execute(jobs.claim('worker-1')))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertIn('Daily earnings calculated successfully', job.result['output'])
+        self.assertTrue(DailyEarning.objects.filter(earning_type='mining').exists())
+
+    def test_scheduler_runs_earnings_when_no_worker_is_alive(self):
+        job = jobs.enqueue('earnings.daily')
+        jobs.beat('gone-host:1', timezone.now() - timedelta(days=1))
+        WorkerHeartbeat.objects.update(last_seen=timezone.now() - timedelta(minutes=10))
+
+        with self.assertLogs('core.scheduler', 'ERROR') as logs:
+            self.assertEqual(run_earnings_without_worker(), 1)
+        self.assertIn('run_worker', logs.output[0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertTrue(job.locked_by.endswith(':scheduler'))
+
+    def test_live_worker_keeps_earnings_jobs(self):
+        job = jobs.enqueue('earnings.daily')
+        jobs.beat('busy-host:1', timezone.now())
+
+        self.assertEqual(run_earnings_without_worker(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+
+        jobs.retire('busy-host:1')
+        self.assertFalse(jobs.workers_alive())
+
+
+class DepositMaturityTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('maturity-admin@example.com', is_staff=True)
+        self.user = make_user('maturing@example.com')
+
+    def test_backfill_sets_maturity_of_approved_deposits(self):
+        backfill = importlib.import_module('core.migrations.0026_deposit_matures_on').backfill_matures_on
+        approved, pending = make_deposit(self.user, '500.00'), make_deposit(self.user, '500.00')
+        approved_at = timezone.now() - timedelta(days=12)
+        Deposit.objects.filter(pk=approved.pk).update(status='approved', approved_at=approved_at)
+
+        backfill(django_apps, None)
+        approved.refresh_from_db()
+        pending.refresh_from_db()
+        self.assertEqual(approved.matures_on, approved_at.date() + timedelta(days=30))
+        self.assertEqual(approved.remaining_days, 18)
+        self.assertIsNone(pending.matures_on)
+
+    def test_engine_and_filters_skip_deposits_past_maturity(self):
+        deposits = [make_deposit(self.user, '500.00') for _ in range(3)]
+        ApprovalService.approve_deposits([deposit.pk for deposit in deposits], self.admin)
+        today = timezone.now().date()
+        for deposit, days in zip(deposits, (0, 1, 20)):
+            Deposit.objects.filter(pk=deposit.pk).update(matures_on=today + timedelta(days=days))
+
+        EarningService.calculate_daily_earnings()
+        self.assertEqual(
+            set(DailyEarning.objects.filter(earning_type='mining').values_list('deposit_id', flat=True)),
+            {deposits[1].pk, deposits[2].pk},
+        )
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/core/deposits/', {'expiring_within': '5'})
+        rows = response.data['results'] if 'results' in response.data else response.data
+        self.assertEqual([row['id'] for row in rows], [deposits[1].pk])
+        self.assertEqual(client.get('/api/core/deposits/', {'expiring_within': 'soon'}).status_code, 400)
+
+
+class MaturedDepositTests(TestCase):
+    def test_nightly_run_settles_deposits_at_maturity(self):
+        admin = make_user('settle-admin@example.com', is_staff=True)
+        user = make_user('settled@example.com')
+        ending, running = make_deposit(user, '500.00'), make_deposit(user, '700.00')
+        ApprovalService.approve_deposits([ending.pk, running.pk], admin)
+        today = timezone.now().date()
+        Deposit.objects.filter(pk=ending.pk).update(matures_on=today)
+
+        out = StringIO()
+        call_command('calculate_daily_earnings', stdout=out)
+        self.assertIn('Matured deposits settled (1 deposits)', out.getvalue())
+        ending.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual((ending.status, ending.remaining_days), ('matured', 0))
+        self.assertEqual(running.status, 'approved')
+        self.assertFalse(DailyEarning.objects.filter(deposit=ending).exists())
+
+        # Settled deposits still count as money the user invested
+        self.assertEqual(UserDetailSerializer(user).data['total_invested'], Decimal('1200.00'))
+        self.assertEqual(UserDetailSerializer(user).data['active_packages'], 1)
+        self.assertEqual(EarningService.settle_matured_deposits(today + timedelta(days=30)), 1)
+        self.assertEqual(EarningService.settle_matured_deposits(today + timedelta(days=30)), 0)
+
+
+@mock.patch.object(db_router, 'replica_configured', lambda: True)
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = db_router.ReplicaRouter()
+        self.user = make_user('reader@example.com')
+        # Test cases run inside a transaction, which keeps reads on the primary
+        self.enterContext(mock.patch.object(connection, 'in_atomic_block', False))
+        self.addCleanup(cache.clear)
+
+    def test_reads_use_replica_only_inside_an_opted_in_scope(self):
+        self.assertEqual(self.router.db_for_read(Deposit), 'default')
+        self.assertFalse(db_router.use_replica(self.user))
+        with db_router.replica_reads(self.user):
+            self.assertEqual(self.router.db_for_read(Deposit), 'replica')
+            with mock.patch.object(connection, 'in_atomic_block', True):
+                self.assertEqual(self.router.db_for_read(Deposit), 'default')
+            self.assertEqual(self.router.db_for_write(Deposit), 'default')
+            self.assertEqual(self.router.db_for_read(Deposit), 'default')
+            self.assertFalse(db_router.use_replica(self.user))
+        self.assertEqual(self.router.db_for_read(Deposit), 'default')
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
+
+    def test_user_who_wrote_is_pinned_to_primary(self):
+        def write(request):
+            self.router.db_for_write(Deposit)
+            return HttpResponse()
+
+        request = RequestFactory().post('/api/core/deposits/')
+        request.user = self.user
+        ReplicaRoutingMiddleware(write)(request)
+        with db_router.replica_reads(self.user):
+            self.assertEqual(self.router.db_for_read(Deposit), 'default')
+        with db_router.replica_reads(make_user('other-reader@example.com')):
+            self.assertEqual(self.router.db_for_read(Deposit), 'replica')
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.dirty = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def make_pool(self, **options):
+        self.opened = []
+        options.setdefault('check', lambda conn: not conn.closed)
+        options.setdefault('reset', lambda conn: not conn.dirty)
+        return ConnectionPool(**options)
+
+    def connect(self):
+        conn = FakeConnection()
+        self.opened.append(conn)
+        return conn
+
+    def test_returned_connection_is_reused(self):
+        pool = self.make_pool(max_size=2)
+        first = pool.getconn(self.connect)
+        second = pool.getconn(self.connect)
+        pool.putconn(first)
+        self.assertEqual(pool.stats(), {'size': 2, 'idle': 1, 'in_use': 1})
+        self.assertIs(pool.getconn(self.connect), first)
+        self.assertEqual(len(self.opened), 2)
+        with mock.patch.object(pool, 'timeout', 0), self.assertRaises(PoolTimeout):
+            pool.getconn(self.connect)
+        pool.putconn(second)
+        self.assertFalse(second.closed)
+
+    def test_connection_that_cannot_be_reset_is_closed(self):
+        pool = self.make_pool(max_size=1)
+        conn = pool.getconn(self.connect)
+        conn.dirty = True
+        pool.putconn(conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats(), {'size': 0, 'idle': 0, 'in_use': 0})
+        self.assertIsNot(pool.getconn(self.connect), conn)
+
+        # Connections the pool never handed out are just closed
+        stranger = FakeConnection()
+        pool.putconn(stranger)
+        self.assertTrue(stranger.closed)
+
+    def test_stale_and_old_connections_are_replaced(self):
+        pool = self.make_pool(max_size=2, check_interval=0)
+        conn = pool.getconn(self.connect)
+        pool.putconn(conn)
+        conn.closed = True
+        self.assertIsNot(pool.getconn(self.connect), conn)
+
+        pool = self.make_pool(max_size=2, max_lifetime=0)
+        conn = pool.getconn(self.connect)
+        pool.putconn(conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_idle_connections_above_min_size_are_closed(self):
+        pool = self.make_pool(min_size=1, max_size=3, max_idle=0.5)
+        clock = iter(range(1000))
+        with mock.patch('config.db_pool.time.monotonic', lambda: next(clock)):
+            conns = [pool.getconn(self.connect) for _ in range(3)]
+            for conn in conns:
+                pool.putconn(conn)
+        self.assertEqual(pool.stats(), {'size': 1, 'idle': 1, 'in_use': 0})
+        self.assertEqual([conn.closed for conn in conns], [True, True, False])
+
+
+@skipUnless(
+    importlib.util.find_spec('psycopg') or importlib.util.find_spec('psycopg2'), 'needs a PostgreSQL driver'
+)
+class PooledBackendResetTests(SimpleTestCase):
+    def fake_connection(self, status):
+        conn = mock.Mock(closed=False)
+        conn.info.transaction_status = status
+
+        def rollback():
+            conn.info.transaction_status = 0
+        conn.rollback.side_effect = rollback
+        return conn
+
+    def test_reset_rolls_back_open_transactions(self):
+        from config.db_backends.postgresql_pool.base import reset_connection
+        for status in (2, 3):
+            conn = self.fake_connection(status)
+            self.assertTrue(reset_connection(conn))
+            conn.rollback.assert_called_once_with()
+        self.assertFalse(reset_connection(self.fake_connection(1)))
+        closed = self.fake_connection(0)
+        closed.closed = True
+        self.assertFalse(reset_connection(closed))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite backend only')
+class SQLiteBackendTests(TransactionTestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_new_connections_apply_configured_pragmas(self):
+        connection.close()
+        pragmas = connection.settings_dict['PRAGMAS']
+        self.assertEqual(self.pragma('busy_timeout'), pragmas['busy_timeout'])
+        self.assertEqual(self.pragma('cache_size'), pragmas['cache_size'])
+        self.assertEqual(self.pragma('synchronous'), {'off': 0, 'normal': 1, 'full': 2}[pragmas['synchronous']])
+
+    def test_immediate_atomic_takes_the_write_lock_up_front(self):
+        with CaptureQueriesContext(connection) as queries:
+            with immediate_atomic():
+                Job.objects.count()
+                with immediate_atomic():
+                    Job.objects.count()
+            with transaction.atomic():
+                Job.objects.count()
+        statements = [query['sql'] for query in queries]
+        self.assertEqual(statements.count('BEGIN IMMEDIATE'), 1)
+        self.assertLess(statements.index('BEGIN IMMEDIATE'), statements.index('BEGIN'))
+        self.assertFalse(connection.begin_immediate)
+
+
+@skipUnless(importlib.util.find_spec('orjson'), 'orjson is not installed')
+class ORJSONRendererTests(TestCase):
+    def assertSameBytes(self, data, accepted_media_type=None):
+        from config.renderers import ORJSONRenderer
+        self.assertEqual(
+            ORJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type),
+        )
+
+    def test_renders_the_same_bytes_as_drf(self):
+        moment = timezone.now()
+        samples = [
+            None,
+            {'amount': Decimal('1234.50'), 'zero': Decimal('0.00'), 'rate': 1.37, 'large': 123456789.25},
+            {'at': moment, 'local': timezone.localtime(moment), 'naive': moment.replace(tzinfo=None)},
+            {'day': moment.date(), 'time': moment.time(), 'id': uuid.UUID(int=7)},
+            {'text': 'Rs \u20a8 \u2028 \u2029 "quoted" </script>', 'lazy': gettext_lazy('Approved'), 1: 'int key'},
+            [True, False, [], {}, 2 ** 63 - 1, 2 ** 70, -1],
+        ]
+        for data in samples:
+            with self.subTest(data=data):
+                self.assertSameBytes(data)
+        self.assertSameBytes({'indented': [1, 2]}, 'application/json; indent=4')
+
+        # Extreme floats use another notation for the same value
+        from config.renderers import ORJSONRenderer
+        data = {'tiny': 0.00001, 'huge': 1e16}
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+    def test_api_pages_render_identically(self):
+        admin = make_user('renderer-admin@example.com', is_staff=True)
+        user = make_user('rendered@example.com')
+        ApprovalService.approve_deposits([make_deposit(user, '5000.00').pk], admin)
+        call_command('calculate_daily_earnings', stdout=StringIO())
+        context = BenchmarkContext()
+        for page in context.pages:
+            self.assertTrue(page['results'])
+            self.assertSameBytes(page)
+
+    def test_parser_matches_drf(self):
+        from config.renderers import ORJSONParser
+        for body in (b'{"amount": "12.50", "ids": [1, 2], "name": "\\u20a8"}', b'{"id": 12345678901234567890}'):
+            with self.subTest(body=body):
+                self.assertEqual(
+                    ORJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body))
+                )
+        for body in (b'{"broken": ', b'[NaN]'):
+            with self.subTest(body=body), self.assertRaisesMessage(ParseError, 'JSON parse error'):
+                ORJSONParser().parse(io.BytesIO(body))
+
+
+class ValuesListSerializerTests(TestCase):
+    @override_settings(DEBUG=True)
+    def test_values_rows_serialize_like_the_model_serializers(self):
+        call_command(
+            'seed_scale_data', users=40, days=60, seed=3, end_date='2026-01-31', stdout=StringIO()
+        )
+        deposits = list(Deposit.objects.order_by('id').values_list('pk', flat=True)[:3])
+        Deposit.objects.filter(pk=deposits[0]).update(deposit_proof='https://cdn.example.com/proof.png')
+        Deposit.objects.filter(pk=deposits[1]).update(deposit_proof=' https://cdn.example.com/spaced.png ')
+        Deposit.objects.filter(pk=deposits[2]).update(deposit_proof='proofs/local.png')
+        Order.objects.filter(pk=Order.objects.order_by('id').values('pk')[:1]).update(
+            txid_proof='https://cdn.example.com/txid.png'
+        )
+        self.assertEqual(
+            set(Deposit.objects.values_list('status', flat=True)), {'pending', 'approved', 'matured', 'rejected'}
+        )
+
+        for queryset, serializer_class, list_serializer_class in list_pages():
+            with self.subTest(serializer=list_serializer_class.__name__):
+                expected = serializer_class(queryset, many=True).data
+                self.assertTrue(expected)
+                self.assertEqual(list_serializer_class(list_serializer_class.values(queryset)).data, expected)
+
+    def test_fields_without_a_column_need_a_method(self):
+        class IncompleteDepositListSerializer(ValuesListSerializer):
+            serializer_class = DepositDetailSerializer
+
+        with self.assertRaisesMessage(TypeError, 'needs a get_package() method'):
+            IncompleteDepositListSerializer.get_plan()
+
+
+class ReportPermissionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.job = Job.objects.create(name='reports.generate', status='succeeded')
+
+    def test_reports_require_admin(self):
+        self.client.force_authenticate(make_user('member@example.com'))
+        for url in ('/api/core/reports/users_report/', '/api/core/reports/status/',
+                    '/api/core/reports/download/'):
+            response = self.client.get(url, {'job': self.job.pk, 'async': '1'})
+            self.assertEqual(response.status_code, 403, url)
+        self.assertFalse(Job.objects.exclude(pk=self.job.pk).exists())
+
+    def test_admin_sees_report_status(self):
+        self.client.force_authenticate(make_user('staff@example.com', is_staff=True))
+        response = self.client.get('/api/core/reports/status/', {'job': self.job.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'succeeded')
+
+
+class StaggeredEarningsTests(TestCase):
+    def setUp(self):
+        ROISetting.objects.create(min_percentage=Decimal('1.37'), max_percentage=Decimal('1.37'))
+
+    def build_network(self):
+        admin = make_user('network-admin@example.com', is_staff=True)
+        top = make_user('top@example.com')
+        leader = make_user('leader@example.com', referred_by=top)
+        members = [make_user(f'member{i}@example.com', referred_by=leader) for i in range(5)]
+        recruit = make_user('recruit@example.com', referred_by=members[0])
+        deposits = [
+            make_deposit(user, amount)
+            for user, amount in zip([top, leader, *members, recruit], ('900', '1200', '650', '3100', '480', '2222', '1010', '5000'))
+        ]
+        ApprovalService.approve_deposits([deposit.pk for deposit in deposits], admin)
+        # Approved yesterday, so both runs see the same start-of-day balances
+        Transaction.objects.update(created_at=timezone.now() - timedelta(days=1))
+        return deposits
+
+    def balances(self, run):
+        """Build the network, run one earnings day with `run`, return the balances and roll back"""
+        with transaction.atomic():
+            self.build_network()
+            run()
+            self.assertEqual(ReconciliationService.diff(), [])
+            result = dict(Wallet.objects.values_list('user__email', 'balance'))
+            transaction.set_rollback(True)
+        return result
+
+    def run_all_at_once(self):
+        EarningService.calculate_daily_earnings()
+        EarningService.process_referral_earnings()
+
+    @override_settings(EARNINGS_STAGGER_BUCKETS=3)
+    def run_staggered(self):
+        schedule_earnings_buckets(timezone.now().date())
+        Job.objects.update(run_at=timezone.now())
+        referrals = Job.objects.get(name='earnings.referrals')
+
+        # Commissions wait for every bucket, whichever order they run in
+        jobs.run_job(referrals.pk, 'early')
+        referrals.refresh_from_db()
+        self.assertEqual(referrals.status, 'queued')
+
+        for job in Job.objects.filter(name='earnings.bucket').order_by('-payload__bucket'):
+            jobs.run_job(job.pk, 'bucket-worker')
+            # Credits during the window must not change the ROI of buckets still to run
+            WalletService.apply(
+                User.objects.get(email='leader@example.com'),
+                {'balance': Decimal('1000')},
+                [{'transaction_type': 'withdrawal', 'amount': Decimal('1000'), 'description': 'Refund of rejected withdrawal'}],
+            )
+        Job.objects.filter(pk=referrals.pk).update(run_at=timezone.now())
+        jobs.run_job(referrals.pk, 'late')
+        referrals.refresh_from_db()
+        self.assertEqual(referrals.status, 'succeeded')
+
+    def test_staggered_run_pays_same_as_single_run(self):
+        with self.assertLogs('core.jobs', 'ERROR'):
+            staggered = self.balances(self.run_staggered)
+        staggered['leader@example.com'] -= Decimal('3000')
+        self.assertEqual(self.balances(self.run_all_at_once), staggered)
+        self.assertGreater(staggered['leader@example.com'], Decimal('1200'))
+
+    @override_settings(EARNINGS_STAGGER_BUCKETS=3)
+    def test_approval_leaves_commissions_to_staggered_run(self):
+        deposits = self.build_network()
+        schedule_earnings_buckets(timezone.now().date())
+
+        EarningService.calculate_earnings_for_deposits([deposit.pk for deposit in deposits])
+        self.assertTrue(DailyEarning.objects.filter(earning_type='mining').exists())
+        self.assertFalse(DailyEarning.objects.filter(earning_type='referral').exists())
+
+        Job.objects.filter(name='earnings.referrals').update(status='succeeded')
+        EarningService.calculate_earnings_for_deposits([deposit.pk for deposit in deposits])
+        self.assertTrue(DailyEarning.objects.filter(earning_type='referral').exists())
+
+    @override_settings(EARNINGS_STAGGER_BUCKETS=3, EARNINGS_STAGGER_HOURS=6)
+    def test_buckets_cover_every_user_once(self):
+        deposits = self.build_network()
+        today = timezone.now().date()
+        buckets = schedule_earnings_buckets(today)
+        self.assertEqual([job.key for job in buckets], [f'earnings.bucket:{today}:{n}/3' for n in range(3)])
+        self.assertEqual(buckets[1].run_at - buckets[0].run_at, timedelta(hours=2))
+        self.assertEqual(len(schedule_earnings_buckets(today)), 3)
+        self.assertEqual(Job.objects.count(), 4)
+
+        Job.objects.update(run_at=timezone.now())
+        for job in buckets:
+            jobs.run_job(job.pk, 'bucket-worker')
+        # A retried bucket finds its users already paid for the day
+        EarningService.calculate_daily_earnings(date=today, bucket=(0, 3))
+        self.assertEqual(
+            sorted(DailyEarning.objects.filter(earning_type='mining').values_list('deposit_id', flat=True)),
+            sorted(deposit.pk for deposit in deposits),
+        )
+
+
+class QueryStatsTests(TestCase):
+    def observe(self, calls):
+        observer = query_stats.QueryObserver()
+        for n in range(calls):
+            for table in range(50):
+                observer.record(f'SELECT * FROM table_{table} WHERE id = {n}', 0.002 * (n + 1))
+        return observer
+
+    def test_flush_adds_counters_in_batches(self):
+        self.observe(2).flush(log=False)
+        with CaptureQueriesContext(connection) as queries:
+            self.observe(3).flush(log=False)
+        self.assertLess(len(queries), 10)
+
+        self.assertEqual(QueryFingerprintStat.objects.count(), 50)
+        stat = QueryFingerprintStat.objects.get(fingerprint='SELECT * FROM table_7 WHERE id = ?')
+        self.assertEqual(stat.calls, 5)
+        self.assertAlmostEqual(stat.total_time_ms, 2 + 4 + 2 + 4 + 6)
+        self.assertAlmostEqual(stat.max_time_ms, 6)
+
+    def test_fingerprints_group_statements_that_differ_only_in_literals(self):
+        cases = [
+            ("SELECT * FROM \"core_wallet\" WHERE \"user_id\" = 42 AND \"note\" = 'it''s'",
+             'SELECT * FROM "core_wallet" WHERE "user_id" = ? AND "note" = ?'),
+            ('SELECT * FROM "core_deposit" WHERE "id" IN (%s, %s, %s)',
+             'SELECT * FROM "core_deposit" WHERE "id" IN (...)'),
+            ('INSERT INTO "t" ("a", "b") VALUES ($1, $2), ($3, $4), ($5, $6)',
+             'INSERT INTO "t" ("a", "b") VALUES (?, ?), ...'),
+            ('SAVEPOINT "s140_x12"', 'SAVEPOINT "?"'),
+            ('SELECT 1.5\n    FROM   "t"', 'SELECT ? FROM "t"'),
+        ]
+        for sql, expected in cases:
+            with self.subTest(sql=sql):
+                self.assertEqual(query_stats.fingerprint(sql), expected)
+
+    def test_fingerprints_beyond_the_cap_are_pooled(self):
+        observer = query_stats.QueryObserver()
+        with mock.patch.object(query_stats, 'MAX_FINGERPRINTS', 3):
+            for table in range(5):
+                observer.record(f'SELECT * FROM table_{table}', 0.001)
+            observer.record('SELECT * FROM table_0', 0.001)
+        self.assertEqual(len(observer.stats), 4)
+        self.assertEqual(observer.stats[query_stats.OTHER_FINGERPRINT].calls, 2)
+        self.assertEqual(observer.stats['SELECT * FROM table_0'].calls, 2)
+
+    def test_nothing_is_collected_unless_installed(self):
+        self.assertFalse(query_stats._installed)
+        self.assertNotIn(query_stats.OBSERVER, connection.execute_wrappers)
+        self.addCleanup(query_stats.OBSERVER.stats.clear)
+        with override_settings(QUERY_STATS_FLUSH_INTERVAL=0):
+            query_stats.OBSERVER.record('SELECT 1', 0.001)
+            query_stats.flush_if_due()
+        self.assertFalse(QueryFingerprintStat.objects.exists())
+
+
+class DailySummaryTests(TestCase):
+    def raw_totals(self):
+        totals = {}
+        for earning in DailyEarning.objects.all():
+            row = totals.setdefault(
+                (earning.user_id, earning.earned_date), dict.fromkeys(SummaryService.EARNING_TYPES, Decimal('0'))
+            )
+            row[earning.earning_type] += earning.amount
+        return {
+            key: tuple(row[name] for name in SummaryService.EARNING_TYPES) + (sum(row.values()),)
+            for key, row in totals.items()
+        }
+
+    def summaries(self):
+        return {
+            (row.user_id, row.date): (row.mining, row.roi, row.reinvest, row.referral, row.total)
+            for row in UserDailySummary.objects.all()
+        }
+
+    def test_engine_keeps_summaries_in_step_with_daily_earnings(self):
+        admin = make_user('summary-admin@example.com', is_staff=True)
+        leader = make_user('summary-leader@example.com')
+        member = make_user('summary-member@example.com', referred_by=leader)
+        deposits = [make_deposit(leader, '5000.00'), make_deposit(member, '5000.00')]
+        ApprovalService.approve_deposits([deposit.pk for deposit in deposits], admin)
+        call_command('calculate_daily_earnings', stdout=StringIO())
+
+        self.assertTrue(DailyEarning.objects.filter(user=leader, earning_type='referral').exists())
+        expected = self.raw_totals()
+        self.assertEqual(self.summaries(), expected)
+
+        UserDailySummary.objects.update(total=Decimal('0'))
+        SummaryService.rebuild()
+        self.assertEqual(self.summaries(), expected)
+
+        client = APIClient()
+        client.force_authenticate(leader)
+        response = client.get('/api/core/daily-earnings/summary/')
+        self.assertEqual(response.status_code, 200)
+        row = response.data['results'][0]
+        self.assertEqual(Decimal(row['total']), expected[(leader.id, timezone.now().date())][-1])
+
+    def test_add_accumulates_and_rounds_like_the_raw_rows(self):
+        user = make_user('summed@example.com')
+        day = timezone.now().date()
+        SummaryService.add(user.id, day, {'mining': Decimal('1.006'), 'roi': Decimal('0')})
+        SummaryService.add(user.id, day, {'mining': Decimal('2.00'), 'referral': Decimal('0.50')})
+        summary = UserDailySummary.objects.get(user=user, date=day)
+        self.assertEqual((summary.mining, summary.roi, summary.referral, summary.total), (
+            Decimal('3.01'), Decimal('0.00'), Decimal('0.50'), Decimal('3.51')
+        ))
+
+
+class SummaryRebuildTests(TestCase):
+    def earn(self, user, earning_type, amount, day):
+        DailyEarning.objects.create(user=user, earning_type=earning_type, amount=Decimal(amount), earned_date=day)
+        SummaryService.add(user.id, day, {earning_type: Decimal(amount)})
+
+    def summaries(self):
+        return {
+            (row.date, row.mining, row.referral, row.total)
+            for row in UserDailySummary.objects.filter(user=self.user)
+        }
+
+    def test_rebuild_keeps_archived_months(self):
+        self.user = make_user('veteran@example.com')
+        today = timezone.now().date()
+        old, recent = today - timedelta(days=400), today - timedelta(days=3)
+        self.earn(self.user, 'mining', '10.00', old)
+        self.earn(self.user, 'referral', '2.50', old)
+        self.earn(self.user, 'mining', '10.00', recent)
+        expected = self.summaries()
+
+        ArchiveService.archive(ArchiveService.cutoff_for(180))
+        self.assertFalse(DailyEarning.objects.filter(earned_date=old).exists())
+        SummaryService.rebuild()
+        self.assertEqual(self.summaries(), expected)
+
+        # A day with rows in both tables is summed into one summary
+        DailyEarning.objects.create(user=self.user, earning_type='mining', amount=Decimal('1.00'), earned_date=old)
+        SummaryService.rebuild(since=old)
+        self.assertIn((old, Decimal('11.00'), Decimal('2.50'), Decimal('13.50')), self.summaries())
+        self.assertEqual(DailyEarningArchive.objects.filter(user=self.user).count(), 2)
+
+
+class ArchiveRoundTripTests(TestCase):
+    def test_archived_history_still_reconciles_and_replays(self):
+        admin = make_user('archivist@example.com', is_staff=True)
+        user = make_user('longtime@example.com')
+        ApprovalService.approve_deposits([make_deposit(user, '5000.00').pk], admin)
+        now = timezone.now()
+        Transaction.objects.filter(user=user).update(created_at=now - timedelta(days=400))
+        for days, amount in ((370, '100.00'), (369, '25.00'), (2, '50.00')):
+            WalletService.apply(
+                user,
+                {'mining_income': Decimal(amount), 'balance': Decimal(amount)},
+                [{'transaction_type': 'mining', 'amount': Decimal(amount)}],
+            )
+            Transaction.objects.filter(user=user, amount=Decimal(amount)).update(created_at=now - timedelta(days=days))
+
+        moments = [now - timedelta(days=380), now - timedelta(days=100), now]
+        expected = ReconciliationService.expected_totals([user.id])
+        history = [SnapshotService.wallets_at(moment, [user.id]) for moment in moments]
+
+        call_command('archive_history', days=200, batch_size=1, stdout=StringIO())
+
+        self.assertEqual(Transaction.objects.filter(user=user).count(), 1)
+        archived = BalanceCheckpoint.objects.filter(user=user).aggregate(count=Sum('transaction_count'))['count']
+        self.assertEqual(archived, 3)
+        self.assertEqual(ReconciliationService.expected_totals([user.id]), expected)
+        self.assertEqual(ReconciliationService.diff([user.id]), [])
+        self.assertEqual([SnapshotService.wallets_at(moment, [user.id]) for moment in moments], history)
+        self.assertEqual(history[-1][user.id]['balance'], Wallet.objects.get(user=user).balance)
+
+
+class MetricsTests(TestCase):
+    def test_metrics_are_private_by_default(self):
+        client = APIClient()
+        self.assertEqual(client.get('/metrics').status_code, 403)
+        client.force_login(make_user('viewer@example.com'))
+        self.assertEqual(client.get('/metrics').status_code, 403)
+        client.force_login(make_user('operator@example.com', is_staff=True))
+        self.assertEqual(client.get('/metrics').status_code, 200)
+
+    @override_settings(METRICS_AUTH_TOKEN='scrape-secret')
+    def test_scraper_needs_bearer_token(self):
+        client = APIClient()
+        self.assertEqual(client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'# TYPE jobs_total counter', response.content)
+
+    def test_last_change_is_flushed_after_the_interval(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, f'metrics_{os.getpid()}.json')
+        with override_settings(METRICS_MULTIPROC_DIR=directory.name, METRICS_FLUSH_INTERVAL=0.2):
+            metrics.REGISTRY.flush()
+            metrics.JOB_RUNS.inc(task='tests.idle', outcome='success')
+
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                with open(path) as fh:
+                    if ['tests.idle', 'success'] in [key for key, _ in json.load(fh)['jobs_total']]:
+                        break
+                time.sleep(0.05)
+            else:
+                self.fail('metrics snapshot was not flushed')
+
+
+class TargetedEarningsTests(TestCase):
+    def test_admin_approval_credits_only_the_selected_deposits(self):
+        admin = make_user('approver@example.com', is_staff=True, is_superuser=True)
+        running = make_deposit(make_user('running@example.com'), '1000.00')
+        ApprovalService.approve_deposits([running.pk], admin)
+        pending = make_deposit(make_user('pending@example.com'), '500.00', package=running.package)
+
+        self.client.force_login(admin)
+        with override_settings(JOBS_EAGER=True), self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/admin/core/deposit/', {
+                'action': 'approve_deposits', '_selected_action': [running.pk, pending.pk]
+            })
+
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, 'approved')
+        credited = set(DailyEarning.objects.filter(earning_type='mining').values_list('deposit_id', flat=True))
+        self.assertEqual(credited, {pending.pk})
+        self.assertEqual(Job.objects.get(name='earnings.deposits').status, 'succeeded')
+
+    def test_referral_pass_is_limited_to_the_referred_users(self):
+        admin = make_user('approver@example.com', is_staff=True)
+        referrer = make_user('upline@example.com')
+        first = make_deposit(make_user('first@example.com', referred_by=referrer), '1000.00')
+        second = make_deposit(make_user('second@example.com', referred_by=make_user('other@example.com')), '1000.00')
+        ApprovalService.approve_deposits([first.pk, second.pk], admin)
+        EarningService.calculate_daily_earnings()
+
+        EarningService.process_referral_earnings(user_ids=[second.user_id])
+        paid = set(DailyEarning.objects.filter(earning_type='referral').values_list('user__email', flat=True))
+        self.assertEqual(paid, {'other@example.com'})
+
+
+class RequestInstrumentationTests(TestCase):
+    @override_settings(REQUEST_INSTRUMENTATION=True, SERVER_TIMING_HEADER=True, SLOW_REQUEST_QUERIES=1)
+    def test_request_is_timed_logged_and_counted(self):
+        client = APIClient()
+        client.force_authenticate(make_user('timed@example.com'))
+        key = ('WalletViewSet.balance', 'GET', '200')
+        before = metrics.REQUEST_LATENCY.values.get(key, [0] * (len(metrics.DEFAULT_BUCKETS) + 2))[-2]
+
+        with self.assertLogs('config.middleware', 'WARNING') as logs:
+            response = client.get('/api/core/wallet/balance/')
+
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['view'], record['status'], record['slow']), ('WalletViewSet.balance', 200, True))
+        self.assertGreaterEqual(record['db_queries'], 1)
+        self.assertEqual(metrics.REQUEST_LATENCY.values[key][-2], before + 1)
+
+    @override_settings(REQUEST_INSTRUMENTATION=False)
+    def test_disabled_instrumentation_adds_nothing(self):
+        client = APIClient()
+        client.force_authenticate(make_user('untimed@example.com'))
+        response = client.get('/api/core/wallet/balance/')
+        self.assertNotIn('Server-Timing', response)
+
+
+@override_settings(DEBUG=True)
+class SeedScaleDataTests(TestCase):
+    def seed(self, prefix, **options):
+        call_command(
+            'seed_scale_data', users=30, days=20, seed=7, end_date='2026-01-31', prefix=prefix,
+            stdout=StringIO(), **options
+        )
+        return list(
+            User.objects.filter(email__startswith=f'{prefix}-').order_by('id').values_list('wallet__balance', flat=True)
+        )
+
+    def test_seeded_history_matches_ledger_and_is_deterministic(self):
+        balances = self.seed('alpha')
+        self.assertEqual(len(balances), 30)
+        self.assertTrue(DailyEarning.objects.filter(user__email__startswith='alpha-').exists())
+        self.assertTrue(UserDailySummary.objects.filter(user__email__startswith='alpha-').exists())
+        out = StringIO()
+        call_command('reconcile_wallets', stdout=out)
+        self.assertIn('All wallets match the ledger', out.getvalue())
+        self.assertEqual(self.seed('beta'), balances)
+
+    def test_refuses_reused_prefix_and_production(self):
+        self.seed('alpha', batch_size=50)
+        with self.assertRaisesMessage(CommandError, 'already exist'):
+            self.seed('alpha')
+        with override_settings(DEBUG=False), self.assertRaisesMessage(CommandError, 'DEBUG=False'):
+            self.seed('gamma')
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        make_deposit(make_user('bench@example.com'), '5000.00')
+        self.directory = self.enterContext(tempfile.TemporaryDirectory())
+
+    def run_benchmarks(self, *args):
+        out = StringIO()
+        call_command(
+            'run_benchmarks', '--use-existing', '--only', 'api.balance', '--repeat', '1',
+            '--output', os.path.join(self.directory, 'results.json'),
+            '--baseline', os.path.join(self.directory, 'baseline.json'),
+            *args, stdout=out,
+        )
+        return out.getvalue()
+
+    def test_compare_flags_errors_extra_queries_and_slowdowns(self):
+        baseline = {'small': {
+            'fast': {'wall_ms': 10.0, 'queries': 2},
+            'same': {'wall_ms': 10.0, 'queries': 2},
+            'broken': {'wall_ms': 10.0, 'queries': 2},
+            'new_in_baseline': {'error': 'ValueError: x'},
+        }}
+        results = {'small': {
+            'fast': {'wall_ms': 40.0, 'queries': 3},
+            'same': {'wall_ms': 14.0, 'queries': 2},
+            'broken': {'error': 'KeyError: y'},
+            'new_in_baseline': {'wall_ms': 99.0, 'queries': 9},
+            'unbenchmarked': {'wall_ms': 99.0, 'queries': 9},
+        }}
+        self.assertEqual(compare(results, baseline), [
+            'small/fast: queries 2 -> 3',
+            'small/fast: 10.0ms -> 40.0ms',
+            'small/broken: now fails (KeyError: y)',
+        ])
+
+    def test_baseline_round_trip_and_query_regression(self):
+        self.assertIn('Baseline updated', self.run_benchmarks('--update-baseline'))
+        self.assertIn('No regressions against baseline', self.run_benchmarks())
+
+        path = os.path.join(self.directory, 'baseline.json')
+        with open(path) as fh:
+            baseline = json.load(fh)
+        for measurement in baseline['results']['existing'].values():
+            measurement['queries'] -= 1
+        with open(path, 'w') as fh:
+            json.dump(baseline, fh)
+        with self.assertRaisesMessage(CommandError, 'benchmark regression(s) against baseline'):
+            self.run_benchmarks()
+
+
+class ProfilingTests(TestCase):
+    def test_profiled_run_writes_report_and_stats(self):
+        admin = make_user('profiler@example.com', is_staff=True)
+        ApprovalService.approve_deposits([make_deposit(make_user('miner@example.com'), '5000.00').pk], admin)
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        out = StringIO()
+        with override_settings(PROFILE_DIR=directory):
+            call_command('calculate_daily_earnings', profile=True, stdout=out)
+
+        files = sorted(os.listdir(directory))
+        self.assertEqual([os.path.splitext(name)[1] for name in files], ['.prof', '.txt'])
+        report_path = os.path.join(directory, files[1])
+        self.assertIn(f'Profile written to {report_path}', out.getvalue())
+        with open(report_path) as fh:
+            report = fh.read()
+        self.assertTrue(report.startswith('Profile: calculate_daily_earnings'))
+        for name in ('load', 'compute', 'write', 'referral'):
+            self.assertRegex(report, rf'\n  {name} +[\d.]+ +\d+\n')
+        self.assertRegex(report, r'SQL: [1-9]\d* statements')
+
+    def test_unprofiled_run_writes_nothing(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        with override_settings(PROFILE_DIR=directory), mock.patch.dict(os.environ, {'EARNINGS_PROFILE': ''}):
+            call_command('calculate_daily_earnings', stdout=StringIO())
+        self.assertEqual(os.listdir(directory), [])
@@ -1,31 +1,47 @@
 from rest_framework import viewsets, status, permissions, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from rest_framework.reverse import reverse
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from django.db import transaction
 from django.db.models import Sum, Count, Q
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
-from django.http import FileResponse
+from django.http import FileResponse, Http404
+from django.core.files.storage import default_storage
 from decimal import Decimal
+from datetime import timedelta
 import uuid
 import logging
 
 logger = logging.getLogger(__name__)
 
 from .models import (
-    MiningPackage, Deposit, Wallet, DailyEarning, Transaction,
-    Referral, Withdrawal, Product, Order, ROISetting, ReinvestSetting, WithdrawalTaxSetting, Category, ProductImage
+    MiningPackage, Deposit, Wallet, DailyEarning, UserDailySummary, Transaction,
+    TransactionArchive, DailyEarningArchive,
+    Referral, Withdrawal, Product, Order, ROISetting, ReinvestSetting, WithdrawalTaxSetting, Category, ProductImage,
+    Job
 )
 from .serializers import (
     MiningPackageSerializer, DepositSerializer, DepositDetailSerializer,
-    WalletSerializer, DailyEarningSerializer, TransactionSerializer,
+    WalletSerializer, DailyEarningSerializer, UserDailySummarySerializer, TransactionSerializer,
+    TransactionArchiveSerializer, DailyEarningArchiveSerializer,
     ReferralSerializer, WithdrawalSerializer, WithdrawalDetailSerializer,
     ProductSerializer, ProductImageSerializer, OrderSerializer, OrderDetailSerializer,
-    ROISettingSerializer, ReinvestSettingSerializer, WithdrawalTaxSettingSerializer, CategorySerializer
+    ROISettingSerializer, ReinvestSettingSerializer, WithdrawalTaxSettingSerializer, CategorySerializer,
+    TransactionListSerializer, DailyEarningListSerializer, DepositListSerializer, WithdrawalListSerializer,
+    OrderListSerializer
+)
+from .services import EarningService, ApprovalService, WalletService
+from .jobs import enqueue
+from .pagination import (
+    TransactionCursorPagination, DailyEarningCursorPagination, UserDailySummaryCursorPagination
 )
-from .services import EarningService
 from users.models import User
+from config.db_router import use_replica
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -34,6 +50,73 @@ class StandardResultsSetPagination(PageNumberPagination):
     max_page_size = 100
 
 
+def paginate_with_archive(view, request, queryset, archive_queryset, archive_serializer_class,
+                          list_serializer_class):
+    """
+    Paginate `queryset` (serialized by the ValuesListSerializer
+    `list_serializer_class`) and, once its last page has been served, point
+    the next link at `archive_queryset` (?archive=1) so clients page on into
+    archived history. Archived rows are always older than live ones, so
+    the combined listing only keeps its order newest first: any other
+    ?ordering= is refused rather than silently reordering between pages.
+    """
+    paginator = view.paginator
+    if paginator.get_ordering(request, queryset, view) != tuple(paginator.ordering):
+        raise ValidationError({
+            filters.OrderingFilter.ordering_param:
+                'This listing continues into archived history and is only available newest first'
+        })
+
+    if request.query_params.get('archive') in ('1', 'true'):
+        page = view.paginate_queryset(archive_queryset)
+        serializer = archive_serializer_class(page, many=True, context=view.get_serializer_context())
+        return view.get_paginated_response(serializer.data)
+
+    page = view.paginate_queryset(list_serializer_class.values(queryset))
+    serializer = list_serializer_class(page, context=view.get_serializer_context())
+    response = view.get_paginated_response(serializer.data)
+    if response.data.get('next') is None and archive_queryset.exists():
+        url = remove_query_param(request.build_absolute_uri(), view.paginator.cursor_query_param)
+        response.data['next'] = replace_query_param(url, 'archive', '1')
+    return response
+
+
+def parse_id_list(data):
+    """
+    Read `ids` from a JSON list, repeated form fields or a comma separated
+    string. Only integers and strings of digits are ids; anything else
+    (1.5, true, "1e3") makes the whole list invalid and returns None.
+    """
+    if hasattr(data, 'getlist') and len(data.getlist('ids')) > 1:
+        raw = data.getlist('ids')
+    else:
+        raw = data.get('ids')
+    if isinstance(raw, str):
+        raw = [part for part in raw.split(',') if part.strip()]
+    if not isinstance(raw, (list, tuple)) or not raw:
+        return None
+
+    ids = []
+    for value in raw:
+        if isinstance(value, str) and value.strip().isascii() and value.strip().isdigit():
+            ids.append(int(value))
+        elif isinstance(value, int) and not isinstance(value, bool):
+            ids.append(value)
+        else:
+            return None
+    return list(dict.fromkeys(ids))
+
+
+def bulk_result_payload(results, done_status):
+    return {
+        'processed': sum(1 for error in results.values() if error is None),
+        'results': [
+            {'id': pk, 'status': done_status} if error is None else {'id': pk, 'error': error}
+            for pk, error in results.items()
+        ],
+    }
+
+
 class IsAuthenticatedOrAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user and request.user.is_authenticated
@@ -44,6 +127,20 @@ class IsAdmin(permissions.BasePermission):
         return request.user and request.user.is_staff
 
 
+class ReplicaReadMixin:
+    """
+    Serve `replica_actions` from the read replica when one is configured.
+    Other actions, and users who wrote within REPLICA_STICKY_SECONDS, read
+    from the primary (see config.db_router).
+    """
+    replica_actions = ('list',)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in permissions.SAFE_METHODS and self.action in self.replica_actions:
+            use_replica(request.user)
+
+
 class MiningPackageViewSet(viewsets.ModelViewSet):
     queryset = MiningPackage.objects.all()
     serializer_class = MiningPackageSerializer
@@ -77,8 +174,22 @@ class DepositViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         if self.request.user.is_staff:
-            return Deposit.objects.all()
-        return Deposit.objects.filter(user=self.request.user)
+            return self.filter_expiring(Deposit.objects.all())
+        return self.filter_expiring(Deposit.objects.filter(user=self.request.user))
+
+    def filter_expiring(self, queryset):
+        """Apply ?expiring_within=N: approved deposits earning for at most N more days"""
+        days = self.request.query_params.get('expiring_within')
+        if days is None:
+            return queryset
+        if not days.isdigit():
+            raise ValidationError({'expiring_within': 'Must be a whole number of days'})
+        today = timezone.now().date()
+        return queryset.filter(
+            status='approved',
+            matures_on__gt=today,
+            matures_on__lte=today + timedelta(days=int(days))
+        )
 
     def create(self, request, *args, **kwargs):
         package_id = request.data.get('package')
@@ -128,58 +239,59 @@ class DepositViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], permission_classes=[IsAdmin])
     def approve(self, request, pk=None):
         deposit = self.get_object()
-        if deposit.status != 'pending':
-            return Response({'error': 'Deposit already processed'}, 
+        error = ApprovalService.approve_deposits([deposit.pk], request.user)[deposit.pk]
+        if error:
+            return Response({'error': error}, 
                           status=status.HTTP_400_BAD_REQUEST)
 
-        deposit.status = 'approved'
-        deposit.approved_by = request.user
-        deposit.approved_at = timezone.now()
-        deposit.save()
-
-        wallet, _ = Wallet.objects.get_or_create(
-            user=deposit.user,
-            defaults={'balance': 0}
-        )
-        wallet.mining_income += deposit.amount
-        wallet.balance += deposit.amount
-        wallet.save()
-
-        Transaction.objects.create(
-            user=deposit.user,
-            transaction_type='deposit',
-            amount=deposit.amount,
-            description=f'Deposit approved for {deposit.package.name}'
-        )
-
-        self._process_referral_commissions(deposit)
-
+        deposit.refresh_from_db()
         return Response({'message': 'Deposit approved', 
                         'data': DepositDetailSerializer(deposit, context={'request': request}).data})
 
     @action(detail=True, methods=['post'], permission_classes=[IsAdmin])
     def reject(self, request, pk=None):
         deposit = self.get_object()
-        if deposit.status != 'pending':
-            return Response({'error': 'Deposit already processed'}, 
+        error = ApprovalService.reject_deposits([deposit.pk], request.data.get('reason', ''))[deposit.pk]
+        if error:
+            return Response({'error': error}, 
                           status=status.HTTP_400_BAD_REQUEST)
 
-        deposit.status = 'rejected'
-        deposit.rejection_reason = request.data.get('reason', '')
-        deposit.save()
-
+        deposit.refresh_from_db()
         return Response({'message': 'Deposit rejected', 
                         'data': DepositDetailSerializer(deposit, context={'request': request}).data})
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAdmin],
+            parser_classes=[JSONParser, FormParser, MultiPartParser])
+    def bulk_approve(self, request):
+        ids = parse_id_list(request.data)
+        if ids is None:
+            return Response({'error': 'ids must be a list of deposit ids'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+
+        results = ApprovalService.approve_deposits(ids, request.user)
+        return Response(bulk_result_payload(results, 'approved'))
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdmin],
+            parser_classes=[JSONParser, FormParser, MultiPartParser])
+    def bulk_reject(self, request):
+        ids = parse_id_list(request.data)
+        if ids is None:
+            return Response({'error': 'ids must be a list of deposit ids'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+
+        results = ApprovalService.reject_deposits(ids, request.data.get('reason', ''))
+        return Response(bulk_result_payload(results, 'rejected'))
+
     @action(detail=False, methods=['get'])
     def my_deposits(self, request):
-        deposits = Deposit.objects.filter(user=request.user).order_by('-created_at')
+        deposits = self.filter_expiring(Deposit.objects.filter(user=request.user)).order_by('-created_at')
+        deposits = DepositListSerializer.values(deposits)
         page = self.paginate_queryset(deposits)
         if page is not None:
-            serializer = DepositDetailSerializer(page, many=True, context={'request': request})
+            serializer = DepositListSerializer(page, context={'request': request})
             return self.get_paginated_response(serializer.data)
         
-        serializer = DepositDetailSerializer(deposits, many=True, context={'request': request})
+        serializer = DepositListSerializer(deposits, context={'request': request})
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
@@ -196,65 +308,6 @@ class DepositViewSet(viewsets.ModelViewSet):
         serializer = DepositDetailSerializer(deposits, many=True, context={'request': request})
         return Response(serializer.data)
 
-    def _process_referral_commissions(self, deposit):
-        levels_config = [
-            {'level': 1, 'percentage': Decimal('5.00'), 'requires_deposit': False},
-            {'level': 2, 'percentage': Decimal('2.00'), 'requires_deposit': True},
-            {'level': 3, 'percentage': Decimal('1.00'), 'requires_deposit': True},
-        ]
-
-        current_user = deposit.user.referred_by
-        current_level = 1
-
-        while current_user and current_level <= 3:
-            if current_user.account_status != 'active':
-                break
-
-            level_config = levels_config[current_level - 1]
-
-            if current_level > 1:
-                has_deposit = Deposit.objects.filter(
-                    user=current_user,
-                    status='approved'
-                ).exists()
-                if not has_deposit:
-                    current_user = current_user.referred_by
-                    current_level += 1
-                    continue
-
-            commission_amount = Decimal(deposit.amount) * (
-                level_config['percentage'] / Decimal('100')
-            )
-
-            referral, _ = Referral.objects.get_or_create(
-                referrer=current_user,
-                referral_user=deposit.user,
-                defaults={
-                    'level': current_level,
-                    'commission_percentage': level_config['percentage']
-                }
-            )
-
-            referral.total_earned += commission_amount
-            referral.save()
-
-            wallet, _ = Wallet.objects.get_or_create(
-                user=current_user,
-                defaults={'balance': 0}
-            )
-
-            wallet.referral_earnings += commission_amount
-            wallet.save()
-
-            Transaction.objects.create(
-                user=current_user,
-                transaction_type='referral',
-                amount=commission_amount,
-                description=f'Level {current_level} referral commission from {deposit.user.email}'
-            )
-
-            current_user = current_user.referred_by
-            current_level += 1
 
 class WalletViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticatedOrAdmin]
@@ -278,18 +331,27 @@ class WalletViewSet(viewsets.ViewSet):
         })
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticatedOrAdmin]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = TransactionCursorPagination
     filter_backends = [filters.OrderingFilter]
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
 
     def get_queryset(self):
         if self.request.user.is_staff:
             return Transaction.objects.all()
         return Transaction.objects.filter(user=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        archived = TransactionArchive.objects.all()
+        if not request.user.is_staff:
+            archived = archived.filter(user=request.user)
+        return paginate_with_archive(
+            self, request, self.filter_queryset(self.get_queryset()), archived, TransactionArchiveSerializer,
+            TransactionListSerializer
+        )
+
 
 class ReferralViewSet(viewsets.ModelViewSet):
     serializer_class = ReferralSerializer
@@ -378,13 +440,27 @@ class WithdrawalViewSet(viewsets.ModelViewSet):
                     'error': f'You need at least 2 referrals to withdraw. Current: {referral_count}'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-        withdrawal = Withdrawal.objects.create(
-            user=user,
-            amount=amount,
-            withdrawal_method=request.data.get('withdrawal_method'),
-            withdrawal_account=request.data.get('withdrawal_account'),
-            status='pending'
-        )
+        # Hold the amount now so pending requests cannot add up to more than
+        # the balance; rejecting the request refunds it
+        method = request.data.get('withdrawal_method')
+        with transaction.atomic():
+            held = WalletService.hold(user, amount, [{
+                'transaction_type': 'withdrawal',
+                'amount': -amount,
+                'description': f'Withdrawal via {method}',
+            }])
+            if not held:
+                return Response({'error': 'Insufficient balance'}, 
+                              status=status.HTTP_400_BAD_REQUEST)
+
+            withdrawal = Withdrawal.objects.create(
+                user=user,
+                amount=amount,
+                withdrawal_method=method,
+                withdrawal_account=request.data.get('withdrawal_account'),
+                status='pending',
+                balance_held=True
+            )
 
         return Response(WithdrawalDetailSerializer(withdrawal, context={'request': request}).data, 
                        status=status.HTTP_201_CREATED)
@@ -392,47 +468,49 @@ class WithdrawalViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], permission_classes=[IsAdmin])
     def approve(self, request, pk=None):
         withdrawal = self.get_object()
-        if withdrawal.status != 'pending':
-            return Response({'error': 'Withdrawal already processed'}, 
+        error = ApprovalService.approve_withdrawals([withdrawal.pk], request.user)[withdrawal.pk]
+        if error:
+            return Response({'error': error}, 
                           status=status.HTTP_400_BAD_REQUEST)
 
-        withdrawal.status = 'approved'
-        withdrawal.approved_by = request.user
-        withdrawal.approval_date = timezone.now()
-        withdrawal.save()
-
-        wallet = withdrawal.user.wallet
-        wallet.balance -= withdrawal.amount
-        wallet.save()
-
-        Transaction.objects.create(
-            user=withdrawal.user,
-            transaction_type='withdrawal',
-            amount=-withdrawal.amount,
-            description=f'Withdrawal via {withdrawal.withdrawal_method}'
-        )
-
+        withdrawal.refresh_from_db()
         return Response({'message': 'Withdrawal approved', 
                         'data': WithdrawalDetailSerializer(withdrawal, context={'request': request}).data})
 
     @action(detail=True, methods=['post'], permission_classes=[IsAdmin])
     def reject(self, request, pk=None):
         withdrawal = self.get_object()
-        if withdrawal.status != 'pending':
-            return Response({'error': 'Withdrawal already processed'}, 
+        error = ApprovalService.reject_withdrawals([withdrawal.pk], request.data.get('reason', ''))[withdrawal.pk]
+        if error:
+            return Response({'error': error}, 
                           status=status.HTTP_400_BAD_REQUEST)
 
-        withdrawal.status = 'rejected'
-        withdrawal.rejection_reason = request.data.get('reason', '')
-        withdrawal.save()
-
-        wallet = withdrawal.user.wallet
-        wallet.balance += withdrawal.amount
-        wallet.save()
-
+        withdrawal.refresh_from_db()
         return Response({'message': 'Withdrawal rejected', 
                         'data': WithdrawalDetailSerializer(withdrawal, context={'request': request}).data})
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAdmin],
+            parser_classes=[JSONParser, FormParser, MultiPartParser])
+    def bulk_approve(self, request):
+        ids = parse_id_list(request.data)
+        if ids is None:
+            return Response({'error': 'ids must be a list of withdrawal ids'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+
+        results = ApprovalService.approve_withdrawals(ids, request.user)
+        return Response(bulk_result_payload(results, 'approved'))
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdmin],
+            parser_classes=[JSONParser, FormParser, MultiPartParser])
+    def bulk_reject(self, request):
+        ids = parse_id_list(request.data)
+        if ids is None:
+            return Response({'error': 'ids must be a list of withdrawal ids'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+
+        results = ApprovalService.reject_withdrawals(ids, request.data.get('reason', ''))
+        return Response(bulk_result_payload(results, 'rejected'))
+
     @action(detail=False, methods=['get'])
     def pending(self, request):
         withdrawals = Withdrawal.objects.filter(status='pending').order_by('-created_at')
@@ -450,12 +528,13 @@ class WithdrawalViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def my_withdrawals(self, request):
         withdrawals = Withdrawal.objects.filter(user=request.user).order_by('-created_at')
+        withdrawals = WithdrawalListSerializer.values(withdrawals)
         page = self.paginate_queryset(withdrawals)
         if page is not None:
-            serializer = WithdrawalDetailSerializer(page, many=True, context={'request': request})
+            serializer = WithdrawalListSerializer(page, context={'request': request})
             return self.get_paginated_response(serializer.data)
         
-        serializer = WithdrawalDetailSerializer(withdrawals, many=True, context={'request': request})
+        serializer = WithdrawalListSerializer(withdrawals, context={'request': request})
         return Response(serializer.data)
 
 
@@ -659,12 +738,13 @@ class OrderViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def my_orders(self, request):
         orders = Order.objects.filter(user=request.user).order_by('-created_at')
+        orders = OrderListSerializer.values(orders)
         page = self.paginate_queryset(orders)
         if page is not None:
-            serializer = OrderDetailSerializer(page, many=True, context={'request': request})
+            serializer = OrderListSerializer(page, context={'request': request})
             return self.get_paginated_response(serializer.data)
         
-        serializer = OrderDetailSerializer(orders, many=True, context={'request': request})
+        serializer = OrderListSerializer(orders, context={'request': request})
         return Response(serializer.data)
 
 
@@ -713,7 +793,7 @@ class WithdrawalTaxSettingViewSet(viewsets.ModelViewSet):
 class DailyEarningViewSet(viewsets.ModelViewSet):
     serializer_class = DailyEarningSerializer
     permission_classes = [IsAuthenticatedOrAdmin]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = DailyEarningCursorPagination
 
     def get_queryset(self):
         if self.request.user.is_staff:
@@ -722,66 +802,43 @@ class DailyEarningViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def my_earnings(self, request):
-        earnings = DailyEarning.objects.filter(user=request.user).order_by('-earned_date')
-        
-        page = self.paginate_queryset(earnings)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        earnings = DailyEarning.objects.filter(user=request.user).order_by('-earned_date', '-id')
+        archived = DailyEarningArchive.objects.filter(user=request.user)
+        return paginate_with_archive(
+            self, request, earnings, archived, DailyEarningArchiveSerializer, DailyEarningListSerializer
+        )
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        summaries = UserDailySummary.objects.filter(user=request.user).order_by('-date', '-id')
         
-        serializer = self.get_serializer(earnings, many=True)
-        return Response(serializer.data)
+        paginator = UserDailySummaryCursorPagination()
+        page = paginator.paginate_queryset(summaries, request, view=self)
+        serializer = UserDailySummarySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
-class ReportViewSet(viewsets.ViewSet):
-    permission_classes = [permissions.AllowAny]
+class ReportViewSet(ReplicaReadMixin, viewsets.ViewSet):
+    permission_classes = [IsAdmin]
+    replica_actions = ('users_report', 'earnings_report', 'orders_report')
 
     def list(self, request):
         return Response({'detail': 'Use /users_report/, /earnings_report/, or /orders_report/'})
 
-    @action(detail=False, methods=['get'])
-    def users_report(self, request):
-        from .reports import generate_users_report_excel, generate_users_report_pdf
+    def _report_response(self, request, report):
+        from .reports import render_report
         
         file_format = request.query_params.get('format', 'excel')
         
-        try:
-            if file_format.lower() == 'pdf':
-                buffer = generate_users_report_pdf()
-                filename = 'users_report.pdf'
-                content_type = 'application/pdf'
-            else:
-                buffer = generate_users_report_excel()
-                filename = 'users_report.xlsx'
-                content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            
-            return FileResponse(
-                buffer,
-                as_attachment=True,
-                filename=filename,
-                content_type=content_type
-            )
-        except Exception as e:
+        if request.query_params.get('async') in ('1', 'true'):
+            job = enqueue('reports.generate', {'report': report, 'file_format': file_format})
             return Response(
-                {'error': f'Failed to generate report: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'job': job.pk, 'status': job.status},
+                status=status.HTTP_202_ACCEPTED
             )
-
-    @action(detail=False, methods=['get'])
-    def earnings_report(self, request):
-        from .reports import generate_earnings_report_excel, generate_earnings_report_pdf
-        
-        file_format = request.query_params.get('format', 'excel')
         
         try:
-            if file_format.lower() == 'pdf':
-                buffer = generate_earnings_report_pdf()
-                filename = 'earnings_report.pdf'
-                content_type = 'application/pdf'
-            else:
-                buffer = generate_earnings_report_excel()
-                filename = 'earnings_report.xlsx'
-                content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            buffer, filename, content_type = render_report(report, file_format)
             
             return FileResponse(
                 buffer,
@@ -795,30 +852,43 @@ class ReportViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'])
+    def users_report(self, request):
+        return self._report_response(request, 'users')
+
+    @action(detail=False, methods=['get'])
+    def earnings_report(self, request):
+        return self._report_response(request, 'earnings')
+
     @action(detail=False, methods=['get'])
     def orders_report(self, request):
-        from .reports import generate_orders_report_excel, generate_orders_report_pdf
-        
-        file_format = request.query_params.get('format', 'excel')
-        
-        try:
-            if file_format.lower() == 'pdf':
-                buffer = generate_orders_report_pdf()
-                filename = 'orders_report.pdf'
-                content_type = 'application/pdf'
-            else:
-                buffer = generate_orders_report_excel()
-                filename = 'orders_report.xlsx'
-                content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            
-            return FileResponse(
-                buffer,
-                as_attachment=True,
-                filename=filename,
-                content_type=content_type
-            )
-        except Exception as e:
-            return Response(
-                {'error': f'Failed to generate report: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return self._report_response(request, 'orders')
+
+    def _get_report_job(self, request):
+        job_id = request.query_params.get('job', '')
+        if not job_id.isdigit():
+            raise Http404
+        return get_object_or_404(Job, pk=job_id, name='reports.generate')
+
+    @action(detail=False, methods=['get'], url_path='status')
+    def report_status(self, request):
+        """Progress of a report queued with ?async=1"""
+        job = self._get_report_job(request)
+        data = {'job': job.pk, 'status': job.status}
+        if job.status == 'succeeded':
+            data['download'] = f"{reverse('report-download', request=request)}?job={job.pk}"
+        elif job.status == 'failed':
+            data['error'] = job.last_error.strip().splitlines()[-1] if job.last_error else ''
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def download(self, request):
+        job = self._get_report_job(request)
+        if job.status != 'succeeded':
+            return Response({'error': 'Report is not ready'}, status=status.HTTP_409_CONFLICT)
+        return FileResponse(
+            default_storage.open(job.result['file']),
+            as_attachment=True,
+            filename=job.result['filename'],
+            content_type=job.result['content_type']
+        )
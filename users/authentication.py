@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.authentication import TokenAuthentication
+
+
+TOKEN_CACHE_PREFIX = 'auth-token:'
+
+
+def token_cache_key(key):
+    return f'{TOKEN_CACHE_PREFIX}{key}'
+
+
+def invalidate_cached_token(key):
+    cache.delete(token_cache_key(key))
+
+
+def token_cache_shared():
+    """
+    Whether the default cache is shared by all processes. The per-process
+    locmem fallback (no REDIS_URL) is not: an invalidation would only reach
+    the process that handled the logout or suspension.
+    """
+    return not isinstance(caches['default'], LocMemCache)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that keeps the token -> user lookup in the cache.
+
+    Entries live for AUTH_TOKEN_CACHE_TIMEOUT seconds and are dropped by the
+    signal handlers in users.signals whenever the token is deleted or the
+    user row changes, so logouts and suspensions take effect immediately.
+    Without a shared cache backend every lookup goes to the database.
+    """
+
+    def authenticate_credentials(self, key):
+        if not token_cache_shared():
+            return super().authenticate_credentials(key)
+
+        cache_key = token_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            user, token = cached
+            if user.is_active:
+                return (user, token)
+
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, (user, token), getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 60))
+        return (user, token)
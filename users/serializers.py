@@ -82,7 +82,7 @@ class UserDetailSerializer(serializers.ModelSerializer):
 
     def get_total_invested(self, obj):
         from core.models import Deposit
-        total = Deposit.objects.filter(user=obj, status='approved').aggregate(
+        total = Deposit.objects.filter(user=obj, status__in=Deposit.FUNDED_STATUSES).aggregate(
             total=Sum('amount'))['total']
         return total or 0
 
@@ -1,3 +1,63 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Wallet
+from .authentication import token_cache_key
+from .models import User
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    url = '/api/core/wallet/balance/'
+
+    def setUp(self):
+        # A file cache stands in for Redis: it is shared between processes
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        self.enterContext(override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': location,
+        }}))
+        self.user = User.objects.create_user(username='holder', email='holder@example.com', password='secret')
+        Wallet.objects.create(user=self.user, balance=Decimal('0'))
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_lookup_is_cached(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertIsNotNone(cache.get(token_cache_key(self.token.key)))
+
+    def test_deleting_token_drops_cache_entry(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.token.delete()
+        self.assertIsNone(cache.get(token_cache_key(self.token.key)))
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_deactivating_user_drops_cache_entry(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(cache.get(token_cache_key(self.token.key)))
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+class ProcessLocalCacheTests(TestCase):
+    def test_locmem_cache_is_not_used_for_tokens(self):
+        user = User.objects.create_user(username='local', email='local@example.com', password='secret')
+        Wallet.objects.create(user=user, balance=Decimal('0'))
+        token = Token.objects.create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        self.assertEqual(client.get(CachedTokenAuthenticationTests.url).status_code, 200)
+        self.assertIsNone(cache.get(token_cache_key(token.key)))
+
+        # A token deleted by another process is rejected right away
+        Token.objects.filter(pk=token.pk)._raw_delete(Token.objects.db)
+        self.assertEqual(client.get(CachedTokenAuthenticationTests.url).status_code, 401)